@@ -13,13 +13,15 @@ Luego acceder a:
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 import json
+import os
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from .agents_advanced import AdvancedRecruitmentAgent
+from serving import InferencePool, PoolSaturatedError
+from .agents_advanced import AdvancedRecruitmentAgent, RETRIEVE_K, SEARCH_CACHE_TTL
 
 
 # =========================================================================
@@ -31,10 +33,32 @@ class QueryRequest(BaseModel):
     text: str
 
 
+class FilterCondition(BaseModel):
+    """Condición de metadata: campo, operador (==, !=, >, >=, <, <=, in, not in) y valor"""
+    field: str
+    op: str = "=="
+    value: Any
+
+
 class SearchRequest(BaseModel):
     """Request para búsqueda"""
     query: str
     top_k: int = 5
+    required_skills: Optional[List[str]] = None
+    any_skills: Optional[List[str]] = None
+    min_skill_overlap: int = 1
+    filters: Optional[List[FilterCondition]] = None
+    mode: str = "dense"
+    fusion: str = "rrf"
+
+
+class JobSearchRequest(BaseModel):
+    """Request para búsqueda de posiciones"""
+    query: str
+    top_k: int = 3
+    filters: Optional[List[FilterCondition]] = None
+    mode: str = "dense"
+    fusion: str = "rrf"
 
 
 class MatchingRequest(BaseModel):
@@ -54,6 +78,26 @@ class MatchScore(BaseModel):
     recommendation: str
 
 
+class CandidateRequest(BaseModel):
+    """Request para agregar un candidato"""
+    id: str
+    name: str
+    profile: str
+    skills: List[str]
+    years: int
+    location: str
+
+
+class JobRequest(BaseModel):
+    """Request para agregar una posición"""
+    id: str
+    title: str
+    description: str
+    required_skills: List[str]
+    years_required: int
+    salary_range: str
+
+
 class CandidateResponse(BaseModel):
     """Response de candidato"""
     id: str
@@ -95,8 +139,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar agente
-agent = AdvancedRecruitmentAgent("./model")
+# Inicializar agente (AGENT_SKILL_INDEX = .npz persistente del índice de skills;
+# AGENT_SEARCH_CACHE_TTL = segundos de validez de los resultados cacheados)
+agent = AdvancedRecruitmentAgent(
+    "./model",
+    skill_index_path=os.environ.get("AGENT_SKILL_INDEX"),
+    ann_backend=os.environ.get("AGENT_ANN_BACKEND"),
+    retrieve_k=int(os.environ.get("AGENT_RETRIEVE_K", RETRIEVE_K)),
+    search_cache_ttl=float(os.environ.get("AGENT_SEARCH_CACHE_TTL", SEARCH_CACHE_TTL))
+)
+
+# Pool acotado de inferencia: toda llamada que toma el lock del agente
+# (búsqueda, matching, listados, altas y bajas) corre fuera del event loop,
+# así /health y /metrics siguen respondiendo mientras un thread lo tiene;
+# lleno -> 503
+POOL = InferencePool(
+    max_workers=int(os.environ.get("AGENT_POOL_WORKERS", 2)),
+    max_queue=int(os.environ.get("AGENT_POOL_QUEUE", 32))
+)
+
+
+def as_conditions(filters: Optional[List[FilterCondition]]) -> Optional[List[tuple]]:
+    """Convertir los filtros del request a tuplas (campo, operador, valor)"""
+    if not filters:
+        return None
+    return [(f.field, f.op, f.value) for f in filters]
+
+
+async def run_inference(fn, *args, **kwargs):
+    """Ejecutar una llamada del agente en el pool (503 si está saturado)"""
+    try:
+        return await POOL.run(fn, *args, **kwargs)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    POOL.shutdown()
 
 
 # =========================================================================
@@ -115,6 +195,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Profundidad de cola y contadores del pool de inferencia; tiempos del pipeline"""
+    return {"inference_pool": POOL.stats(), "pipeline": agent.pipeline_stats}
+
+
 @app.get("/info")
 async def get_info():
     """Información del agente y base de datos"""
@@ -133,7 +219,12 @@ async def get_info():
         "database": {
             "candidates": len(agent.candidates_db),
             "jobs": len(agent.jobs_db),
+            "version": agent.db_version,
             "operations": ["search", "match", "recommend", "cluster"]
+        },
+        "cache": {
+            "search": agent.search_cache.stats(),
+            "query_embeddings": agent.model.cache.stats() if agent.model.cache is not None else None
         }
     }
 
@@ -145,18 +236,38 @@ async def get_info():
 @app.get("/candidates")
 async def list_candidates() -> List[CandidateResponse]:
     """Listar todos los candidatos"""
-    return [CandidateResponse(**c) for c in agent.candidates_db]
+    return [CandidateResponse(**c) for c in await run_inference(agent.list_candidates)]
 
 
 @app.get("/candidates/{candidate_id}")
 async def get_candidate(candidate_id: str) -> CandidateResponse:
     """Obtener detalles de un candidato específico"""
-    candidate = next((c for c in agent.candidates_db if c["id"] == candidate_id), None)
+    candidate = await run_inference(agent.get_candidate, candidate_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Candidato no encontrado")
     return CandidateResponse(**candidate)
 
 
+@app.post("/candidates")
+async def add_candidate(request: CandidateRequest) -> CandidateResponse:
+    """Agregar un candidato (se codifica solo su perfil)"""
+    try:
+        await run_inference(agent.add_candidate, request.dict())
+        return CandidateResponse(**request.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/candidates/{candidate_id}")
+async def remove_candidate(candidate_id: str) -> Dict:
+    """Eliminar un candidato"""
+    try:
+        await run_inference(agent.remove_candidate, candidate_id)
+        return {"removed": candidate_id, "candidates": len(agent.candidates_db)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Candidato no encontrado")
+
+
 @app.post("/candidates/search")
 async def search_candidates(request: SearchRequest) -> List[CandidateResponse]:
     """
@@ -165,12 +276,39 @@ async def search_candidates(request: SearchRequest) -> List[CandidateResponse]:
     Ejemplo:
     {
         "query": "Senior Python Developer with Machine Learning",
-        "top_k": 5
+        "top_k": 5,
+        "required_skills": ["Python"],
+        "filters": [
+            {"field": "years", "op": ">=", "value": 5},
+            {"field": "location", "op": "in", "value": ["Boston", "New York"]}
+        ]
     }
+    
+    required_skills (AND), any_skills (OR) y min_skill_overlap pre-filtran
+    con el índice invertido de skills; filters (years, location) se evalúan
+    sobre columnas antes del top-k, así que top_k resultados cumplen todo.
+    
+    mode: dense (embeddings), lexical (BM25: términos exactos como
+    "Kubernetes" o "c++"), hybrid (fusión rrf o weighted según `fusion`)
+    o lexical_first (BM25 recupera, los embeddings reordenan).
     """
     try:
-        results = agent.search_candidates(request.query, top_k=request.top_k)
+        results = await run_inference(
+            agent.search_candidates,
+            request.query,
+            top_k=request.top_k,
+            skills_all=request.required_skills,
+            skills_any=request.any_skills,
+            min_skill_overlap=request.min_skill_overlap,
+            filters=as_conditions(request.filters),
+            mode=request.mode,
+            fusion=request.fusion
+        )
         return [CandidateResponse(**c) for c in results]
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -182,18 +320,70 @@ async def search_candidates(request: SearchRequest) -> List[CandidateResponse]:
 @app.get("/jobs")
 async def list_jobs() -> List[JobResponse]:
     """Listar todas las posiciones disponibles"""
-    return [JobResponse(**j) for j in agent.jobs_db]
+    return [JobResponse(**j) for j in await run_inference(agent.list_jobs)]
 
 
 @app.get("/jobs/{job_id}")
 async def get_job(job_id: str) -> JobResponse:
     """Obtener detalles de una posición específica"""
-    job = next((j for j in agent.jobs_db if j["id"] == job_id), None)
+    job = await run_inference(agent.get_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Posición no encontrada")
     return JobResponse(**job)
 
 
+@app.post("/jobs/search")
+async def search_jobs(request: JobSearchRequest) -> List[JobResponse]:
+    """
+    Buscar posiciones por similitud con filtros de metadata
+    
+    Ejemplo:
+    {
+        "query": "Python backend engineer",
+        "filters": [{"field": "salary_min", "op": ">=", "value": 120000}]
+    }
+    
+    Campos filtrables: years_required, salary_min, salary_max, title.
+    mode / fusion como en /candidates/search.
+    """
+    try:
+        results = await run_inference(
+            agent.search_jobs,
+            request.query,
+            top_k=request.top_k,
+            filters=as_conditions(request.filters),
+            mode=request.mode,
+            fusion=request.fusion
+        )
+        return [JobResponse(**j) for j in results]
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/jobs")
+async def add_job(request: JobRequest) -> JobResponse:
+    """Agregar una posición (se codifica solo su descripción)"""
+    try:
+        await run_inference(agent.add_job, request.dict())
+        return JobResponse(**request.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/jobs/{job_id}")
+async def remove_job(job_id: str) -> Dict:
+    """Eliminar una posición"""
+    try:
+        await run_inference(agent.remove_job, job_id)
+        return {"removed": job_id, "jobs": len(agent.jobs_db)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Posición no encontrada")
+
+
 # =========================================================================
 # ENDPOINTS: MATCHING
 # =========================================================================
@@ -212,7 +402,8 @@ async def calculate_match(request: MatchingRequest) -> Dict:
     }
     """
     try:
-        result = agent.calculate_candidate_job_match(
+        result = await run_inference(
+            agent.calculate_candidate_job_match,
             request.candidate_id,
             request.job_id
         )
@@ -221,6 +412,8 @@ async def calculate_match(request: MatchingRequest) -> Dict:
             raise HTTPException(status_code=404, detail=result["error"])
         
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -228,18 +421,29 @@ async def calculate_match(request: MatchingRequest) -> Dict:
 @app.get("/jobs/{job_id}/top-candidates")
 async def get_top_candidates_for_job(
     job_id: str,
-    top_k: int = 5
-) -> List[Dict]:
+    top_k: int = 5,
+    retrieve_k: Optional[int] = None,
+    include_stats: bool = False
+):
     """
     Obtener top-k candidatos para una posición
     
-    Retorna candidatos rankeados por score de matching
+    Retorna candidatos rankeados por score de matching. Se recuperan
+    retrieve_k candidatos por similitud y solo esos se re-rankean; con
+    include_stats=true la respuesta es {"results", "pipeline"} con tiempos
+    y conteos por etapa.
     """
     try:
-        results = agent.get_top_candidates_for_job(job_id, top_k=top_k)
+        results, stats = await run_inference(
+            agent.get_top_candidates_for_job, job_id, top_k=top_k, retrieve_k=retrieve_k, return_stats=True
+        )
         if not results:
             raise HTTPException(status_code=404, detail="Posición no encontrada")
+        if include_stats:
+            return {"results": results, "pipeline": stats}
         return results
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -247,18 +451,28 @@ async def get_top_candidates_for_job(
 @app.get("/candidates/{candidate_id}/recommended-jobs")
 async def get_recommended_jobs(
     candidate_id: str,
-    top_k: int = 3
-) -> List[Dict]:
+    top_k: int = 3,
+    retrieve_k: Optional[int] = None,
+    include_stats: bool = False
+):
     """
     Obtener recomendaciones de posiciones para un candidato
     
-    Retorna posiciones rankeadas por relevancia
+    Retorna posiciones rankeadas por relevancia (mismo pipeline de dos
+    etapas que /jobs/{job_id}/top-candidates)
     """
     try:
-        results = agent.get_job_recommendations_for_candidate(candidate_id, top_k=top_k)
+        results, stats = await run_inference(
+            agent.get_job_recommendations_for_candidate, candidate_id,
+            top_k=top_k, retrieve_k=retrieve_k, return_stats=True
+        )
         if not results:
             raise HTTPException(status_code=404, detail="Candidato no encontrado")
+        if include_stats:
+            return {"results": results, "pipeline": stats}
         return results
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -281,12 +495,10 @@ async def process_query(request: QueryRequest) -> Dict:
     - "Top candidatos para Frontend React Developer"
     """
     try:
-        response = agent.process_user_input(request.text)
-        return {
-            "query": request.text,
-            "response": response,
-            "timestamp": agent.conversation_history[-1]["timestamp"]
-        }
+        result = await run_inference(agent.handle_query, request.text)
+        return {"query": request.text, **result}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -294,7 +506,7 @@ async def process_query(request: QueryRequest) -> Dict:
 @app.get("/conversation-history")
 async def get_conversation_history() -> List[Dict]:
     """Obtener historial de conversación"""
-    return agent.conversation_history
+    return list(agent.conversation_history)
 
 
 # =========================================================================
@@ -302,22 +514,17 @@ async def get_conversation_history() -> List[Dict]:
 # =========================================================================
 
 @app.post("/batch/match-all")
-async def batch_match_all_candidates_to_job(job_id: str) -> List[Dict]:
+async def batch_match_all_candidates_to_job(job_id: str, top_k: Optional[int] = None) -> List[Dict]:
     """
     Calcular matching de TODOS los candidatos con una posición
     
-    Retorna ranking completo (útil para screening)
+    Retorna ranking completo (útil para screening); con top_k solo los
+    mejores. El scoring es vectorizado: una pasada para todo el pool.
     """
     try:
-        results = []
-        for candidate in agent.candidates_db:
-            match_data = agent.calculate_candidate_job_match(candidate["id"], job_id)
-            if "error" not in match_data:
-                results.append(match_data)
-        
-        # Ordenar por score
-        results.sort(key=lambda x: x["overall_score"], reverse=True)
-        return results
+        return await run_inference(agent.match_all_candidates, job_id, top_k=top_k)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -330,28 +537,26 @@ async def screen_new_cv(profile: str) -> Dict:
     Busca las mejores posiciones para el CV
     """
     try:
-        # Buscar posiciones más relevantes
-        job_texts = [j["description"] for j in agent.jobs_db]
-        results = agent.model.search(profile, job_texts, top_k=len(agent.jobs_db))
+        # Buscar posiciones más relevantes (solo se codifica el CV)
+        jobs = await run_inference(agent.search_jobs, profile, top_k=len(agent.jobs_db))
         
-        recommendations = []
-        for result in results:
-            for i, jtext in enumerate(job_texts):
-                if jtext == result["candidate"]:
-                    job = agent.jobs_db[i]
-                    recommendations.append({
-                        "job_title": job["title"],
-                        "job_id": job["id"],
-                        "match_score": float(result["similarity"]),
-                        "recommendation": agent._get_recommendation(result["similarity"])
-                    })
-                    break
+        recommendations = [
+            {
+                "job_title": job["title"],
+                "job_id": job["id"],
+                "match_score": job["match_score"],
+                "recommendation": agent._get_recommendation(job["match_score"])
+            }
+            for job in jobs
+        ]
         
         return {
             "cv_profile": profile,
             "recommendations": recommendations,
             "best_fit": recommendations[0] if recommendations else None
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -362,21 +567,15 @@ async def screen_new_cv(profile: str) -> Dict:
 
 @app.get("/analytics/candidates-by-skills")
 async def candidates_by_skills() -> Dict[str, List[str]]:
-    """Agrupar candidatos por skills"""
-    skills_map = {}
-    for candidate in agent.candidates_db:
-        for skill in candidate["skills"]:
-            if skill not in skills_map:
-                skills_map[skill] = []
-            skills_map[skill].append(candidate["name"])
-    return skills_map
+    """Agrupar candidatos por skills (desde el índice invertido)"""
+    return await run_inference(agent.candidates_by_skill)
 
 
 @app.get("/analytics/jobs-by-skills")
 async def jobs_by_skills() -> Dict[str, List[str]]:
     """Agrupar posiciones por skills requeridos"""
     skills_map = {}
-    for job in agent.jobs_db:
+    for job in await run_inference(agent.list_jobs):
         for skill in job["required_skills"]:
             if skill not in skills_map:
                 skills_map[skill] = []
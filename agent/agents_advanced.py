@@ -16,9 +16,157 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from loader import load_model
+from loader import load_model, normalize_embeddings, top_k_indices
+from cache import LRUCache
+from candidate_index import CandidateIndex
+from match_scoring import SkillVocabulary, score_matches
+from metadata_filter import ColumnStore, parse_salary_range
+from skill_index import SkillIndex
+import functools
 import json
+import threading
+import time
 from datetime import datetime
+import numpy as np
+
+
+# Candidatos que la primera etapa (búsqueda por embeddings, ANN si está
+# activado) pasa al scoring completo de la segunda etapa
+RETRIEVE_K = 200
+
+# Caché de resultados de búsqueda (clave: query, parámetros y db_version)
+# y caché de embeddings de queries del modelo
+SEARCH_CACHE_ENTRIES = 1024
+SEARCH_CACHE_BYTES = 16 * 1024 * 1024
+SEARCH_CACHE_TTL = 300.0
+QUERY_CACHE_SIZE = 4096
+
+# Campos que el agente lee de cada registro (índices, features, filtros)
+CANDIDATE_FIELDS = ("id", "name", "profile", "skills", "years")
+JOB_FIELDS = ("id", "title", "description", "required_skills", "years_required")
+SKILL_FIELDS = ("skills", "required_skills")
+
+
+def _freeze(value):
+    """Versión hashable de listas/dicts de parámetros (claves de caché)"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+def _results_size(results: List[Dict]) -> int:
+    """Bytes aproximados de una lista de resultados (su JSON)"""
+    return len(json.dumps(results, default=str))
+
+
+def _check_record(record: Dict, required: Tuple[str, ...]) -> None:
+    """
+    Validar un registro (o los campos de una modificación)
+    
+    Raises:
+        ValueError: falta un campo requerido o los skills no son una lista
+    """
+    missing = [field for field in required if field not in record]
+    if missing:
+        raise ValueError(f"Faltan campos requeridos: {', '.join(missing)}")
+    for field in SKILL_FIELDS:
+        if field in record and not isinstance(record[field], (list, tuple)):
+            raise ValueError(f"'{field}' debe ser una lista de skills")
+
+
+class _ReadWriteLock:
+    """
+    Lock lectores-escritor reentrante
+    
+    Varias lecturas corren a la vez; una escritura espera a que terminen
+    y las excluye (con prioridad: las lecturas nuevas esperan si hay un
+    escritor en cola). Un thread puede anidar lecturas, escrituras y
+    lecturas dentro de una escritura, pero no pasar de lectura a escritura.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+    
+    def acquire_read(self) -> None:
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        if depth == 0:
+            # Lecturas anidadas (o dentro de la propia escritura) no esperan:
+            # con un escritor en cola se bloquearían contra sí mismas
+            local.counted = self._writer != threading.get_ident()
+            if local.counted:
+                with self._cond:
+                    while self._writer is not None or self._waiting_writers:
+                        self._cond.wait()
+                    self._readers += 1
+        local.depth = depth + 1
+    
+    def release_read(self) -> None:
+        local = self._local
+        local.depth -= 1
+        if local.depth == 0 and local.counted:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            return
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("No se puede modificar el agente desde una lectura en curso")
+        
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+    
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+
+def _reads(method):
+    """Ejecutar el método con el lock del agente en modo lectura (compartido)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._lock.release_read()
+    return wrapper
+
+
+def _writes(method):
+    """Ejecutar el método con el lock del agente en modo escritura (exclusivo)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._lock.release_write()
+    return wrapper
 
 
 class AdvancedRecruitmentAgent:
@@ -32,27 +180,87 @@ class AdvancedRecruitmentAgent:
     - State management
     """
     
-    def __init__(self, model_path: str = None):
-        """Inicializar agente avanzado"""
+    def __init__(
+        self,
+        model_path: str = None,
+        skill_index_path: Optional[str] = None,
+        ann_backend: Optional[str] = None,
+        retrieve_k: int = RETRIEVE_K,
+        search_cache_ttl: Optional[float] = SEARCH_CACHE_TTL
+    ):
+        """
+        Inicializar agente avanzado
+        
+        Args:
+            model_path: Ruta al modelo (None = ./model del proyecto)
+            skill_index_path: Archivo .npz del índice invertido de skills;
+                              se carga si coincide con la DB y si no se
+                              reconstruye y se guarda ahí
+            ann_backend: Índice ANN para la etapa de recuperación sobre
+                         candidatos ('auto', 'numpy-ivf', ...; None = exacta)
+            retrieve_k: Candidatos recuperados antes del re-ranking
+            search_cache_ttl: Segundos de validez de un resultado en
+                              search_cache (None = hasta el próximo cambio)
+        """
         if model_path is None:
             # Usar ruta relativa al proyecto raíz
             project_root = Path(__file__).parent.parent
             model_path = str(project_root / "model")
         
-        self.model = load_model(model_path)
+        # Las queries repetidas no vuelven a pasar por el modelo
+        self.model = load_model(model_path, cache_size=QUERY_CACHE_SIZE)
+        
+        # Las llamadas llegan desde threads del pool de inferencia. Las
+        # mutaciones tocan DB, índices, skill_index y features en pasos
+        # separados: toman el lock en exclusiva, mientras que búsquedas,
+        # matching y lecturas lo comparten y corren en paralelo. Las features
+        # perezosas tienen su propio lock (construirlas modifica el
+        # vocabulario de skills); search_cache ya es thread-safe
+        self._lock = _ReadWriteLock()
+        self._features_lock = threading.RLock()
         
         # Estado del agente
         self.conversation_history: List[Dict] = []
         self.current_context: Dict = {}
-        self.search_cache: Dict = {}
+        
+        # Resultados de search_candidates / search_jobs; la clave incluye
+        # db_version, así que un cambio en la DB nunca sirve datos viejos
+        self.search_cache = LRUCache(
+            max_entries=SEARCH_CACHE_ENTRIES,
+            max_bytes=SEARCH_CACHE_BYTES,
+            sizeof=_results_size,
+            ttl=search_cache_ttl
+        )
         
         # Base de datos de candidatos (en producción: PostgreSQL)
         self.candidates_db = self._load_candidates_db()
         self.jobs_db = self._load_jobs_db()
         
-        # Embeddings pre-calculados para speedup
-        self.candidate_embeddings = None
-        self.job_embeddings = None
+        # Embeddings pre-calculados para speedup: se codifican una vez al
+        # cargar y se mantienen sincronizados con la DB (fila i = registro i).
+        # Los índices resuelven además ID -> fila en O(1) y mantienen un
+        # índice BM25 de los mismos textos para la búsqueda léxica/híbrida
+        self.candidate_index = CandidateIndex(self.model)
+        self.job_index = CandidateIndex(self.model)
+        self.candidate_index.enable_lexical()
+        self.job_index.enable_lexical()
+        self._build_embeddings()
+        if ann_backend:
+            self.candidate_index.enable_ann(ann_backend)
+        
+        # Pipeline recuperar -> re-rankear; stats de la última ejecución
+        self.retrieve_k = retrieve_k
+        self.pipeline_stats: Dict[str, Dict] = {}
+        
+        # Features columnares para el scoring vectorizado (skills multi-hot
+        # y años); se reconstruyen de forma perezosa tras cada cambio
+        self.skill_vocabulary = SkillVocabulary()
+        self.db_version = 0
+        self._features: Dict[str, Tuple] = {}
+        
+        # Índice invertido skill -> filas de candidates_db (pre-filtrado)
+        self.skill_index_path = skill_index_path
+        self.skill_index = self._load_skill_index()
         
         print("✅ Agente Avanzado inicializado")
         print(f"   Modelo: {model_path}")
@@ -129,63 +337,351 @@ class AdvancedRecruitmentAgent:
             },
         ]
     
+    # =========================================================================
+    # EMBEDDINGS PRE-CALCULADOS
+    # =========================================================================
+    
+    @property
+    def candidate_embeddings(self) -> np.ndarray:
+        """Matriz (n_candidatos, 768) normalizada, alineada con candidates_db"""
+        return self.candidate_index.embeddings
+    
+    @property
+    def job_embeddings(self) -> np.ndarray:
+        """Matriz (n_posiciones, 768) normalizada, alineada con jobs_db"""
+        return self.job_index.embeddings
+    
+    @_reads
+    def list_candidates(self) -> List[Dict]:
+        """Copia consistente de candidates_db"""
+        return [c.copy() for c in self.candidates_db]
+    
+    @_reads
+    def list_jobs(self) -> List[Dict]:
+        """Copia consistente de jobs_db"""
+        return [j.copy() for j in self.jobs_db]
+    
+    @_reads
+    def candidates_by_skill(self) -> Dict[str, List[str]]:
+        """Nombres de candidatos por skill (desde el índice invertido)"""
+        return {
+            skill: [self.candidates_db[row]["name"] for row in rows]
+            for skill, rows in self.skill_index.groups().items()
+        }
+    
+    @_reads
+    def get_candidate(self, candidate_id: str) -> Optional[Dict]:
+        """Candidato por ID en O(1)"""
+        row = self.candidate_index.row_of(candidate_id)
+        return self.candidates_db[row] if row is not None else None
+    
+    @_reads
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Posición por ID en O(1)"""
+        row = self.job_index.row_of(job_id)
+        return self.jobs_db[row] if row is not None else None
+    
+    def _build_embeddings(self) -> None:
+        """Codificar todos los perfiles y descripciones (una sola vez)"""
+        self.candidate_index.add(
+            [c["id"] for c in self.candidates_db],
+            [c["profile"] for c in self.candidates_db]
+        )
+        self.job_index.add(
+            [j["id"] for j in self.jobs_db],
+            [j["description"] for j in self.jobs_db]
+        )
+    
+    # =========================================================================
+    # MODIFICACIÓN DE LA BASE DE DATOS
+    # =========================================================================
+    
+    @_writes
+    def add_candidate(self, candidate: Dict) -> None:
+        """Agregar un candidato (solo se codifica su perfil)"""
+        self._add_record(self.candidates_db, self.candidate_index, candidate, "profile", CANDIDATE_FIELDS)
+        self.skill_index.add(candidate["skills"])
+    
+    @_writes
+    def update_candidate(self, candidate_id: str, **fields) -> Dict:
+        """Modificar un candidato; se re-codifica solo si cambia el perfil"""
+        candidate = self._update_record(self.candidates_db, self.candidate_index, candidate_id, "profile", fields)
+        if "skills" in fields:
+            self.skill_index.update(self.candidate_index.row_of(candidate_id), candidate["skills"])
+        return candidate
+    
+    @_writes
+    def remove_candidate(self, candidate_id: str) -> None:
+        """Eliminar un candidato"""
+        row = self.candidate_index.row_of(candidate_id)
+        self._remove_record(self.candidates_db, self.candidate_index, candidate_id)
+        self.skill_index.remove(row)
+    
+    @_writes
+    def add_job(self, job: Dict) -> None:
+        """Agregar una posición (solo se codifica su descripción)"""
+        self._add_record(self.jobs_db, self.job_index, job, "description", JOB_FIELDS)
+    
+    @_writes
+    def update_job(self, job_id: str, **fields) -> Dict:
+        """Modificar una posición; se re-codifica solo si cambia la descripción"""
+        return self._update_record(self.jobs_db, self.job_index, job_id, "description", fields)
+    
+    @_writes
+    def remove_job(self, job_id: str) -> None:
+        """Eliminar una posición"""
+        self._remove_record(self.jobs_db, self.job_index, job_id)
+    
+    def _add_record(
+        self,
+        db: List[Dict],
+        index: CandidateIndex,
+        record: Dict,
+        text_field: str,
+        required: Tuple[str, ...]
+    ) -> None:
+        # Validar antes de tocar índice, DB o skill_index: un fallo a mitad
+        # de camino los dejaría desalineados
+        _check_record(record, required)
+        index.add([record["id"]], [record[text_field]])
+        db.append(record)
+        self._on_db_change()
+    
+    def _update_record(
+        self,
+        db: List[Dict],
+        index: CandidateIndex,
+        record_id: str,
+        text_field: str,
+        fields: Dict
+    ) -> Dict:
+        if fields.get("id", record_id) != record_id:
+            raise ValueError("No se puede cambiar el ID de un registro")
+        _check_record(fields, ())
+        
+        row = index.row_of(record_id)
+        if row is None:
+            raise KeyError(f"ID no encontrado: {record_id}")
+        
+        record = db[row]
+        if text_field in fields and fields[text_field] != record[text_field]:
+            index.update([record_id], [fields[text_field]])
+        record.update(fields)
+        self._on_db_change()
+        return record
+    
+    def _remove_record(self, db: List[Dict], index: CandidateIndex, record_id: str) -> None:
+        row = index.row_of(record_id)
+        if row is None:
+            raise KeyError(f"ID no encontrado: {record_id}")
+        
+        # El índice mueve la última fila al hueco: replicarlo en la DB
+        # para que la fila i de la matriz siga siendo el registro i
+        index.remove(record_id)
+        db[row] = db[-1]
+        db.pop()
+        self._on_db_change()
+    
+    def _load_skill_index(self) -> SkillIndex:
+        """Cargar el índice de skills guardado o construirlo desde la DB"""
+        ids = [c["id"] for c in self.candidates_db]
+        
+        if self.skill_index_path and Path(self.skill_index_path).exists():
+            skill_index, saved_ids = SkillIndex.load(self.skill_index_path)
+            if saved_ids == ids:
+                return skill_index
+            print("⚠️  Índice de skills desactualizado, reconstruyendo")
+        
+        skill_index = SkillIndex()
+        skill_index.add_many(c["skills"] for c in self.candidates_db)
+        if self.skill_index_path:
+            skill_index.save(self.skill_index_path, ids)
+        return skill_index
+    
+    @_writes
+    def save_skill_index(self, path: Optional[str] = None) -> Path:
+        """Guardar el índice de skills (default: skill_index_path)"""
+        path = path or self.skill_index_path
+        if not path:
+            raise ValueError("Ruta del índice de skills no especificada")
+        return self.skill_index.save(path, [c["id"] for c in self.candidates_db])
+    
+    def _on_db_change(self) -> None:
+        """Invalidar todo lo derivado de la DB"""
+        self.db_version += 1
+        self._features.clear()
+        self.search_cache.clear()
+    
     # =========================================================================
     # HERRAMIENTAS: BÚSQUEDA
     # =========================================================================
     
-    def search_candidates(self, query: str, top_k: int = 5) -> List[Dict]:
+    @_reads
+    def search_candidates(
+        self,
+        query: str,
+        top_k: int = 5,
+        skills_all: Optional[List[str]] = None,
+        skills_any: Optional[List[str]] = None,
+        min_skill_overlap: int = 1,
+        filters: Optional[List[Tuple]] = None,
+        mode: str = "dense",
+        fusion: str = "rrf"
+    ) -> List[Dict]:
         """
         Buscar candidatos por similaridad
         
         Herramienta 1: Búsqueda de candidatos
+        
+        Con filtros de skills se pre-filtra con el índice invertido y solo
+        se puntúan las filas que los cumplen (p. ej. "debe saber Kubernetes").
+        `filters` son condiciones de metadata (campo, operador, valor) sobre
+        years y location, p. ej. [("years", ">=", 5), ("location", "in", ["Boston"])].
+        `mode` = dense, lexical (BM25), hybrid (fusión `fusion`: rrf o
+        weighted) o lexical_first; ver CandidateIndex.search_rows.
+        Los resultados se guardan en search_cache.
         """
-        # Convertir candidatos a textos para búsqueda
-        candidate_texts = [c["profile"] for c in self.candidates_db]
+        def search() -> List[Dict]:
+            rows = self.filter_candidate_rows(skills_all, skills_any, min_skill_overlap, filters)
+            
+            # Solo se codifica la query; los perfiles ya están en la matriz
+            row_ids, scores = self.search_candidate_rows(query, top_k, rows=rows, mode=mode, fusion=fusion)
+            return self._with_scores(self.candidates_db, row_ids, scores)
         
-        # Usar modelo para búsqueda
-        results = self.model.search(query, candidate_texts, top_k=top_k)
+        key = ("candidates", query, top_k, skills_all, skills_any, min_skill_overlap, filters, mode, fusion)
+        return self._cached_search(key, search)
+    
+    @_reads
+    def filter_candidate_rows(
+        self,
+        skills_all: Optional[List[str]] = None,
+        skills_any: Optional[List[str]] = None,
+        min_skill_overlap: int = 1,
+        filters: Optional[List[Tuple]] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Filas de candidates_db que cumplen los filtros de skills y metadata
         
-        # Mapear resultados a candidatos completos
-        matched_candidates = []
-        for result in results:
-            # Encontrar el candidato correspondiente
-            for i, ctext in enumerate(candidate_texts):
-                if ctext == result["candidate"]:
-                    candidate = self.candidates_db[i].copy()
-                    candidate["match_score"] = result["similarity"]
-                    matched_candidates.append(candidate)
-                    break
+        Args:
+            skills_all: Skills obligatorios (AND)
+            skills_any: Skills opcionales (OR)
+            min_skill_overlap: Mínimo de skills_any que debe tener el candidato
+            filters: Condiciones (campo, operador, valor) sobre years / location
         
-        # Caché para siguiente búsqueda similar
-        self.search_cache[query] = matched_candidates
+        Returns:
+            Filas ordenadas, o None si no hay filtros (= todas)
+        """
+        if not skills_all and not skills_any and not filters:
+            return None
         
-        return matched_candidates
+        rows = self.skill_index.match(skills_all, skills_any, min_skill_overlap)
+        if filters:
+            rows = rows[self._candidate_columns().mask(filters)[rows]]
+        return rows
     
-    def search_jobs(self, candidate_profile: str, top_k: int = 3) -> List[Dict]:
+    @_reads
+    def search_jobs(
+        self,
+        candidate_profile: str,
+        top_k: int = 3,
+        filters: Optional[List[Tuple]] = None,
+        mode: str = "dense",
+        fusion: str = "rrf"
+    ) -> List[Dict]:
         """
         Buscar posiciones apropiadas para un candidato
         
         Herramienta 2: Búsqueda de posiciones
+        
+        `filters` son condiciones sobre years_required, salary_min,
+        salary_max (parseados de salary_range) o title. `mode` / `fusion`
+        como en search_candidates.
         """
-        job_texts = [j["description"] for j in self.jobs_db]
+        def search() -> List[Dict]:
+            rows = self._job_columns().rows(filters) if filters else None
+            row_ids, scores = self.search_job_rows(candidate_profile, top_k, rows=rows, mode=mode, fusion=fusion)
+            return self._with_scores(self.jobs_db, row_ids, scores)
         
-        results = self.model.search(candidate_profile, job_texts, top_k=top_k)
+        key = ("jobs", candidate_profile, top_k, filters, mode, fusion)
+        return self._cached_search(key, search)
+    
+    def _cached_search(self, key: Tuple, search) -> List[Dict]:
+        """
+        Resultado de search() vía search_cache
         
-        matched_jobs = []
-        for result in results:
-            for i, jtext in enumerate(job_texts):
-                if jtext == result["candidate"]:
-                    job = self.jobs_db[i].copy()
-                    job["match_score"] = result["similarity"]
-                    matched_jobs.append(job)
-                    break
+        La clave se completa con db_version y se hace hashable (listas de
+        filtros -> tuplas). Siempre se retornan copias de los registros
+        para que el llamador no modifique lo cacheado.
+        """
+        key = _freeze(key) + (self.db_version,)
+        results = self.search_cache.get(key)
+        if results is None:
+            results = search()
+            self.search_cache.put(key, results)
+        return [record.copy() for record in results]
+    
+    @_reads
+    def search_candidate_rows(
+        self,
+        query: str,
+        top_k: int = 5,
+        rows: Optional[np.ndarray] = None,
+        mode: str = "dense",
+        fusion: str = "rrf"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Buscar candidatos y retornar filas de candidates_db (sin construir dicts)
         
-        return matched_jobs
+        Args:
+            rows: Pre-filtro: buscar solo entre estas filas
+            mode: dense, lexical, hybrid o lexical_first
+            fusion: rrf o weighted (modo hybrid)
+        
+        Returns:
+            (filas, scores) ordenados por score descendente
+        """
+        return self._search_rows(self.candidate_index, query, top_k, rows, mode, fusion)
+    
+    @_reads
+    def search_job_rows(
+        self,
+        candidate_profile: str,
+        top_k: int = 3,
+        rows: Optional[np.ndarray] = None,
+        mode: str = "dense",
+        fusion: str = "rrf"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Igual que search_candidate_rows pero sobre jobs_db"""
+        return self._search_rows(self.job_index, candidate_profile, top_k, rows, mode, fusion)
+    
+    def _search_rows(
+        self,
+        index: CandidateIndex,
+        query: str,
+        top_k: int,
+        rows: Optional[np.ndarray],
+        mode: str,
+        fusion: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # El modo léxico no necesita codificar la query
+        query_emb = None if mode == "lexical" else normalize_embeddings(self.model.encode(query))
+        return index.search_rows(query_emb, top_k, query=query, mode=mode, fusion=fusion, rows=rows)
+    
+    @staticmethod
+    def _with_scores(db: List[Dict], rows: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        """Copias de los registros de las filas dadas con su match_score"""
+        matched = []
+        for row, score in zip(rows, scores):
+            record = db[row].copy()
+            record["match_score"] = float(score)
+            matched.append(record)
+        return matched
     
     # =========================================================================
     # HERRAMIENTAS: MATCHING Y SCORING
     # =========================================================================
     
+    @_reads
     def calculate_candidate_job_match(
         self, 
         candidate_id: str, 
@@ -196,39 +692,150 @@ class AdvancedRecruitmentAgent:
         
         Herramienta 3: Matching detallado
         """
-        # Encontrar candidato y job
-        candidate = next((c for c in self.candidates_db if c["id"] == candidate_id), None)
-        job = next((j for j in self.jobs_db if j["id"] == job_id), None)
+        # Encontrar candidato y job (O(1))
+        candidate_row = self.candidate_index.row_of(candidate_id)
+        job_row = self.job_index.row_of(job_id)
         
-        if not candidate or not job:
+        if candidate_row is None or job_row is None:
             return {"error": "Candidato o posición no encontrados"}
         
-        # Calcular similitud de perfiles
-        profile_similarity = self.model.similarity(
-            candidate["profile"],
-            job["description"]
-        )
+        return self._match_rows(candidate_row, job_row)
+    
+    def _match_rows(self, candidate_row: int, job_row: int) -> Dict:
+        """Matching detallado entre una fila de candidates_db y una de jobs_db"""
+        scores = self.score_matrix(job_rows=[job_row], candidate_rows=[candidate_row])
+        return self._match_result(scores, 0, 0, candidate_row, job_row)
+    
+    @_reads
+    def match_all_candidates(self, job_id: str, top_k: Optional[int] = None) -> List[Dict]:
+        """
+        Matching de todos los candidatos con una posición en una pasada
+        
+        Los tres componentes se calculan como operaciones de arrays sobre
+        los embeddings y features pre-calculados (ver score_matrix).
         
-        # Calcular skills match
-        skills_match = len(set(candidate["skills"]) & set(job["required_skills"])) / len(job["required_skills"])
+        Args:
+            job_id: ID de la posición
+            top_k: Mejores resultados a retornar (None = ranking completo)
+        
+        Returns:
+            Resultados como los de calculate_candidate_job_match, ordenados
+            por overall_score (lista vacía si la posición no existe)
+        """
+        job_row = self.job_index.row_of(job_id)
+        if job_row is None:
+            return []
         
-        # Calcular experience match
-        experience_match = 1.0 if candidate["years"] >= job["years_required"] else candidate["years"] / job["years_required"]
+        scores = self.score_matrix(job_rows=[job_row])
+        order = top_k_indices(scores["overall_score"][0], top_k)
+        return [self._match_result(scores, 0, row, row, job_row) for row in order]
+    
+    @_reads
+    def score_matrix(
+        self,
+        job_rows: Optional[List[int]] = None,
+        candidate_rows: Optional[List[int]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Scores de matching M×N entre posiciones y candidatos
         
-        # Score combinado
-        overall_score = (profile_similarity * 0.5 + skills_match * 0.3 + experience_match * 0.2)
+        Args:
+            job_rows: Filas de jobs_db (None = todas)
+            candidate_rows: Filas de candidates_db (None = todas)
+        
+        Returns:
+            Dict con matrices (M, N): profile_similarity, skills_match,
+            experience_match y overall_score (pesos 0.5 / 0.3 / 0.2)
+        """
+        candidate_skills, candidate_years = self._candidate_features()
+        job_skills, job_years, job_required = self._job_features()
+        candidate_embeddings = self.candidate_embeddings
+        job_embeddings = self.job_embeddings
+        
+        if candidate_rows is not None:
+            candidate_rows = np.asarray(candidate_rows, dtype=np.int64)
+            candidate_embeddings = candidate_embeddings[candidate_rows]
+            candidate_skills = candidate_skills[candidate_rows]
+            candidate_years = candidate_years[candidate_rows]
+        if job_rows is not None:
+            job_rows = np.asarray(job_rows, dtype=np.int64)
+            job_embeddings = job_embeddings[job_rows]
+            job_skills = job_skills[job_rows]
+            job_years = job_years[job_rows]
+            job_required = job_required[job_rows]
+        
+        return score_matches(
+            job_embeddings, job_skills, job_years,
+            candidate_embeddings, candidate_skills, candidate_years,
+            job_required=job_required
+        )
+    
+    def _match_result(self, scores: Dict[str, np.ndarray], i: int, j: int, candidate_row: int, job_row: int) -> Dict:
+        """Construir el dict de resultado para la celda (i, j) de score_matrix"""
+        candidate = self.candidates_db[candidate_row]
+        job = self.jobs_db[job_row]
+        overall_score = float(scores["overall_score"][i, j])
         
         return {
             "candidate": candidate,
             "job": job,
-            "profile_similarity": float(profile_similarity),
-            "skills_match": float(skills_match),
-            "experience_match": float(experience_match),
-            "overall_score": float(overall_score),
+            "profile_similarity": float(scores["profile_similarity"][i, j]),
+            "skills_match": float(scores["skills_match"][i, j]),
+            "experience_match": float(scores["experience_match"][i, j]),
+            "overall_score": overall_score,
             "recommendation": self._get_recommendation(overall_score),
             "details": self._get_match_details(candidate, job)
         }
     
+    def _feature(self, name: str, build):
+        """Feature derivada de la DB, construida una sola vez por db_version"""
+        value = self._features.get(name)
+        if value is None:
+            # Varias lecturas pueden llegar a la vez: solo una la construye
+            with self._features_lock:
+                value = self._features.get(name)
+                if value is None:
+                    value = self._features[name] = build()
+        return value
+    
+    def _candidate_features(self) -> Tuple:
+        """(skills multi-hot CSR, años float32) alineados con candidates_db"""
+        return self._feature("candidates", lambda: (
+            self.skill_vocabulary.multi_hot(c["skills"] for c in self.candidates_db),
+            self._candidate_columns().numeric["years"]
+        ))
+    
+    def _job_features(self) -> Tuple:
+        """
+        (skills requeridos multi-hot CSR, años requeridos float32, largo de
+        required_skills con repetidos) alineados con jobs_db
+        """
+        return self._feature("jobs", lambda: (
+            self.skill_vocabulary.multi_hot(j["required_skills"] for j in self.jobs_db),
+            self._job_columns().numeric["years_required"],
+            np.array([len(j["required_skills"]) for j in self.jobs_db], dtype=np.float32)
+        ))
+    
+    def _candidate_columns(self) -> ColumnStore:
+        """Metadata columnar de candidatos (years, location) para filtros"""
+        return self._feature("candidate_columns", lambda: ColumnStore(
+            self.candidates_db,
+            numeric={"years": lambda c: c["years"]},
+            categorical={"location": lambda c: c.get("location")}
+        ))
+    
+    def _job_columns(self) -> ColumnStore:
+        """Metadata columnar de posiciones (años, rango salarial, título)"""
+        return self._feature("job_columns", lambda: ColumnStore(
+            self.jobs_db,
+            numeric={
+                "years_required": lambda j: j["years_required"],
+                "salary_min": lambda j: parse_salary_range(j.get("salary_range"))[0],
+                "salary_max": lambda j: parse_salary_range(j.get("salary_range"))[1],
+            },
+            categorical={"title": lambda j: j["title"]}
+        ))
+    
     def _get_recommendation(self, score: float) -> str:
         """Obtener recomendación basada en score"""
         if score >= 0.8:
@@ -259,53 +866,110 @@ Experiencia requerida: {job['years_required']} años
     # HERRAMIENTAS: ANÁLISIS Y RECOMENDACIONES
     # =========================================================================
     
-    def get_top_candidates_for_job(self, job_id: str, top_k: int = 5) -> List[Dict]:
+    @_reads
+    def get_top_candidates_for_job(
+        self,
+        job_id: str,
+        top_k: int = 5,
+        retrieve_k: Optional[int] = None,
+        return_stats: bool = False
+    ):
         """
         Obtener top-k candidatos para una posición
         
         Herramienta 4: Análisis de posición
-        """
-        job = next((j for j in self.jobs_db if j["id"] == job_id), None)
-        if not job:
-            return []
         
-        # Buscar candidatos similares
-        candidates = self.search_candidates(job["description"], top_k=len(self.candidates_db))
+        Dos etapas: la búsqueda por embeddings (ANN si está activado)
+        recupera retrieve_k candidatos y solo esos pasan por el scoring
+        completo (perfil + skills + experiencia). El costo por petición
+        queda acotado por retrieve_k, no por el tamaño del pool.
         
-        # Calcular scores completos
-        results = []
-        for candidate in candidates[:top_k]:
-            match_data = self.calculate_candidate_job_match(candidate["id"], job_id)
-            results.append(match_data)
+        Args:
+            job_id: ID de la posición
+            top_k: Resultados a retornar
+            retrieve_k: Candidatos de la primera etapa (None = self.retrieve_k)
+            return_stats: Retornar también tiempos y conteos por etapa
         
-        # Ordenar por score
-        results.sort(key=lambda x: x["overall_score"], reverse=True)
+        Returns:
+            Resultados ordenados por overall_score, o (resultados, stats)
+        """
+        job_row = self.job_index.row_of(job_id)
+        if job_row is None:
+            return ([], {}) if return_stats else []
         
-        return results
+        results, stats = self._retrieve_and_rerank(top_k, retrieve_k, job_row=job_row)
+        self.pipeline_stats["candidates_for_job"] = stats
+        return (results, stats) if return_stats else results
     
-    def get_job_recommendations_for_candidate(self, candidate_id: str, top_k: int = 3) -> List[Dict]:
+    @_reads
+    def get_job_recommendations_for_candidate(
+        self,
+        candidate_id: str,
+        top_k: int = 3,
+        retrieve_k: Optional[int] = None,
+        return_stats: bool = False
+    ):
         """
         Obtener recomendaciones de posiciones para un candidato
         
         Herramienta 5: Recomendaciones personalizadas
+        
+        Mismo pipeline de dos etapas que get_top_candidates_for_job.
         """
-        candidate = next((c for c in self.candidates_db if c["id"] == candidate_id), None)
-        if not candidate:
-            return []
+        candidate_row = self.candidate_index.row_of(candidate_id)
+        if candidate_row is None:
+            return ([], {}) if return_stats else []
+        
+        results, stats = self._retrieve_and_rerank(top_k, retrieve_k, candidate_row=candidate_row)
+        self.pipeline_stats["jobs_for_candidate"] = stats
+        return (results, stats) if return_stats else results
+    
+    def _retrieve_and_rerank(
+        self,
+        top_k: int,
+        retrieve_k: Optional[int],
+        job_row: Optional[int] = None,
+        candidate_row: Optional[int] = None
+    ) -> Tuple[List[Dict], Dict]:
+        """
+        Recuperar por similitud y re-rankear con score_matrix
         
-        # Buscar posiciones similares
-        jobs = self.search_jobs(candidate["profile"], top_k=len(self.jobs_db))
+        Con job_row se buscan candidatos para esa posición; con
+        candidate_row, posiciones para ese candidato.
+        """
+        if job_row is not None:
+            index, query_emb = self.candidate_index, self.job_embeddings[job_row]
+        else:
+            index, query_emb = self.job_index, self.candidate_embeddings[candidate_row]
+        retrieve_k = max(retrieve_k or self.retrieve_k, top_k)
         
-        # Calcular scores
-        results = []
-        for job in jobs[:top_k]:
-            match_data = self.calculate_candidate_job_match(candidate_id, job["id"])
-            results.append(match_data)
+        # Etapa 1: recuperación barata (ANN o producto punto sobre la matriz)
+        start = time.perf_counter()
+        rows, _ = index.search_embedding(query_emb, retrieve_k)
+        retrieved = time.perf_counter()
         
-        # Ordenar por score
-        results.sort(key=lambda x: x["overall_score"], reverse=True)
+        # Etapa 2: scoring completo solo de las filas recuperadas
+        if job_row is not None:
+            scores = self.score_matrix([job_row], rows)
+            order = top_k_indices(scores["overall_score"][0], top_k)
+            results = [self._match_result(scores, 0, i, rows[i], job_row) for i in order]
+        else:
+            scores = self.score_matrix(rows, [candidate_row])
+            order = top_k_indices(scores["overall_score"][:, 0], top_k)
+            results = [self._match_result(scores, i, 0, candidate_row, rows[i]) for i in order]
+        reranked = time.perf_counter()
         
-        return results
+        stats = {
+            "pool_size": len(index),
+            "retrieve_k": retrieve_k,
+            "retrieved": int(len(rows)),
+            "returned": len(results),
+            "ann": index.ann is not None,
+            "retrieve_ms": (retrieved - start) * 1000,
+            "rerank_ms": (reranked - retrieved) * 1000,
+            "total_ms": (reranked - start) * 1000,
+        }
+        return results, stats
     
     # =========================================================================
     # PROCESAMIENTO CONVERSACIONAL
@@ -322,6 +986,15 @@ Experiencia requerida: {job['years_required']} años
         
         Para este ejemplo, usamos reglas simples
         """
+        return self.handle_query(user_input)["response"]
+    
+    @_reads
+    def handle_query(self, user_input: str) -> Dict:
+        """
+        Como process_user_input, pero retorna {"response", "timestamp"} de
+        esta misma llamada (con varios threads, conversation_history[-1]
+        puede ser ya de otra query)
+        """
         
         # Agregar a historial
         self.conversation_history.append({
@@ -349,13 +1022,14 @@ Experiencia requerida: {job['years_required']} años
             response = self._show_help()
         
         # Agregar respuesta al historial
-        self.conversation_history.append({
+        entry = {
             "timestamp": datetime.now().isoformat(),
             "assistant": response,
             "type": "assistant"
-        })
+        }
+        self.conversation_history.append(entry)
         
-        return response
+        return {"response": response, "timestamp": entry["timestamp"]}
     
     def _handle_search_request(self, user_input: str) -> str:
         """Manejar request de búsqueda"""
@@ -435,7 +1109,7 @@ DETALLES:
 💡 RECOMENDACIONES DE POSICIONES
 ═══════════════════════════════════════════
 
-Para: {self.candidates_db[[c['id'] for c in self.candidates_db].index(candidate_id)]['name']}
+Para: {self.get_candidate(candidate_id)['name']}
 
 """
         for i, rec in enumerate(recommendations, 1):
@@ -463,7 +1137,7 @@ Para: {self.candidates_db[[c['id'] for c in self.candidates_db].index(candidate_
 👥 TOP CANDIDATOS
 ═══════════════════════════════════════════
 
-Para posición: {self.jobs_db[[j['id'] for j in self.jobs_db].index(job_id)]['title']}
+Para posición: {self.get_job(job_id)['title']}
 
 """
         for i, match in enumerate(results, 1):
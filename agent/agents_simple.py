@@ -224,22 +224,36 @@ class SimpleRecruitmentAgent:
     def _handle_clustering(self, query: str) -> str:
         """Manejar agrupación de candidatos"""
         
-        # Extraer número de clusters de la query
-        match = re.search(r"(\d+)\s*grupo", query.lower())
-        n_clusters = int(match.group(1)) if match else 3
-        
-        # Asegurar que n_clusters sea válido
-        n_clusters = min(max(2, n_clusters), len(self.candidates_db))
-        
-        # Realizar clustering
-        clusters = self.model.cluster(self.candidates_db, n_clusters=n_clusters)
-        
-        response = f"🎯 Clustering: {len(self.candidates_db)} candidatos en {len(clusters)} grupos\n\n"
-        
-        for cluster_id, candidates in clusters.items():
-            response += f"📌 Grupo {cluster_id + 1}:\n"
-            for candidate in candidates:
-                response += f"   • {candidate}\n"
+        # Extraer número de clusters de la query ("3 grupos", "4 clusters");
+        # sin número se elige automáticamente
+        match = re.search(r"(\d+)\s*(?:grupos?|clusters?)\b", query.lower())
+        
+        if match:
+            # Asegurar que n_clusters sea válido
+            n_clusters = min(max(2, int(match.group(1))), max(len(self.candidates_db) - 1, 1))
+            result = self.model.cluster_summary(self.candidates_db, n_clusters=n_clusters)
+            response = f"🎯 Clustering: {len(self.candidates_db)} candidatos en {result['n_clusters']} grupos\n\n"
+        else:
+            result = self.model.cluster_summary(
+                self.candidates_db,
+                n_clusters="auto",
+                max_clusters=min(10, len(self.candidates_db) - 1)
+            )
+            response = (
+                f"🎯 Clustering: {len(self.candidates_db)} candidatos en {result['n_clusters']} grupos "
+                f"(elegido por {result['metric']})\n\n"
+            )
+        
+        # Resumen por grupo en vez de listar todos los miembros
+        for cluster_id, summary in sorted(result["summaries"].items()):
+            response += f"📌 Grupo {cluster_id + 1} ({summary['size']} candidatos)\n"
+            if summary["top_terms"]:
+                terms = ", ".join(term for term, _ in summary["top_terms"][:5])
+                response += f"   Términos: {terms}\n"
+            response += f"   Más representativo: {summary['medoid']}\n"
+            for candidate in summary["representatives"]:
+                if candidate != summary["medoid"]:
+                    response += f"   • {candidate}\n"
             response += "\n"
         
         return response
@@ -0,0 +1,463 @@
+"""
+BÚSQUEDA APROXIMADA DE VECINOS (ANN)
+Backends intercambiables para CandidateIndex cuando el corpus es demasiado
+grande para fuerza bruta
+
+Backends:
+    numpy-ivf  - IVF (inverted file) en NumPy puro, siempre disponible
+    hnswlib    - HNSW nativo (pip install hnswlib)
+    faiss-ivf  - IVF nativo de FAISS (pip install faiss-cpu)
+    int8       - Corpus cuantizado a int8, recorrido completo (ver quantization.py)
+    binary     - Códigos de 1 bit con distancia de Hamming (ver quantization.py)
+    pq         - Product quantization con tablas ADC (ver quantization.py)
+
+Todos trabajan con vectores normalizados (producto punto = coseno) y con
+etiquetas enteras estables: el índice de candidatos traduce etiqueta -> fila.
+"""
+
+import inspect
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from quantization import QUANTIZED_BACKENDS
+
+
+def kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 20,
+    sample_size: int = 100000,
+    seed: int = 42
+) -> np.ndarray:
+    """
+    K-means esférico (centroides normalizados) en NumPy
+    
+    Args:
+        vectors: Matriz (n, dim) normalizada
+        n_clusters: Número de centroides
+        n_iter: Iteraciones de Lloyd
+        sample_size: Máximo de filas usadas para entrenar
+        seed: Semilla para muestreo e inicialización
+    
+    Returns:
+        Centroides (n_clusters, dim) float32 normalizados
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    if n > sample_size:
+        sample = np.asarray(vectors[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+    else:
+        sample = np.asarray(vectors, dtype=np.float32)
+    
+    n_clusters = max(1, min(n_clusters, len(sample)))
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    
+    for _ in range(n_iter):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        
+        # Centroides vacíos se re-siembran con un punto aleatorio
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    
+    return centroids
+
+
+# =============================================================================
+# BACKEND: IVF EN NUMPY
+# =============================================================================
+
+class NumpyIVFIndex:
+    """
+    Índice IVF en NumPy puro
+    
+    Los vectores se reparten en `nlist` listas según su centroide más
+    cercano; una búsqueda solo recorre las `nprobe` listas más cercanas
+    a la query. Más nprobe = más recall y más latencia.
+    
+    Los centroides se entrenan en build() y add() solo asigna cada vector
+    nuevo a su lista: si los datos crecen o cambian mucho, las listas se
+    desequilibran y el recall para un mismo nprobe baja. Por eso se
+    cuentan las inserciones (incluidas las de actualizaciones) desde el
+    último entrenamiento y, cuando superan `retrain_factor` veces el
+    tamaño entrenado, se re-entrena con todos los vectores vivos. También
+    se puede forzar con retrain().
+    """
+    
+    name = "numpy-ivf"
+    
+    def __init__(
+        self,
+        dimension: int,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        seed: int = 42,
+        retrain_factor: Optional[float] = 2.0
+    ):
+        """
+        Args:
+            dimension: Dimensión de los vectores
+            nlist: Número de listas (None = 4 * sqrt(n) al construir)
+            nprobe: Listas visitadas por búsqueda
+            seed: Semilla del k-means
+            retrain_factor: Inserciones desde el entrenamiento, relativas al
+                            tamaño entrenado, que disparan retrain()
+                            (None = nunca re-entrenar automáticamente)
+        """
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.retrain_factor = retrain_factor
+        self.trained_size = 0
+        self.added_since_training = 0
+        self.retrains = 0
+        
+        self.centroids: Optional[np.ndarray] = None
+        self._vectors: List[np.ndarray] = []
+        self._labels: List[np.ndarray] = []
+        self._sizes: List[int] = []
+        self._where: Dict[int, Tuple[int, int]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._where)
+    
+    def build(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        """Entrenar centroides y repartir todos los vectores"""
+        n = len(vectors)
+        if n == 0:
+            # Nada con qué entrenar: el primer add() construye el índice
+            self.centroids = None
+            self._vectors, self._labels, self._sizes, self._where = [], [], [], {}
+            self.trained_size = self.added_since_training = 0
+            return
+        
+        nlist = self.nlist or int(4 * np.sqrt(n))
+        self.centroids = kmeans(vectors, max(1, min(nlist, n)), seed=self.seed)
+        
+        k = len(self.centroids)
+        self._vectors = [np.zeros((0, self.dimension), dtype=np.float32) for _ in range(k)]
+        self._labels = [np.zeros(0, dtype=np.int64) for _ in range(k)]
+        self._sizes = [0] * k
+        self._where = {}
+        self._assign(vectors, labels)
+        self.trained_size = n
+        self.added_since_training = 0
+    
+    def retrain(self) -> None:
+        """Re-entrenar centroides (y nlist automático) con los vectores actuales"""
+        vectors = [self._vectors[i][:size] for i, size in enumerate(self._sizes)]
+        labels = [self._labels[i][:size] for i, size in enumerate(self._sizes)]
+        if not vectors:
+            return
+        self.build(np.concatenate(vectors), np.concatenate(labels))
+        self.retrains += 1
+    
+    def add(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        """Inserción incremental: cada vector va a la lista de su centroide"""
+        if self.centroids is None:
+            self.build(vectors, labels)
+            return
+        
+        self._assign(vectors, labels)
+        self.added_since_training += len(vectors)
+        if (self.retrain_factor is not None
+                and self.added_since_training > self.retrain_factor * self.trained_size):
+            self.retrain()
+    
+    def _assign(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        labels = np.asarray(labels, dtype=np.int64)
+        for start in range(0, len(vectors), 65536):
+            block = np.asarray(vectors[start:start + 65536], dtype=np.float32)
+            block_labels = labels[start:start + 65536]
+            assignments = np.argmax(block @ self.centroids.T, axis=1)
+            
+            for list_id in np.unique(assignments):
+                members = assignments == list_id
+                self._append(int(list_id), block[members], block_labels[members])
+    
+    def remove(self, labels) -> None:
+        """Eliminar etiquetas (swap con la última posición de su lista)"""
+        for label in labels:
+            list_id, pos = self._where.pop(int(label))
+            last = self._sizes[list_id] - 1
+            
+            if pos != last:
+                moved = int(self._labels[list_id][last])
+                self._vectors[list_id][pos] = self._vectors[list_id][last]
+                self._labels[list_id][pos] = moved
+                self._where[moved] = (list_id, pos)
+            self._sizes[list_id] = last
+    
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k aproximado
+        
+        Returns:
+            (etiquetas, scores) ordenados por score descendente
+        """
+        if self.centroids is None or not self._where:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        
+        labels = np.concatenate([self._labels[p][:self._sizes[p]] for p in probes])
+        scores = np.concatenate([self._vectors[p][:self._sizes[p]] @ query for p in probes])
+        
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        winners = np.argpartition(-scores, k - 1)[:k]
+        winners = winners[np.argsort(-scores[winners], kind="stable")]
+        return labels[winners], scores[winners]
+    
+    def set_params(self, nprobe: Optional[int] = None, **params) -> None:
+        """Ajustar el balance recall/latencia"""
+        _reject_unknown(self.name, params)
+        if nprobe is not None:
+            self.nprobe = int(nprobe)
+    
+    def get_params(self) -> dict:
+        return {
+            "backend": self.name,
+            "nlist": len(self.centroids) if self.centroids is not None else self.nlist,
+            "nprobe": self.nprobe,
+            "trained_size": self.trained_size,
+            "added_since_training": self.added_since_training,
+            "retrain_factor": self.retrain_factor,
+            "retrains": self.retrains,
+        }
+    
+    def _append(self, list_id: int, vectors: np.ndarray, labels: np.ndarray) -> None:
+        size = self._sizes[list_id]
+        end = size + len(vectors)
+        
+        if end > len(self._vectors[list_id]):
+            capacity = max(end, 2 * len(self._vectors[list_id]), 16)
+            grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+            grown[:size] = self._vectors[list_id][:size]
+            grown_labels = np.zeros(capacity, dtype=np.int64)
+            grown_labels[:size] = self._labels[list_id][:size]
+            self._vectors[list_id] = grown
+            self._labels[list_id] = grown_labels
+        
+        self._vectors[list_id][size:end] = vectors
+        self._labels[list_id][size:end] = labels
+        for pos, label in enumerate(labels, start=size):
+            self._where[int(label)] = (list_id, pos)
+        self._sizes[list_id] = end
+
+
+# =============================================================================
+# BACKEND: HNSWLIB
+# =============================================================================
+
+class HnswlibIndex:
+    """HNSW nativo (hnswlib); `ef` controla recall/latencia en búsqueda"""
+    
+    name = "hnswlib"
+    
+    def __init__(self, dimension: int, M: int = 16, ef_construction: int = 200, ef: int = 64):
+        import hnswlib
+        
+        self.dimension = dimension
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._index = hnswlib.Index(space="ip", dim=dimension)
+        self._index.init_index(
+            max_elements=1024,
+            ef_construction=ef_construction,
+            M=M,
+            allow_replace_deleted=True
+        )
+        self._index.set_ef(ef)
+        self._count = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def build(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        self.add(vectors, labels)
+    
+    def add(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        labels = np.asarray(labels, dtype=np.int64)
+        needed = self._index.get_current_count() + len(labels)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        
+        for start in range(0, len(vectors), 65536):
+            self._index.add_items(
+                np.asarray(vectors[start:start + 65536], dtype=np.float32),
+                labels[start:start + 65536],
+                replace_deleted=True
+            )
+        self._count += len(labels)
+    
+    def remove(self, labels) -> None:
+        for label in labels:
+            self._index.mark_deleted(int(label))
+            self._count -= 1
+    
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self._count)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        self._index.set_ef(max(self.ef, k))
+        labels, distances = self._index.knn_query(np.asarray(query, dtype=np.float32), k=k)
+        # Espacio 'ip' de hnswlib: distancia = 1 - producto punto
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+    
+    def set_params(self, ef: Optional[int] = None, **params) -> None:
+        _reject_unknown(self.name, params)
+        if ef is not None:
+            self.ef = int(ef)
+    
+    def get_params(self) -> dict:
+        return {"backend": self.name, "M": self.M, "ef_construction": self.ef_construction, "ef": self.ef}
+
+
+# =============================================================================
+# BACKEND: FAISS
+# =============================================================================
+
+class FaissIVFIndex:
+    """IVF nativo de FAISS (producto interno); `nprobe` controla recall/latencia"""
+    
+    name = "faiss-ivf"
+    
+    def __init__(self, dimension: int, nlist: Optional[int] = None, nprobe: int = 8):
+        import faiss
+        
+        self._faiss = faiss
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._index = None
+        self._count = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def build(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        faiss = self._faiss
+        n = len(vectors)
+        nlist = max(1, min(self.nlist or int(4 * np.sqrt(max(n, 1))), n))
+        
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        self._index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        
+        train_size = min(n, max(nlist * 39, 10000))
+        train_rows = np.sort(np.random.default_rng(42).choice(n, train_size, replace=False))
+        self._index.train(np.asarray(vectors[train_rows], dtype=np.float32))
+        self._index.nprobe = self.nprobe
+        self._count = 0
+        self.add(vectors, labels)
+    
+    def add(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        if self._index is None:
+            self.build(vectors, labels)
+            return
+        
+        labels = np.asarray(labels, dtype=np.int64)
+        for start in range(0, len(vectors), 65536):
+            self._index.add_with_ids(
+                np.asarray(vectors[start:start + 65536], dtype=np.float32),
+                labels[start:start + 65536]
+            )
+        self._count += len(labels)
+    
+    def remove(self, labels) -> None:
+        removed = self._index.remove_ids(np.asarray(list(labels), dtype=np.int64))
+        self._count -= int(removed)
+    
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self._count)
+        if self._index is None or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        scores, labels = self._index.search(np.asarray(query, dtype=np.float32)[None, :], k)
+        valid = labels[0] >= 0
+        return labels[0][valid].astype(np.int64), scores[0][valid].astype(np.float32)
+    
+    def set_params(self, nprobe: Optional[int] = None, **params) -> None:
+        _reject_unknown(self.name, params)
+        if nprobe is not None:
+            self.nprobe = int(nprobe)
+            if self._index is not None:
+                self._index.nprobe = self.nprobe
+    
+    def get_params(self) -> dict:
+        nlist = self._index.nlist if self._index is not None else self.nlist
+        return {"backend": self.name, "nlist": nlist, "nprobe": self.nprobe}
+
+
+# =============================================================================
+# FACTORY
+# =============================================================================
+
+BACKENDS = {
+    NumpyIVFIndex.name: NumpyIVFIndex,
+    HnswlibIndex.name: HnswlibIndex,
+    FaissIVFIndex.name: FaissIVFIndex,
+    **QUANTIZED_BACKENDS,
+}
+
+
+def available_backends() -> List[str]:
+    """Backends utilizables en este entorno (numpy-ivf y los cuantizados siempre)"""
+    available = [NumpyIVFIndex.name, *QUANTIZED_BACKENDS]
+    for name, module in ((HnswlibIndex.name, "hnswlib"), (FaissIVFIndex.name, "faiss")):
+        try:
+            __import__(module)
+            available.append(name)
+        except ImportError:
+            pass
+    return available
+
+
+def create_ann_index(dimension: int, backend: str = "auto", **params):
+    """
+    Crear un índice ANN
+    
+    Args:
+        dimension: Dimensión de los vectores
+        backend: 'auto' (nativo si está instalado), 'numpy-ivf',
+                 'hnswlib', 'faiss-ivf', 'int8', 'binary' o 'pq'
+        **params: Parámetros del backend (nlist, nprobe, M, ef, ...)
+    
+    Returns:
+        Índice ANN vacío
+    """
+    if backend == "auto":
+        available = available_backends()
+        for preferred in (HnswlibIndex.name, FaissIVFIndex.name, NumpyIVFIndex.name):
+            if preferred in available:
+                backend = preferred
+                break
+        
+        # En modo auto se ignoran los parámetros de otros backends (ef vs nprobe)
+        accepted = inspect.signature(BACKENDS[backend].__init__).parameters
+        params = {key: value for key, value in params.items() if key in accepted}
+    
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend ANN desconocido: {backend} (opciones: {list(BACKENDS)})")
+    
+    try:
+        return BACKENDS[backend](dimension, **params)
+    except ImportError:
+        raise ImportError(f"Backend '{backend}' no instalado (disponibles: {available_backends()})")
+
+
+def _reject_unknown(backend: str, params: dict) -> None:
+    if params:
+        raise ValueError(f"Parámetros no soportados por {backend}: {sorted(params)}")
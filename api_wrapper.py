@@ -4,16 +4,19 @@ Permite acceder al modelo desde cualquier aplicación
 """
 
 import argparse
+import os
 import sys
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Union
 import numpy as np
 
 from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 import uvicorn
 
-from loader import load_model
+from loader import ModeloPortable, load_model, normalize_embeddings
+from candidate_index import CandidateIndex
+from serving import InferencePool, MicroBatcher, PoolSaturatedError
 
 
 # ============================================================================
@@ -67,10 +70,71 @@ class SearchResponse(BaseModel):
     results: List[SearchResult]
 
 
+class BatchSearchRequest(BaseModel):
+    """Solicitud de búsqueda de varias queries contra un corpus"""
+    queries: List[str]
+    candidates: List[str]
+    top_k: Optional[int] = 10
+
+
+class BatchSearchResponse(BaseModel):
+    """Respuesta de búsqueda por lotes (una SearchResponse por query)"""
+    total_queries: int
+    corpus_size: int
+    results: List[SearchResponse]
+
+
+class IndexUpsertRequest(BaseModel):
+    """Solicitud para agregar/actualizar candidatos del índice"""
+    ids: List[str]
+    texts: List[str]
+
+
+class IndexRemoveRequest(BaseModel):
+    """Solicitud para eliminar candidatos del índice"""
+    ids: List[str]
+
+
+class IndexSaveRequest(BaseModel):
+    """Solicitud para guardar el índice en disco"""
+    path: Optional[str] = None
+    dtype: str = "float32"
+
+
+class IndexSearchRequest(BaseModel):
+    """Solicitud de búsqueda sobre el índice"""
+    query: str
+    top_k: Optional[int] = 10
+    exact: bool = False
+    mode: str = "dense"
+    fusion: str = "rrf"
+
+
+class IndexSearchResult(BaseModel):
+    """Resultado individual de búsqueda en el índice"""
+    id: str
+    candidate: str
+    similarity: float
+    rank: int
+
+
+class IndexSearchResponse(BaseModel):
+    """Respuesta de búsqueda en el índice"""
+    query: str
+    total_results: int
+    index_size: int
+    results: List[IndexSearchResult]
+
+
 class ClusterRequest(BaseModel):
     """Solicitud de clustering"""
     texts: List[str]
-    n_clusters: int = 3
+    n_clusters: Union[int, str] = 3  # o "auto"
+    max_clusters: int = 10  # solo con "auto"
+    metric: str = "silhouette"  # solo con "auto": silhouette | davies_bouldin
+    summarize: bool = False  # centroide, medoide, representantes y términos por cluster
+    n_members: int = 3  # representantes por cluster (con summarize)
+    include_members: bool = True  # False: solo resúmenes, sin listar cada texto
 
 
 class ClusterResponse(BaseModel):
@@ -78,6 +142,31 @@ class ClusterResponse(BaseModel):
     n_clusters: int
     total_texts: int
     clusters: dict
+    metric: Optional[str] = None
+    scores: Optional[dict] = None  # score por k probado (solo con "auto")
+    summaries: Optional[dict] = None  # resumen por cluster (solo con summarize)
+
+
+class ClusterFitRequest(BaseModel):
+    """Agrupar un almacén de embeddings y guardar los centroides"""
+    store: str
+    n_clusters: int
+    name: Optional[str] = None
+    epochs: int = 3
+    warm_start: bool = True
+
+
+class ClusterAssignRequest(BaseModel):
+    """Asignar textos nuevos a clusters guardados"""
+    texts: List[str]
+    name: str
+
+
+class DedupeRequest(BaseModel):
+    """Detectar textos casi duplicados en un batch"""
+    texts: List[str]
+    ids: Optional[List[str]] = None  # por defecto, la posición de cada texto
+    threshold: float = 0.95  # coseno mínimo
 
 
 class InfoResponse(BaseModel):
@@ -87,6 +176,7 @@ class InfoResponse(BaseModel):
     model_type: str
     base_model: str
     training: Optional[dict] = None
+    cache: Optional[dict] = None
 
 
 # ============================================================================
@@ -99,31 +189,123 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Variable global para el modelo
+# Variables globales para el modelo y el índice de candidatos
 MODEL = None
+INDEX = None
+INDEX_PATH = None
 
+# Micro-batching de /embed, /similarity y /search
+BATCHER = None
+BATCH_CONFIG = {"max_batch_size": 64, "max_wait_ms": 5.0, "max_pending": 256}
 
-def initialize_model(model_path: str, device: str = "cpu"):
-    """Inicializar el modelo"""
-    global MODEL
-    MODEL = load_model(model_path, device=device)
+# Pool acotado de inferencia: los forward pass y el ranking corren fuera
+# del event loop; con el pool lleno se responde 503 en vez de encolar
+POOL = None
+POOL_CONFIG = {"max_workers": 2, "max_queue": 32}
+
+
+def initialize_model(
+    model_path: str,
+    device: str = "cpu",
+    batch_size: int = 32,
+    index_path: Optional[str] = None,
+    ann_backend: Optional[str] = None,
+    ann_rescore: int = 0,
+    cache_size: Optional[int] = None,
+    cache_mb: Optional[float] = None,
+    lexical: bool = False
+):
+    """
+    Inicializar el modelo y el índice de candidatos
+    
+    Si index_path apunta a un almacén existente se abre con memmap:
+    no se re-codifica nada y los workers comparten la misma matriz.
+    Con ann_backend se construye un índice ANN al cargar (ann_rescore:
+    re-scoring float32 de los candidatos del ANN). cache_size /
+    cache_mb activan la caché LRU de embeddings del modelo. lexical
+    activa el índice BM25 para los modos de búsqueda léxico/híbrido.
+    """
+    global MODEL, INDEX, INDEX_PATH
+    MODEL = load_model(
+        model_path,
+        device=device,
+        batch_size=batch_size,
+        cache_size=cache_size,
+        cache_bytes=int(cache_mb * 1024 * 1024) if cache_mb else None
+    )
+    INDEX_PATH = index_path
+    
+    if index_path and Path(MODEL._resolve_store(index_path), "header.json").exists():
+        INDEX = CandidateIndex.load(MODEL, index_path, ann=ann_backend, rescore=ann_rescore)
+    else:
+        INDEX = CandidateIndex(MODEL)
+        if ann_backend:
+            INDEX.enable_ann(ann_backend, rescore=ann_rescore)
+    if lexical:
+        INDEX.enable_lexical()
     print(f"✅ Modelo inicializado: {model_path}")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Evento de startup"""
+    # Con `uvicorn api_wrapper:app --workers N` cada worker se inicializa
+    # desde variables de entorno (MODEL_PATH, INDEX_PATH, ANN_BACKEND,
+    # ANN_RESCORE, DEVICE, LEXICAL, POOL_WORKERS, POOL_QUEUE)
+    if MODEL is None and os.environ.get("MODEL_PATH"):
+        initialize_model(
+            os.environ["MODEL_PATH"],
+            device=os.environ.get("DEVICE", "cpu"),
+            index_path=os.environ.get("INDEX_PATH"),
+            ann_backend=os.environ.get("ANN_BACKEND"),
+            ann_rescore=int(os.environ.get("ANN_RESCORE", 0)),
+            lexical=os.environ.get("LEXICAL", "").lower() in ("1", "true", "yes"),
+        )
+    
     if MODEL is None:
         raise RuntimeError("Modelo no inicializado. Use initialize_model() primero.")
+    
+    global BATCHER, POOL
+    POOL = InferencePool(
+        max_workers=int(os.environ.get("POOL_WORKERS", POOL_CONFIG["max_workers"])),
+        max_queue=int(os.environ.get("POOL_QUEUE", POOL_CONFIG["max_queue"]))
+    )
+    # Los forward passes del batcher ocupan huecos del mismo pool (backpressure común)
+    BATCHER = MicroBatcher(MODEL._encode_batch, pool=POOL, **BATCH_CONFIG)
+    await BATCHER.start()
     print("🚀 API iniciada")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Evento de shutdown"""
+    if BATCHER is not None:
+        await BATCHER.stop()
+    if POOL is not None:
+        POOL.shutdown()
     print("👋 API cerrada")
 
 
+def _saturated(error: PoolSaturatedError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "1"})
+
+
+async def run_inference(fn, *args, **kwargs):
+    """Ejecutar una llamada bloqueante en el pool de inferencia (503 si está lleno)"""
+    try:
+        return await POOL.run(fn, *args, **kwargs)
+    except PoolSaturatedError as e:
+        raise _saturated(e)
+
+
+async def encode_batched(texts: List[str]) -> np.ndarray:
+    """Codificar vía micro-batcher (503 si hay demasiadas peticiones en espera)"""
+    try:
+        return await BATCHER.encode(texts)
+    except PoolSaturatedError as e:
+        raise _saturated(e)
+
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
@@ -138,8 +320,18 @@ async def root():
             "/embed - Generar embeddings",
             "/similarity - Calcular similitud",
             "/search - Buscar candidatos",
+            "/search/batch - Varias queries contra un mismo corpus",
+            "/index/add - Agregar candidatos al índice",
+            "/index/update - Actualizar candidatos del índice",
+            "/index/remove - Eliminar candidatos del índice",
+            "/index/search - Buscar en el índice de candidatos",
+            "/index/save - Guardar el índice en disco (memmap)",
             "/cluster - Agrupar textos",
+            "/cluster/fit - Agrupar un almacén de embeddings (centroides persistentes)",
+            "/cluster/assign - Asignar textos a clusters guardados",
+            "/dedupe - Agrupar textos casi duplicados",
             "/info - Información del modelo",
+            "/metrics - Métricas del servicio",
             "/docs - Documentación Swagger"
         ]
     }
@@ -174,7 +366,7 @@ async def embed(request: EmbedRequest):
         raise HTTPException(status_code=400, detail="Lista de textos vacía")
     
     try:
-        embeddings = MODEL.encode(request.texts)
+        embeddings = await encode_batched(request.texts)
         
         # Asegurar que es una lista de listas
         if isinstance(embeddings, np.ndarray):
@@ -188,6 +380,8 @@ async def embed(request: EmbedRequest):
             dimension=768,
             count=len(embeddings)
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -211,13 +405,16 @@ async def similarity(request: SimilarityRequest):
         raise HTTPException(status_code=400, detail="Textos vacíos")
     
     try:
-        sim = MODEL.similarity(request.text1, request.text2)
+        emb1, emb2 = normalize_embeddings(await encode_batched([request.text1, request.text2]))
+        sim = float(emb1 @ emb2)
         
         return SimilarityResponse(
             text1=request.text1,
             text2=request.text2,
             similarity=sim
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -242,7 +439,12 @@ async def search(request: SearchRequest):
         raise HTTPException(status_code=400, detail="Query o candidatos vacíos")
     
     try:
-        results = MODEL.search(request.query, request.candidates, request.top_k)
+        embeddings = await encode_batched([request.query] + request.candidates)
+        # Scoring O(n·d) y top-k también fuera del event loop
+        results = await run_inference(
+            ModeloPortable.search_embeddings,
+            embeddings[0], embeddings[1:], request.candidates, request.top_k
+        )
         
         search_results = [
             SearchResult(
@@ -258,6 +460,214 @@ async def search(request: SearchRequest):
             total_results=len(search_results),
             results=search_results
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/search/batch", tags=["Búsqueda"], response_model=BatchSearchResponse)
+async def search_batch(request: BatchSearchRequest):
+    """
+    Buscar varias queries contra el mismo corpus en una sola llamada
+    
+    Parámetros:
+    - queries: Lista de textos de búsqueda
+    - candidates: Corpus de candidatos
+    - top_k: Resultados por query (default: 10)
+    
+    Retorna:
+    - results: Top-k por query, en el orden de las queries
+    """
+    if MODEL is None:
+        raise HTTPException(status_code=503, detail="Modelo no disponible")
+    
+    if not request.queries or not request.candidates:
+        raise HTTPException(status_code=400, detail="Queries o candidatos vacíos")
+    
+    try:
+        all_results = await run_inference(
+            MODEL.search_many, request.queries, request.candidates, request.top_k
+        )
+        
+        responses = []
+        for query, results in zip(request.queries, all_results):
+            search_results = [
+                SearchResult(
+                    candidate=r["candidate"],
+                    similarity=r["similarity"],
+                    rank=i + 1
+                )
+                for i, r in enumerate(results)
+            ]
+            responses.append(SearchResponse(
+                query=query,
+                total_results=len(search_results),
+                results=search_results
+            ))
+        
+        return BatchSearchResponse(
+            total_queries=len(responses),
+            corpus_size=len(request.candidates),
+            results=responses
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/index/add", tags=["Índice"])
+async def index_add(request: IndexUpsertRequest):
+    """
+    Agregar candidatos al índice persistente
+    
+    Parámetros:
+    - ids: IDs únicos de los candidatos
+    - texts: Perfiles (mismo orden que ids)
+    """
+    if INDEX is None:
+        raise HTTPException(status_code=503, detail="Índice no disponible")
+    
+    try:
+        await run_inference(INDEX.add, request.ids, request.texts)
+        return {"added": len(request.ids), "index_size": len(INDEX)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/index/update", tags=["Índice"])
+async def index_update(request: IndexUpsertRequest):
+    """
+    Re-codificar candidatos existentes del índice
+    
+    Parámetros:
+    - ids: IDs existentes
+    - texts: Perfiles nuevos (mismo orden que ids)
+    """
+    if INDEX is None:
+        raise HTTPException(status_code=503, detail="Índice no disponible")
+    
+    try:
+        await run_inference(INDEX.update, request.ids, request.texts)
+        return {"updated": len(request.ids), "index_size": len(INDEX)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/index/remove", tags=["Índice"])
+async def index_remove(request: IndexRemoveRequest):
+    """
+    Eliminar candidatos del índice
+    
+    Parámetros:
+    - ids: IDs a eliminar
+    """
+    if INDEX is None:
+        raise HTTPException(status_code=503, detail="Índice no disponible")
+    
+    try:
+        await run_inference(INDEX.remove, request.ids)
+        return {"removed": len(request.ids), "index_size": len(INDEX)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/index/save", tags=["Índice"])
+async def index_save(request: IndexSaveRequest):
+    """
+    Guardar el índice en disco para abrirlo con memmap al arrancar
+    
+    Parámetros:
+    - path: Nombre o ruta del almacén (default: --index-path)
+    - dtype: 'float32' o 'float16'
+    """
+    if INDEX is None:
+        raise HTTPException(status_code=503, detail="Índice no disponible")
+    
+    path = request.path or INDEX_PATH
+    if not path:
+        raise HTTPException(status_code=400, detail="Ruta del índice no especificada")
+    
+    try:
+        saved_path = await run_inference(INDEX.save, path, dtype=request.dtype)
+        return {"path": str(saved_path), "index_size": len(INDEX), "dtype": request.dtype}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/index/search", tags=["Índice"], response_model=IndexSearchResponse)
+async def index_search(request: IndexSearchRequest):
+    """
+    Buscar en el índice de candidatos (solo se codifica la query)
+    
+    Parámetros:
+    - query: Texto de búsqueda
+    - top_k: Número de resultados (default: 10)
+    - exact: Forzar búsqueda exacta aunque haya índice ANN
+    - mode: dense, lexical, hybrid o lexical_first (requieren --lexical salvo dense)
+    - fusion: rrf o weighted (modo hybrid)
+    
+    Retorna:
+    - results: Candidatos del índice ordenados por similitud
+    """
+    if INDEX is None:
+        raise HTTPException(status_code=503, detail="Índice no disponible")
+    
+    if not request.query:
+        raise HTTPException(status_code=400, detail="Query vacía")
+    
+    try:
+        # El modo léxico no necesita embedding de la query
+        query_emb = None
+        if request.mode != "lexical":
+            query_emb = (await encode_batched([request.query]))[0]
+        results = await run_inference(
+            INDEX.search_by_embedding, query_emb, top_k=request.top_k, exact=request.exact,
+            query=request.query, mode=request.mode, fusion=request.fusion
+        )
+        
+        search_results = [
+            IndexSearchResult(
+                id=r["id"],
+                candidate=r["candidate"],
+                similarity=r["similarity"],
+                rank=i + 1
+            )
+            for i, r in enumerate(results)
+        ]
+        
+        return IndexSearchResponse(
+            query=request.query,
+            total_results=len(search_results),
+            index_size=len(INDEX),
+            results=search_results
+        )
+    except HTTPException:
+        raise
+    except (ValueError, RuntimeError) as e:
+        # Modo/fusión inválidos o índice léxico no activado
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -269,10 +679,16 @@ async def cluster(request: ClusterRequest):
     
     Parámetros:
     - texts: Lista de textos
-    - n_clusters: Número de clusters
+    - n_clusters: Número de clusters, o "auto" para elegirlo barriendo
+      k en [2, max_clusters] con la métrica indicada
+    - summarize: Agregar un resumen por cluster (sin re-codificar)
+    - include_members: False para omitir la lista completa de textos
     
     Retorna:
     - clusters: Diccionario con textos agrupados
+    - scores: Score de cada k probado (solo con "auto")
+    - summaries: size, centroid, medoid, representatives y top_terms
+      por cluster (solo con summarize)
     """
     if MODEL is None:
         raise HTTPException(status_code=503, detail="Modelo no disponible")
@@ -280,18 +696,153 @@ async def cluster(request: ClusterRequest):
     if not request.texts:
         raise HTTPException(status_code=400, detail="Lista de textos vacía")
     
+    if isinstance(request.n_clusters, str) and request.n_clusters != "auto":
+        raise HTTPException(status_code=400, detail="n_clusters debe ser un entero o 'auto'")
+    
+    auto = request.n_clusters == "auto"
+    auto_params = {"max_clusters": request.max_clusters, "metric": request.metric} if auto else {}
+    
     try:
-        clusters = MODEL.cluster(request.texts, request.n_clusters)
+        if request.summarize:
+            result = await run_inference(
+                MODEL.cluster_summary, request.texts, request.n_clusters,
+                n_members=request.n_members, **auto_params
+            )
+            for summary in result["summaries"].values():
+                summary["centroid"] = summary["centroid"].tolist()
+        elif auto:
+            result = await run_inference(MODEL.cluster_auto, request.texts, **auto_params)
+        else:
+            clusters = await run_inference(MODEL.cluster, request.texts, request.n_clusters)
+            result = {"n_clusters": request.n_clusters, "clusters": clusters}
         
-        return ClusterResponse(
-            n_clusters=request.n_clusters,
-            total_texts=len(request.texts),
-            clusters=clusters
+        if not request.include_members:
+            result["clusters"] = {}
+        
+        return ClusterResponse(total_texts=len(request.texts), **result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/cluster/fit", tags=["Clustering"])
+async def cluster_fit(request: ClusterFitRequest):
+    """
+    Agrupar un almacén de embeddings completo (k-means por mini-batches)
+    
+    Parámetros:
+    - store: Almacén de embeddings (nombre o ruta)
+    - n_clusters: Número de clusters
+    - name: Nombre de los centroides guardados (default: el del almacén)
+    - epochs: Pasadas sobre el almacén
+    - warm_start: Partir de los centroides guardados si existen
+    
+    Retorna:
+    - name, n_clusters y vectores acumulados por centroide (counts)
+    """
+    if MODEL is None:
+        raise HTTPException(status_code=503, detail="Modelo no disponible")
+    
+    try:
+        model = await run_inference(
+            MODEL.cluster_store, request.store, request.n_clusters,
+            name=request.name, epochs=request.epochs, warm_start=request.warm_start
+        )
+        return {
+            "name": request.name or Path(request.store).name,
+            "n_clusters": model.n_clusters,
+            "counts": [int(count) for count in model.counts],
+        }
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/cluster/assign", tags=["Clustering"])
+async def cluster_assign(request: ClusterAssignRequest):
+    """
+    Asignar textos nuevos a clusters guardados (O(k) por texto, sin re-agrupar)
+    
+    Retorna:
+    - labels: Cluster de cada texto (mismo orden)
+    """
+    if MODEL is None:
+        raise HTTPException(status_code=503, detail="Modelo no disponible")
+    
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="Lista de textos vacía")
+    
+    try:
+        labels = await run_inference(MODEL.assign_clusters, request.texts, request.name)
+        return {"name": request.name, "labels": labels.tolist()}
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/dedupe", tags=["Clustering"])
+async def dedupe(request: DedupeRequest):
+    """
+    Agrupar textos casi duplicados (LSH de hiperplanos + coseno exacto)
+    
+    Parámetros:
+    - texts: Textos (p. ej. CVs de varios portales)
+    - ids: Identificador de cada texto (opcional)
+    - threshold: Coseno mínimo para considerar duplicados
+    
+    Retorna:
+    - groups: Grupos de ids duplicados (solo grupos de 2+)
+    - duplicates: Textos que sobran (miembros de grupo menos uno por grupo)
+    - stats: Comparaciones exactas realizadas vs. todos los pares
+    """
+    if MODEL is None:
+        raise HTTPException(status_code=503, detail="Modelo no disponible")
+    
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="Lista de textos vacía")
+    
+    if not 0 < request.threshold <= 1:
+        raise HTTPException(status_code=400, detail="threshold debe estar en (0, 1]")
+    
+    try:
+        deduplicator = await run_inference(
+            MODEL.dedupe, request.texts, request.ids, threshold=request.threshold
         )
+        groups = deduplicator.groups()
+        return {
+            "total_texts": len(request.texts),
+            "groups": groups,
+            "duplicates": sum(len(group) - 1 for group in groups),
+            "stats": deduplicator.get_stats()
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Métricas del servicio (micro-batching y pool de inferencia)"""
+    return {
+        "batching": BATCHER.stats() if BATCHER is not None else None,
+        "inference_pool": POOL.stats() if POOL is not None else None,
+    }
+
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Health check"""
@@ -337,7 +888,28 @@ curl -X POST http://localhost:8000/search \\
     "top_k": 2
   }'
 
-## 4. Agrupar Textos
+## 4. Búsqueda por Lotes (varias queries, un corpus)
+curl -X POST http://localhost:8000/search/batch \\
+  -H "Content-Type: application/json" \\
+  -d '{
+    "queries": ["python senior developer", "frontend react"],
+    "candidates": ["python engineer", "react developer", "java programmer"],
+    "top_k": 2
+  }'
+
+## 5. Índice de Candidatos (se embebe una sola vez)
+curl -X POST http://localhost:8000/index/add \\
+  -H "Content-Type: application/json" \\
+  -d '{
+    "ids": ["C001", "C002"],
+    "texts": ["python engineer", "java programmer"]
+  }'
+
+curl -X POST http://localhost:8000/index/search \\
+  -H "Content-Type: application/json" \\
+  -d '{"query": "python senior developer", "top_k": 5}'
+
+## 6. Agrupar Textos
 curl -X POST http://localhost:8000/cluster \\
   -H "Content-Type: application/json" \\
   -d '{
@@ -351,10 +923,20 @@ curl -X POST http://localhost:8000/cluster \\
     "n_clusters": 3
   }'
 
-## 5. Información del Modelo
+# Número de clusters automático (silhouette sobre una submuestra)
+curl -X POST http://localhost:8000/cluster \\
+  -H "Content-Type: application/json" \\
+  -d '{"texts": ["python developer", "python engineer", "java developer", "java programmer", "frontend react"], "n_clusters": "auto"}'
+
+# CVs casi duplicados (mismo CV desde varios portales)
+curl -X POST http://localhost:8000/dedupe \\
+  -H "Content-Type: application/json" \\
+  -d '{"texts": ["Senior Python developer, 8 years, Django", "Senior Python developer - 8 years - Django", "Java engineer"], "threshold": 0.95}'
+
+## 7. Información del Modelo
 curl http://localhost:8000/info
 
-## 6. Health Check
+## 8. Health Check
 curl http://localhost:8000/health
 """
 
@@ -400,6 +982,90 @@ def main():
         help="Dispositivo a usar (default: cpu)"
     )
     
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=32,
+        help="Textos por forward pass del modelo (default: 32)"
+    )
+    
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=None,
+        help="Embeddings en caché LRU (default: sin caché)"
+    )
+    
+    parser.add_argument(
+        "--cache-mb",
+        type=float,
+        default=None,
+        help="Límite en MB de la caché LRU de embeddings"
+    )
+    
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=64,
+        help="Textos por micro-batch de peticiones concurrentes (default: 64)"
+    )
+    
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=5.0,
+        help="Espera máxima para completar un micro-batch (default: 5 ms)"
+    )
+    
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=256,
+        help="Peticiones de encode en espera antes de responder 503 (default: 256)"
+    )
+    
+    parser.add_argument(
+        "--pool-workers",
+        type=int,
+        default=2,
+        help="Trabajos de inferencia simultáneos (default: 2)"
+    )
+    
+    parser.add_argument(
+        "--pool-queue",
+        type=int,
+        default=32,
+        help="Trabajos de inferencia en espera antes de responder 503 (default: 32)"
+    )
+    
+    parser.add_argument(
+        "--index-path",
+        type=str,
+        default=None,
+        help="Almacén de embeddings de candidatos a abrir con memmap (nombre o ruta)"
+    )
+    
+    parser.add_argument(
+        "--ann-backend",
+        type=str,
+        choices=["auto", "numpy-ivf", "hnswlib", "faiss-ivf", "int8", "binary", "pq"],
+        default=None,
+        help="Construir índice ANN al cargar (default: búsqueda exacta)"
+    )
+    
+    parser.add_argument(
+        "--ann-rescore",
+        type=int,
+        default=0,
+        help="Re-puntuar con float32 los rescore*top_k mejores del ANN (útil con int8/binary/pq)"
+    )
+    
+    parser.add_argument(
+        "--lexical",
+        action="store_true",
+        help="Mantener índice BM25 para búsqueda léxica/híbrida en /index/search"
+    )
+    
     parser.add_argument(
         "--reload",
         action="store_true",
@@ -415,9 +1081,25 @@ def main():
         print(f"❌ Error: Modelo no encontrado en {args.model_path}")
         sys.exit(1)
     
+    BATCH_CONFIG["max_batch_size"] = args.max_batch_size
+    BATCH_CONFIG["max_wait_ms"] = args.max_wait_ms
+    BATCH_CONFIG["max_pending"] = args.max_pending
+    POOL_CONFIG["max_workers"] = args.pool_workers
+    POOL_CONFIG["max_queue"] = args.pool_queue
+    
     # Inicializar modelo
     print(f"\n📦 Inicializando modelo desde: {args.model_path}")
-    initialize_model(str(model_path), device=args.device)
+    initialize_model(
+        str(model_path),
+        device=args.device,
+        batch_size=args.batch_size,
+        index_path=args.index_path,
+        ann_backend=args.ann_backend,
+        ann_rescore=args.ann_rescore,
+        cache_size=args.cache_size,
+        cache_mb=args.cache_mb,
+        lexical=args.lexical
+    )
     
     # Iniciar servidor
     print(f"\n🚀 Iniciando API en http://{args.host}:{args.port}")
@@ -0,0 +1,130 @@
+"""
+CACHÉ LRU THREAD-SAFE
+Caché acotada por número de entradas y/o bytes, con expiración (TTL)
+opcional y contadores de aciertos, fallos, desalojos y expiraciones
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Caché LRU (least recently used) con límites de entradas y bytes
+    
+    Cada operación toma un lock, por lo que puede compartirse entre los
+    threads de un servidor. Si se supera cualquiera de los límites se
+    desalojan las entradas usadas hace más tiempo. Con ttl, una entrada
+    más antigua que ttl segundos cuenta como fallo y se descarta al leerla.
+    """
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_entries: Máximo de entradas (None = sin límite)
+            max_bytes: Máximo de bytes según `sizeof` (None = sin límite)
+            sizeof: Función que estima los bytes de un valor
+                    (default: atributo nbytes, o 0)
+            ttl: Segundos de validez de cada entrada (None = sin expiración)
+            clock: Reloj en segundos (monotónico por defecto)
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError("La caché necesita max_entries o max_bytes")
+        
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof or (lambda value: getattr(value, "nbytes", 0))
+        self._clock = clock
+        
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._expires: Dict[Hashable, float] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtener un valor (lo marca como usado recientemente)"""
+        with self._lock:
+            if key in self._data:
+                if self.ttl is not None and self._clock() >= self._expires[key]:
+                    self._discard(key)
+                    self.expirations += 1
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return self._data[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """Guardar un valor, desalojando entradas antiguas si hace falta"""
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._sizes[key]
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+            if self.ttl is not None:
+                self._expires[key] = self._clock() + self.ttl
+            self._evict()
+    
+    def clear(self) -> None:
+        """Vaciar la caché (los contadores se conservan)"""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self._bytes = 0
+    
+    def stats(self) -> dict:
+        """Contadores y ocupación actual"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+    
+    def _evict(self) -> None:
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._discard(next(iter(self._data)))
+            self.evictions += 1
+    
+    def _discard(self, key: Hashable) -> None:
+        del self._data[key]
+        self._bytes -= self._sizes.pop(key)
+        self._expires.pop(key, None)
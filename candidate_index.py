@@ -0,0 +1,707 @@
+"""
+ÍNDICE PERSISTENTE DE CANDIDATOS
+Mantiene los embeddings de un pool de CVs en memoria para no re-codificar
+el corpus en cada búsqueda: solo se embebe la query
+"""
+
+import functools
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+
+from loader import ModeloPortable, blocked_top_k, normalize_embeddings, top_k_indices
+from ann import create_ann_index
+from lexical_index import BM25Index, reciprocal_rank_fusion, weighted_fusion
+from quantization import PQ_CENTROIDS, PQ_SUBSPACES, QUANTIZED_BACKENDS, PQIndex
+
+
+# dense = embeddings; lexical = BM25; hybrid = fusión de ambos rankings;
+# lexical_first = BM25 recupera candidatos y solo esos se puntúan con embeddings
+SEARCH_MODES = ("dense", "lexical", "hybrid", "lexical_first")
+FUSION_METHODS = ("rrf", "weighted")
+
+
+def score_embeddings(matrix: np.ndarray, query_emb: np.ndarray, block_size: int = 65536) -> np.ndarray:
+    """
+    Producto punto matriz x query en float32
+    
+    Las matrices float16 (p. ej. un memmap en disco) se convierten por
+    bloques para no materializar una copia float32 del corpus completo.
+    """
+    query_emb = np.asarray(query_emb, dtype=np.float32)
+    if matrix.dtype == np.float32:
+        return matrix @ query_emb
+    
+    scores = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), block_size):
+        block = matrix[start:start + block_size]
+        scores[start:start + len(block)] = block.astype(np.float32) @ query_emb
+    return scores
+
+
+def _synchronized(method):
+    """Ejecutar el método con el lock del índice tomado"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class CandidateIndex:
+    """
+    Índice de embeddings normalizados (float32) indexados por ID estable
+    
+    Los vectores viven en una matriz contigua (fila i = candidato i) que
+    crece por duplicación de capacidad. Eliminar un candidato mueve la
+    última fila a su hueco, así la matriz nunca tiene filas vacías.
+    
+    Un índice abierto con load() usa la matriz del disco vía memmap
+    (solo lectura, compartida entre procesos); la primera modificación
+    la copia a RAM.
+    
+    Opcionalmente mantiene un índice ANN (ver ann.py) sincronizado con
+    cada add/update/remove. Cada fila tiene una etiqueta entera estable
+    (no cambia al compactar la matriz) que es la que conoce el ANN. Los
+    backends cuantizados (int8, binary, pq) pueden re-puntuar sus mejores
+    candidatos con la matriz float (rescore).
+    También puede mantener un índice léxico BM25 (ver lexical_index.py)
+    por filas para búsqueda híbrida.
+    
+    Es thread-safe: las modificaciones y el ranking toman un lock, pero
+    la codificación de textos (la parte cara) ocurre fuera de él.
+    """
+    
+    def __init__(self, model: ModeloPortable, initial_capacity: int = 1024):
+        """
+        Inicializar índice vacío
+        
+        Args:
+            model: Modelo usado para codificar candidatos y queries
+            initial_capacity: Filas reservadas inicialmente
+        """
+        self.model = model
+        self.dimension = model.model.get_sentence_embedding_dimension()
+        
+        self._matrix = np.zeros((max(1, initial_capacity), self.dimension), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._id_to_row: Dict[str, int] = {}
+        
+        # Etiquetas estables por fila para el índice ANN
+        self._labels: List[int] = []
+        self._label_to_row: Dict[int, int] = {}
+        self._next_label = 0
+        self.ann = None
+        self.ann_rescore = 0
+        self.lexical = None
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __contains__(self, candidate_id: str) -> bool:
+        return candidate_id in self._id_to_row
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Vista (sin copia) de la matriz de embeddings ocupada"""
+        return self._matrix[:self._size]
+    
+    @property
+    def ids(self) -> List[str]:
+        """IDs en el orden de las filas de la matriz"""
+        return list(self._ids)
+    
+    def row_of(self, candidate_id: str) -> Optional[int]:
+        """Fila de un ID en O(1) (None si no está en el índice)"""
+        return self._id_to_row.get(candidate_id)
+    
+    # =========================================================================
+    # MODIFICACIÓN
+    # =========================================================================
+    
+    def add(
+        self,
+        ids: Union[str, List[str]],
+        texts: Union[str, List[str]],
+        batch_size: Optional[int] = None
+    ) -> None:
+        """
+        Agregar candidatos nuevos (se codifican en batch)
+        
+        Args:
+            ids: ID o lista de IDs únicos
+            texts: Texto o lista de textos (mismo orden que ids)
+            batch_size: Textos por forward pass (None = el del modelo)
+        """
+        ids, texts = self._as_lists(ids, texts)
+        self._check_new(ids)
+        
+        embeddings = self.model._encode_batch(texts, batch_size, use_cache=False)
+        self.add_embeddings(ids, embeddings, texts)
+    
+    @_synchronized
+    def add_embeddings(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        texts: Optional[List[str]] = None
+    ) -> None:
+        """
+        Agregar candidatos con embeddings ya calculados
+        
+        Args:
+            ids: Lista de IDs únicos
+            embeddings: Matriz (len(ids), dim)
+            texts: Textos originales (opcional)
+        """
+        ids = list(ids)
+        embeddings = np.asarray(embeddings).reshape(len(ids), self.dimension)
+        texts = list(texts) if texts is not None else [""] * len(ids)
+        self._check_new(ids)
+        
+        start = self._size
+        end = start + len(ids)
+        self._reserve(end)
+        
+        self._matrix[start:end] = normalize_embeddings(embeddings)
+        labels = list(range(self._next_label, self._next_label + len(ids)))
+        self._next_label += len(ids)
+        for offset, (candidate_id, text, label) in enumerate(zip(ids, texts, labels)):
+            self._id_to_row[candidate_id] = start + offset
+            self._label_to_row[label] = start + offset
+            self._ids.append(candidate_id)
+            self._texts.append(text)
+            self._labels.append(label)
+        self._size = end
+        
+        if self.ann is not None:
+            self.ann.add(self._matrix[start:end], np.array(labels, dtype=np.int64))
+        if self.lexical is not None:
+            for text in texts:
+                self.lexical.add(text)
+    
+    def update(
+        self,
+        ids: Union[str, List[str]],
+        texts: Union[str, List[str]],
+        batch_size: Optional[int] = None
+    ) -> None:
+        """
+        Re-codificar candidatos existentes con su texto nuevo
+        
+        Args:
+            ids: ID o lista de IDs existentes
+            texts: Texto o lista de textos nuevos
+            batch_size: Textos por forward pass (None = el del modelo)
+        """
+        ids, texts = self._as_lists(ids, texts)
+        self._check_existing(ids)
+        
+        embeddings = self.model._encode_batch(texts, batch_size, use_cache=False)
+        self._update_rows(ids, embeddings, texts)
+    
+    @_synchronized
+    def _update_rows(self, ids: List[str], embeddings: np.ndarray, texts: List[str]) -> None:
+        self._check_existing(ids)
+        rows = [self._row(candidate_id) for candidate_id in ids]
+        self._ensure_writable()
+        self._matrix[rows] = normalize_embeddings(embeddings)
+        for row, text in zip(rows, texts):
+            self._texts[row] = text
+            if self.lexical is not None:
+                self.lexical.update(row, text)
+        
+        if self.ann is not None:
+            labels = np.array([self._labels[row] for row in rows], dtype=np.int64)
+            self.ann.remove(labels)
+            self.ann.add(self._matrix[rows], labels)
+    
+    @_synchronized
+    def remove(self, ids: Union[str, List[str]]) -> None:
+        """
+        Eliminar candidatos del índice
+        
+        Args:
+            ids: ID o lista de IDs existentes
+        """
+        if isinstance(ids, str):
+            ids = [ids]
+        
+        # Validar todos antes de modificar nada: un ID repetido fallaría en
+        # la segunda pasada con la primera eliminación ya hecha
+        self._check_existing(ids)
+        
+        if self.ann is not None:
+            self.ann.remove([self._labels[self._id_to_row[candidate_id]] for candidate_id in ids])
+        
+        self._ensure_writable()
+        for candidate_id in ids:
+            row = self._row(candidate_id)
+            last = self._size - 1
+            label = self._labels[row]
+            if self.lexical is not None:
+                self.lexical.remove(row)
+            
+            # Mover la última fila al hueco para mantener la matriz compacta
+            if row != last:
+                last_id = self._ids[last]
+                last_label = self._labels[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = last_id
+                self._texts[row] = self._texts[last]
+                self._labels[row] = last_label
+                self._id_to_row[last_id] = row
+                self._label_to_row[last_label] = row
+            
+            self._ids.pop()
+            self._texts.pop()
+            self._labels.pop()
+            del self._id_to_row[candidate_id]
+            del self._label_to_row[label]
+            self._size = last
+    
+    # =========================================================================
+    # ÍNDICE ANN
+    # =========================================================================
+    
+    @_synchronized
+    def enable_ann(self, backend: str = "auto", rescore: int = 0, **params) -> None:
+        """
+        Construir un índice ANN sobre el corpus actual
+        
+        Las inserciones, actualizaciones y eliminaciones posteriores se
+        aplican también al ANN de forma incremental.
+        
+        Con 'pq' se usan los codebooks guardados junto al modelo; si no
+        existen (o son de otro modelo) se entrenan con el corpus actual y
+        se guardan. Con un corpus menor que min_train_size los vectores
+        quedan en float32 hasta que las inserciones alcancen el mínimo.
+        
+        Args:
+            backend: 'auto', 'numpy-ivf', 'hnswlib', 'faiss-ivf', 'int8',
+                     'binary' o 'pq'
+            rescore: Re-puntuar con float32 los rescore*top_k mejores del
+                     ANN (0 = usar los scores del ANN tal cual)
+            **params: nlist/nprobe (IVF), M/ef_construction/ef (HNSW),
+                      m/ks/min_train_size (PQ)
+        """
+        if backend == "pq" and params.get("codebook") is None:
+            m = params.setdefault("m", PQ_SUBSPACES)
+            codebook = self.model.load_pq_codebook(m)
+            if codebook is not None and codebook.ks < params.get("ks", PQ_CENTROIDS):
+                # Entrenado con un corpus chico: se re-entrena cuando alcance
+                print(f"⚠️  Codebooks PQ con {codebook.ks} centroides, descartados")
+                codebook = None
+            params["codebook"] = codebook
+        
+        ann = create_ann_index(self.dimension, backend=backend, **params)
+        if isinstance(ann, PQIndex) and not ann.trained and self._size >= ann.min_train_size:
+            ann.codebook = self.model.train_pq_codebook(self.embeddings, m=ann.m, ks=ann.ks)
+        if self._size:
+            ann.build(self.embeddings, np.array(self._labels, dtype=np.int64))
+        self.ann = ann
+        self.ann_rescore = int(rescore)
+        print(f"✅ Índice ANN listo: {ann.get_params()}")
+    
+    @_synchronized
+    def disable_ann(self) -> None:
+        """Volver a búsqueda exacta (fuerza bruta)"""
+        self.ann = None
+        self.ann_rescore = 0
+    
+    @_synchronized
+    def enable_lexical(self, k1: float = 1.5, b: float = 0.75) -> None:
+        """
+        Construir el índice léxico BM25 con los textos actuales
+        
+        Queda sincronizado con add/update/remove. Los índices abiertos con
+        load() no tienen textos: solo se indexan los que se agreguen después.
+        """
+        self.lexical = BM25Index(k1=k1, b=b)
+        for text in self._texts:
+            self.lexical.add(text)
+    
+    @_synchronized
+    def disable_lexical(self) -> None:
+        """Eliminar el índice léxico"""
+        self.lexical = None
+    
+    @_synchronized
+    def set_ann_params(self, rescore: Optional[int] = None, **params) -> None:
+        """Ajustar recall/latencia del ANN (p. ej. nprobe=16, ef=128 o rescore=4)"""
+        if self.ann is None:
+            raise RuntimeError("Índice ANN no habilitado. Use enable_ann() primero.")
+        self.ann.set_params(**params)
+        if rescore is not None:
+            self.ann_rescore = int(rescore)
+    
+    # =========================================================================
+    # PERSISTENCIA
+    # =========================================================================
+    
+    @_synchronized
+    def save(self, name_or_path: str, dtype: str = "float32"):
+        """
+        Guardar el índice en formato memmap (ver embedding_store)
+        
+        Con un ANN cuantizado (int8/binary) se guardan también sus códigos
+        en el almacén, para no re-cuantizar al cargar.
+        
+        Args:
+            name_or_path: Nombre (junto al modelo) o ruta del almacén
+            dtype: 'float32' o 'float16' (mitad de espacio)
+        
+        Returns:
+            Ruta del almacén
+        """
+        store_dir = self.model.save_embeddings(name_or_path, self._ids, self.embeddings, dtype=dtype)
+        if self.ann is not None and self.ann.name in QUANTIZED_BACKENDS:
+            self.ann.save(_codes_path(store_dir, self.ann.name), self._labels, fingerprint=self.model.fingerprint)
+        return store_dir
+    
+    @classmethod
+    def load(
+        cls,
+        model: ModeloPortable,
+        name_or_path: str,
+        mmap: bool = True,
+        ann: Optional[str] = None,
+        **ann_params
+    ) -> "CandidateIndex":
+        """
+        Abrir un índice guardado sin re-codificar ni copiar la matriz
+        
+        Args:
+            model: Modelo para codificar queries
+            name_or_path: Nombre (junto al modelo) o ruta del almacén
+            mmap: True = matriz compartida en page cache (zero-copy)
+            ann: Backend ANN a construir al cargar (None = búsqueda exacta);
+                 int8/binary reutilizan los códigos guardados con save()
+            **ann_params: Parámetros del backend ANN (y rescore)
+        
+        Returns:
+            CandidateIndex listo para buscar
+        """
+        ids, matrix, header = model.open_embeddings(name_or_path, mmap=mmap)
+        
+        index = cls(model, initial_capacity=1)
+        if header["dimension"] != index.dimension:
+            raise ValueError(
+                f"Dimensión del almacén ({header['dimension']}) distinta a la del modelo ({index.dimension})"
+            )
+        
+        index._matrix = matrix
+        index._size = len(ids)
+        index._ids = ids
+        index._texts = [""] * len(ids)
+        index._id_to_row = {candidate_id: row for row, candidate_id in enumerate(ids)}
+        index._labels = list(range(len(ids)))
+        index._label_to_row = {label: label for label in index._labels}
+        index._next_label = len(ids)
+        
+        print(f"✅ Índice cargado: {len(ids)} candidatos ({header['dtype']}, mmap={mmap})")
+        
+        codes_path = _codes_path(model._resolve_store(name_or_path), ann)
+        if ann in QUANTIZED_BACKENDS and codes_path.exists():
+            try:
+                quantized = QUANTIZED_BACKENDS[ann].load(codes_path, fingerprint=model.fingerprint)
+            except ValueError as e:
+                print(f"⚠️  Códigos {ann} descartados: {e}")
+                quantized = None
+            if quantized is not None and len(quantized) == len(ids):
+                index.ann = quantized
+                index.ann_rescore = int(ann_params.get("rescore", 0))
+                print(f"✅ Códigos {ann} cargados: {quantized.get_params()}")
+                return index
+        
+        if ann is not None:
+            index.enable_ann(ann, **ann_params)
+        return index
+    
+    @_synchronized
+    def get_embedding(self, candidate_id: str) -> np.ndarray:
+        """Embedding normalizado de un candidato"""
+        return self._matrix[self._row(candidate_id)].astype(np.float32)
+    
+    # =========================================================================
+    # BÚSQUEDA
+    # =========================================================================
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        exact: bool = False,
+        mode: str = "dense",
+        fusion: str = "rrf",
+        alpha: float = 0.5,
+        candidates_k: int = 100
+    ) -> List[dict]:
+        """
+        Buscar los candidatos más similares a una consulta
+        
+        Solo se codifica la query; el corpus ya está embebido.
+        
+        Args:
+            query: Texto de búsqueda
+            top_k: Número de resultados (None = todos)
+            exact: Forzar fuerza bruta aunque haya índice ANN
+            mode: 'dense', 'lexical', 'hybrid' o 'lexical_first'
+                  (los tres últimos requieren enable_lexical())
+            fusion: 'rrf' (reciprocal rank fusion) o 'weighted' (modo hybrid)
+            alpha: Peso de la similitud coseno en la fusión ponderada
+            candidates_k: Candidatos recuperados por cada etapa antes de fusionar
+        
+        Returns:
+            Lista de resultados ordenados por score (en modos no densos,
+            `similarity` es el score de ese modo: BM25 o fusionado)
+        """
+        query_emb = None if mode == "lexical" else self.model.encode(query)
+        return self.search_by_embedding(
+            query_emb, top_k, exact=exact, query=query,
+            mode=mode, fusion=fusion, alpha=alpha, candidates_k=candidates_k
+        )
+    
+    @_synchronized
+    def search_by_embedding(
+        self,
+        query_emb: Optional[np.ndarray],
+        top_k: Optional[int] = 10,
+        exact: bool = False,
+        **options
+    ) -> List[dict]:
+        """
+        Igual que search() pero con el embedding de la query ya calculado
+        
+        Args:
+            query_emb: Embedding de la query (None en modo 'lexical')
+            **options: query, mode, fusion, alpha, candidates_k, rows
+                       (ver search_rows)
+        
+        Returns:
+            Lista de resultados ordenados por similitud
+        """
+        rows, scores = self.search_rows(query_emb, top_k, exact=exact, **options)
+        return self._results(rows, scores)
+    
+    @_synchronized
+    def search_rows(
+        self,
+        query_emb: Optional[np.ndarray],
+        top_k: Optional[int] = 10,
+        exact: bool = False,
+        query: Optional[str] = None,
+        mode: str = "dense",
+        fusion: str = "rrf",
+        alpha: float = 0.5,
+        candidates_k: int = 100,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Búsqueda densa, léxica o híbrida que retorna filas
+        
+        Args:
+            query_emb: Embedding de la query (no se usa en modo 'lexical')
+            query: Texto de la query (modos con BM25)
+            rows: Pre-filtro de filas o máscara booleana
+            (resto: ver search)
+        
+        Returns:
+            (filas, scores) ordenados por score descendente
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Modo de búsqueda desconocido: {mode} (usar {SEARCH_MODES})")
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Fusión desconocida: {fusion} (usar {FUSION_METHODS})")
+        
+        if rows is not None:
+            rows = np.asarray(rows)
+            rows = np.flatnonzero(rows) if rows.dtype == bool else rows.astype(np.int64, copy=False)
+        
+        if mode == "dense":
+            return self.search_embedding(normalize_embeddings(query_emb), top_k, exact=exact, rows=rows)
+        
+        if self.lexical is None:
+            raise RuntimeError("Índice léxico no activado. Use enable_lexical() primero.")
+        if mode == "lexical":
+            return self.lexical.search(query, top_k, rows=rows)
+        
+        query_emb = normalize_embeddings(query_emb)
+        depth = max(candidates_k, top_k or 0)
+        lexical_rows, lexical_scores = self.lexical.search(query, depth, rows=rows)
+        
+        if mode == "lexical_first":
+            # BM25 como primera etapa: el scorer denso solo toca esas filas
+            if not len(lexical_rows):
+                return self.search_embedding(query_emb, top_k, exact=exact, rows=rows)
+            return self.search_embedding(query_emb, top_k, rows=lexical_rows)
+        
+        dense_rows, dense_scores = self.search_embedding(query_emb, depth, exact=exact, rows=rows)
+        
+        if fusion == "rrf":
+            fused = reciprocal_rank_fusion([dense_rows, lexical_rows])
+            candidates = np.fromiter(fused.keys(), dtype=np.int64, count=len(fused))
+            scores = np.fromiter(fused.values(), dtype=np.float32, count=len(fused))
+        else:
+            # Coseno exacto para toda la unión; BM25 = 0 fuera del top léxico
+            candidates = np.union1d(dense_rows, lexical_rows)
+            lexical = dict(zip(lexical_rows.tolist(), lexical_scores.tolist()))
+            scores = weighted_fusion(
+                score_embeddings(self._matrix[candidates], query_emb),
+                np.array([lexical.get(row, 0.0) for row in candidates.tolist()], dtype=np.float32),
+                alpha
+            )
+        
+        order = top_k_indices(scores, top_k)
+        return candidates[order], scores[order]
+    
+    def search_many(self, queries: List[str], top_k: int = 10, exact: bool = False) -> List[List[dict]]:
+        """
+        Buscar varias queries contra el índice en una sola llamada
+        
+        Las queries se codifican en batch; sin ANN (o con exact=True) los
+        scores se calculan por bloques queries x corpus.
+        
+        Args:
+            queries: Lista de textos de búsqueda
+            top_k: Resultados por query (None = todos)
+            exact: Forzar fuerza bruta aunque haya índice ANN
+        
+        Returns:
+            Una lista de resultados (como search()) por query
+        """
+        queries_emb = normalize_embeddings(self.model._encode_batch(list(queries)))
+        
+        with self._lock:
+            if self.ann is not None and not exact and top_k:
+                hits = [self.search_embedding(q, top_k) for q in queries_emb]
+            else:
+                indices, scores = blocked_top_k(queries_emb, self.embeddings, top_k)
+                hits = list(zip(indices, scores))
+            
+            return [self._results(rows, scores) for rows, scores in hits]
+    
+    @_synchronized
+    def search_embedding(
+        self,
+        query_emb: np.ndarray,
+        top_k: Optional[int] = 10,
+        exact: bool = False,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k para un embedding de query ya normalizado
+        
+        Args:
+            query_emb: Embedding normalizado de la query
+            top_k: Número de resultados (None = todos)
+            exact: Forzar fuerza bruta aunque haya índice ANN
+            rows: Pre-filtro: filas o máscara booleana (n,) a puntuar
+                  (búsqueda exacta sobre el subconjunto; el top-k sale
+                  entero de él)
+        
+        Returns:
+            (filas, scores) ordenados por score descendente
+        """
+        if rows is not None:
+            rows = np.asarray(rows)
+            rows = np.flatnonzero(rows) if rows.dtype == bool else rows.astype(np.int64, copy=False)
+            scores = score_embeddings(self._matrix[rows], query_emb)
+            order = top_k_indices(scores, top_k)
+            return rows[order], scores[order]
+        
+        if self.ann is not None and not exact and top_k:
+            labels, scores = self.ann.search(query_emb, top_k * max(1, self.ann_rescore))
+            rows = np.array([self._label_to_row[int(label)] for label in labels], dtype=np.int64)
+            if self.ann_rescore:
+                # Re-scoring exacto de los mejores candidatos del ANN
+                rows = np.sort(rows)
+                scores = score_embeddings(self._matrix[rows], query_emb)
+                order = top_k_indices(scores, top_k)
+                return rows[order], scores[order]
+            return rows, scores
+        
+        scores = score_embeddings(self.embeddings, query_emb)
+        rows = top_k_indices(scores, top_k)
+        return rows, scores[rows]
+    
+    # =========================================================================
+    # UTILIDADES INTERNAS
+    # =========================================================================
+    
+    def _results(self, rows: np.ndarray, scores: np.ndarray) -> List[dict]:
+        """Construir dicts de resultado solo para las filas ganadoras"""
+        results = []
+        for row, similarity in zip(rows, scores):
+            similarity = float(similarity)
+            results.append({
+                "id": self._ids[row],
+                "candidate": self._texts[row],
+                "similarity": similarity,
+                "score": similarity
+            })
+        return results
+    
+    def _row(self, candidate_id: str) -> int:
+        try:
+            return self._id_to_row[candidate_id]
+        except KeyError:
+            raise KeyError(f"Candidato no encontrado en el índice: {candidate_id}")
+    
+    def _check_new(self, ids: List[str]) -> None:
+        if len(set(ids)) != len(ids):
+            raise ValueError("IDs duplicados en la misma operación")
+        existing = [candidate_id for candidate_id in ids if candidate_id in self._id_to_row]
+        if existing:
+            raise ValueError(f"IDs ya existentes en el índice: {existing[:5]}")
+    
+    def _check_existing(self, ids: List[str]) -> None:
+        if len(set(ids)) != len(ids):
+            raise ValueError("IDs duplicados en la misma operación")
+        for candidate_id in ids:
+            self._row(candidate_id)
+    
+    def _ensure_writable(self) -> None:
+        """Copiar a RAM (float32) una matriz de solo lectura (memmap/float16)"""
+        if self._matrix.flags.writeable and self._matrix.dtype == np.float32:
+            return
+        
+        matrix = np.zeros((max(1, self._size), self.dimension), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+    
+    def _reserve(self, size: int) -> None:
+        """Asegurar capacidad para `size` filas (crecimiento x2)"""
+        self._ensure_writable()
+        capacity = self._matrix.shape[0]
+        if size <= capacity:
+            return
+        
+        # Un almacén vacío abierto con load() deja una matriz de 0 filas
+        capacity = max(capacity, 1)
+        while capacity < size:
+            capacity *= 2
+        
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+    
+    @staticmethod
+    def _as_lists(ids, texts):
+        if isinstance(ids, str):
+            ids = [ids]
+        if isinstance(texts, str):
+            texts = [texts]
+        ids, texts = list(ids), list(texts)
+        if len(ids) != len(texts):
+            raise ValueError("ids y texts deben tener la misma longitud")
+        return ids, texts
+
+
+def _codes_path(store_dir: Path, backend: Optional[str]) -> Path:
+    """Archivo de códigos cuantizados dentro de un almacén"""
+    return Path(store_dir) / f"quantized-{backend}.npz"
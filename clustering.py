@@ -0,0 +1,480 @@
+"""
+CLUSTERING INCREMENTAL (MINI-BATCH K-MEANS)
+Agrupa embeddings normalizados actualizando los centroides por mini-batches
+(Sculley, 2010), así que el corpus se recorre por bloques (p. ej. un memmap
+de embedding_store con millones de CVs) sin tenerlo entero en RAM.
+
+Los centroides y sus conteos se persisten: asignar un CV nuevo cuesta O(k)
+productos punto y un re-entrenamiento puede partir de los centroides
+anteriores (warm start) en vez de empezar de cero.
+
+También incluye la elección automática de k (silhouette o Davies–Bouldin
+sobre una submuestra) y el resumen de cada cluster (centroide, medoide y
+términos distintivos) a partir de embeddings y conteos ya calculados.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+
+
+class ClusterModel:
+    """
+    K-means por mini-batches sobre embeddings
+    
+    La asignación usa distancia euclídea: argmin ||x - c||² =
+    argmax (x·c - ||c||²/2), un producto de matrices por bloque.
+    """
+    
+    def __init__(
+        self,
+        n_clusters: int,
+        batch_size: int = 4096,
+        seed: int = 42,
+        centroids: Optional[np.ndarray] = None,
+        counts: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            n_clusters: Número de clusters (k)
+            batch_size: Vectores por actualización de centroides
+            seed: Semilla de la inicialización y del orden de los batches
+            centroids: Centroides iniciales (warm start)
+            counts: Vectores vistos por centroide (peso de los centroides
+                    iniciales frente a los datos nuevos)
+        """
+        if n_clusters < 1:
+            raise ValueError(f"n_clusters debe ser >= 1, no {n_clusters}")
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+        
+        self.centroids: Optional[np.ndarray] = None
+        self.counts = np.zeros(n_clusters, dtype=np.float64)
+        if centroids is not None:
+            centroids = np.asarray(centroids, dtype=np.float32)
+            if len(centroids) != n_clusters:
+                raise ValueError(f"{len(centroids)} centroides para n_clusters={n_clusters}")
+            self.centroids = centroids.copy()
+            self.counts = np.asarray(counts if counts is not None else np.ones(n_clusters), dtype=np.float64)
+    
+    @property
+    def fitted(self) -> bool:
+        return self.centroids is not None
+    
+    # =========================================================================
+    # ENTRENAMIENTO
+    # =========================================================================
+    
+    def partial_fit(self, embeddings: np.ndarray) -> "ClusterModel":
+        """
+        Actualizar los centroides con un batch
+        
+        Cada centroide se mueve hacia la media de sus vectores del batch
+        con tasa 1/conteo: los centroides con mucha historia cambian poco.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if not len(embeddings):
+            return self
+        if self.centroids is None:
+            self._init_centroids(embeddings)
+        
+        labels = self.predict(embeddings)
+        batch_counts = np.bincount(labels, minlength=self.n_clusters)
+        # Suma por cluster como producto disperso one-hot (k, n) · (n, dim)
+        one_hot = sparse.csr_matrix(
+            (np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+            shape=(self.n_clusters, len(labels))
+        )
+        sums = np.asarray(one_hot @ embeddings, dtype=np.float32)
+        
+        touched = batch_counts > 0
+        self.counts[touched] += batch_counts[touched]
+        rate = (batch_counts[touched] / self.counts[touched]).astype(np.float32)[:, None]
+        means = sums[touched] / batch_counts[touched, None]
+        self.centroids[touched] += rate * (means - self.centroids[touched])
+        return self
+    
+    def fit(self, embeddings: np.ndarray, epochs: int = 3, block_size: int = 65536) -> "ClusterModel":
+        """
+        Entrenar recorriendo una matriz (o memmap) por bloques
+        
+        Los bloques se visitan en orden aleatorio en cada época y dentro de
+        cada bloque los vectores se barajan en mini-batches.
+        
+        Args:
+            embeddings: Matriz (n, dim) normalizada
+            epochs: Pasadas sobre el corpus
+            block_size: Filas leídas del disco por bloque
+        """
+        n = len(embeddings)
+        if not self.fitted:
+            if n < self.n_clusters:
+                raise ValueError(f"n_clusters={self.n_clusters} mayor que el número de vectores ({n})")
+            # k-means++ sobre una muestra de todo el corpus
+            sample_size = min(n, max(self.batch_size, 4 * self.n_clusters))
+            sample = np.sort(self._rng.choice(n, sample_size, replace=False))
+            self._init_centroids(np.asarray(embeddings[sample], dtype=np.float32))
+        
+        for _ in range(epochs):
+            for batch in self._batches(embeddings, block_size):
+                self.partial_fit(batch)
+        return self
+    
+    # =========================================================================
+    # ASIGNACIÓN
+    # =========================================================================
+    
+    def predict(self, embeddings: np.ndarray, block_size: int = 65536) -> np.ndarray:
+        """Cluster más cercano de cada vector: O(k) por vector"""
+        if self.centroids is None:
+            raise RuntimeError("Modelo de clusters no entrenado. Use fit() primero.")
+        
+        embeddings = np.atleast_2d(embeddings)
+        half_norms = 0.5 * np.einsum("kd,kd->k", self.centroids, self.centroids)
+        labels = np.empty(len(embeddings), dtype=np.int64)
+        for start in range(0, len(embeddings), block_size):
+            block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+            labels[start:start + len(block)] = np.argmax(block @ self.centroids.T - half_norms, axis=1)
+        return labels
+    
+    def inertia(self, embeddings: np.ndarray, block_size: int = 65536) -> float:
+        """Suma de distancias cuadradas de cada vector a su centroide"""
+        total = 0.0
+        for start in range(0, len(embeddings), block_size):
+            block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+            nearest = self.centroids[self.predict(block)]
+            total += float(np.square(block - nearest).sum())
+        return total
+    
+    # =========================================================================
+    # PERSISTENCIA
+    # =========================================================================
+    
+    def save(self, path: str, fingerprint: Optional[str] = None) -> Path:
+        """Guardar centroides y conteos (.npz) con el fingerprint del modelo"""
+        if self.centroids is None:
+            raise RuntimeError("No hay centroides que guardar")
+        
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"n_clusters": self.n_clusters, "model_fingerprint": fingerprint}
+        
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.centroids, counts=self.counts, meta=np.array(json.dumps(meta)))
+        tmp_path.replace(path)
+        return path
+    
+    @classmethod
+    def load(cls, path: str, fingerprint: Optional[str] = None, **params) -> "ClusterModel":
+        """
+        Cargar un modelo guardado con save()
+        
+        Raises:
+            ValueError: los centroides se calcularon con otro modelo
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if fingerprint and meta.get("model_fingerprint") != fingerprint:
+                raise ValueError(
+                    f"Centroides de {path} calculados con otro modelo "
+                    f"({meta.get('model_fingerprint')} != {fingerprint})"
+                )
+            return cls(meta["n_clusters"], centroids=data["centroids"], counts=data["counts"], **params)
+    
+    # =========================================================================
+    # UTILIDADES INTERNAS
+    # =========================================================================
+    
+    def _init_centroids(self, embeddings: np.ndarray) -> None:
+        """
+        k-means++ greedy (fit: sobre una muestra; partial_fit: sobre el primer batch)
+        
+        En cada paso se sortean varios candidatos y se queda el que más
+        reduce la suma de distancias: evita sembrar dos centroides en el
+        mismo grupo, algo que el mini-batch no corrige después.
+        """
+        if len(embeddings) < self.n_clusters:
+            raise ValueError(f"El primer batch ({len(embeddings)}) tiene menos vectores que n_clusters")
+        
+        trials = 2 + int(np.log(self.n_clusters))
+        squared = np.einsum("nd,nd->n", embeddings, embeddings)
+        
+        centroids = np.empty((self.n_clusters, embeddings.shape[1]), dtype=np.float32)
+        centroids[0] = embeddings[self._rng.integers(len(embeddings))]
+        distances = np.square(embeddings - centroids[0]).sum(axis=1)
+        for j in range(1, self.n_clusters):
+            total = distances.sum()
+            if total > 0:
+                candidates = self._rng.choice(len(embeddings), trials, p=distances / total)
+            else:
+                candidates = self._rng.integers(len(embeddings), size=trials)
+            # Distancias (trials, n) a cada candidato y costo si se eligiera
+            candidate_distances = np.maximum(
+                squared[candidates, None] + squared[None, :] - 2 * embeddings[candidates] @ embeddings.T, 0
+            )
+            candidate_distances = np.minimum(distances, candidate_distances)
+            best = int(candidate_distances.sum(axis=1).argmin())
+            centroids[j] = embeddings[candidates[best]]
+            distances = candidate_distances[best]
+        
+        self.centroids = centroids
+        self.counts = np.zeros(self.n_clusters, dtype=np.float64)
+    
+    def _batches(self, embeddings: np.ndarray, block_size: int) -> Iterator[np.ndarray]:
+        block_size = max(block_size, self.batch_size)
+        for start in self._rng.permutation(np.arange(0, len(embeddings), block_size)):
+            block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+            block = block[self._rng.permutation(len(block))]
+            for offset in range(0, len(block), self.batch_size):
+                yield block[offset:offset + self.batch_size]
+
+
+# =============================================================================
+# SELECCIÓN DEL NÚMERO DE CLUSTERS
+# =============================================================================
+
+SELECTION_METRICS = ("silhouette", "davies_bouldin")
+
+
+def pairwise_distances(embeddings: np.ndarray, block_size: int = 1024) -> np.ndarray:
+    """Matriz (n, n) de distancias euclídeas, calculada por bloques de filas"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    squared = np.einsum("nd,nd->n", embeddings, embeddings)
+    distances = np.empty((len(embeddings), len(embeddings)), dtype=np.float32)
+    for start in range(0, len(embeddings), block_size):
+        block = embeddings[start:start + block_size]
+        distances[start:start + len(block)] = np.sqrt(np.maximum(
+            squared[start:start + len(block), None] + squared[None, :] - 2 * block @ embeddings.T, 0
+        ))
+    return distances
+
+
+def silhouette_score(
+    embeddings: np.ndarray,
+    labels: np.ndarray,
+    block_size: int = 1024,
+    distances: Optional[np.ndarray] = None
+) -> float:
+    """
+    Silhouette medio (distancia euclídea), por bloques de filas
+    
+    La distancia media de cada punto a cada cluster sale de un producto
+    (bloque de distancias) · one-hot(labels): nunca se materializa más de
+    block_size x n distancias.
+    
+    Args:
+        distances: Matriz de pairwise_distances(embeddings) ya calculada
+            (para puntuar varios etiquetados de la misma muestra)
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    labels = np.asarray(labels, dtype=np.int64)
+    n = len(embeddings)
+    k = int(labels.max()) + 1
+    counts = np.bincount(labels, minlength=k).astype(np.float32)
+    if np.count_nonzero(counts) < 2:
+        return 0.0
+    
+    one_hot = sparse.csr_matrix((np.ones(n, dtype=np.float32), (np.arange(n), labels)), shape=(n, k))
+    squared = np.einsum("nd,nd->n", embeddings, embeddings) if distances is None else None
+    
+    silhouettes = np.empty(n, dtype=np.float32)
+    for start in range(0, n, block_size):
+        block = embeddings[start:start + block_size]
+        rows = np.arange(len(block))
+        own = labels[start:start + len(block)]
+        
+        if distances is None:
+            block_distances = np.sqrt(np.maximum(
+                squared[start:start + len(block), None] + squared[None, :] - 2 * block @ embeddings.T, 0
+            ))
+        else:
+            block_distances = distances[start:start + len(block)]
+        sums = np.asarray(one_hot.T @ block_distances.T).T
+        
+        # a: distancia media a su cluster (sin contarse a sí mismo)
+        a = sums[rows, own] / np.maximum(counts[own] - 1, 1)
+        # b: menor distancia media a otro cluster
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = sums / counts
+        means[:, counts == 0] = np.inf
+        means[rows, own] = np.inf
+        b = means.min(axis=1)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (b - a) / np.maximum(a, b)
+        scores[counts[own] <= 1] = 0.0
+        silhouettes[start:start + len(block)] = np.nan_to_num(scores)
+    
+    return float(silhouettes.mean())
+
+
+def davies_bouldin_score(embeddings: np.ndarray, labels: np.ndarray) -> float:
+    """Índice de Davies–Bouldin (menor = clusters más compactos y separados)"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    labels = np.asarray(labels, dtype=np.int64)
+    present = np.unique(labels)
+    if len(present) < 2:
+        return float("inf")
+    
+    labels = np.searchsorted(present, labels)
+    k = len(present)
+    counts = np.bincount(labels, minlength=k).astype(np.float32)
+    one_hot = sparse.csr_matrix(
+        (np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+        shape=(k, len(labels))
+    )
+    centroids = np.asarray(one_hot @ embeddings) / counts[:, None]
+    
+    scatter = np.bincount(
+        labels,
+        weights=np.linalg.norm(embeddings - centroids[labels], axis=1),
+        minlength=k
+    ) / counts
+    separation = np.linalg.norm(centroids[:, None, :] - centroids[None, :, :], axis=2)
+    
+    # Centroides coincidentes: separación 0 = peor caso
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.nan_to_num((scatter[:, None] + scatter[None, :]) / separation, nan=np.inf)
+    np.fill_diagonal(ratios, -np.inf)
+    return float(ratios.max(axis=1).mean())
+
+
+def select_n_clusters(
+    embeddings: np.ndarray,
+    k_values: Iterable[int] = range(2, 11),
+    metric: str = "silhouette",
+    sample_size: int = 2000,
+    seed: int = 42
+) -> Tuple[int, Dict[int, float]]:
+    """
+    Elegir k barriendo candidatos sobre una submuestra aleatoria
+    
+    Para cada k se agrupa la submuestra y se puntúa con silhouette (mayor
+    es mejor) o Davies–Bouldin (menor es mejor). El costo depende de
+    sample_size, no del tamaño del corpus.
+    
+    Args:
+        embeddings: Matriz (n, dim) normalizada; puede ser un memmap
+        k_values: Valores de k a probar (se descartan los >= muestra)
+        metric: 'silhouette' o 'davies_bouldin'
+        sample_size: Vectores de la submuestra
+        seed: Semilla de la muestra y del clustering
+    
+    Returns:
+        (k elegido, {k: score})
+    """
+    if metric not in SELECTION_METRICS:
+        raise ValueError(f"Métrica desconocida: {metric} (usar {SELECTION_METRICS})")
+    
+    n = len(embeddings)
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(n, min(n, sample_size), replace=False))
+    sample = np.asarray(embeddings[sample], dtype=np.float32)
+    
+    k_values = [k for k in k_values if 2 <= k < len(sample)]
+    if not k_values:
+        raise ValueError(f"Ningún k candidato es válido para {len(sample)} vectores")
+    
+    # Las distancias de la muestra no dependen de k: se calculan una vez
+    distances = pairwise_distances(sample) if metric == "silhouette" else None
+    
+    scores: Dict[int, float] = {}
+    for k in k_values:
+        model = ClusterModel(k, batch_size=len(sample), seed=seed).fit(sample, epochs=10)
+        labels = model.predict(sample)
+        if metric == "silhouette":
+            scores[k] = silhouette_score(sample, labels, distances=distances)
+        else:
+            scores[k] = davies_bouldin_score(sample, labels)
+    
+    best = max(scores, key=scores.get) if metric == "silhouette" else min(scores, key=scores.get)
+    return best, scores
+
+
+# =============================================================================
+# RESUMEN DE CLUSTERS
+# =============================================================================
+
+def summarize_clusters(
+    embeddings: np.ndarray,
+    labels: np.ndarray,
+    counts: Optional[sparse.spmatrix] = None,
+    vocabulary: Optional[List[str]] = None,
+    n_members: int = 3,
+    n_terms: int = 8,
+    medoid_candidates: int = 64
+) -> Dict[int, dict]:
+    """
+    Resumen de cada cluster a partir de embeddings y conteos ya calculados
+    
+    - centroid: media (normalizada) de los embeddings del cluster
+    - representatives: filas más cercanas al centroide
+    - medoid: fila con menor distancia total al resto del cluster, buscada
+      entre los medoid_candidates más cercanos al centroide (O(candidatos·m)
+      en vez de O(m²) para clusters de miles de miembros)
+    - top_terms: términos con mayor p(t|c)·log(p(t|c) / p(t)) sobre la
+      frecuencia documental; los términos presentes en todo el corpus
+      puntúan ~0
+    
+    Args:
+        embeddings: Matriz (n, dim) normalizada
+        labels: Cluster de cada fila
+        counts: Matriz (n, términos) de lexical_index.count_matrix (opcional)
+        vocabulary: Término de cada columna de counts
+        n_members: Representantes por cluster
+        n_terms: Términos por cluster
+        medoid_candidates: Candidatos evaluados para el medoide
+    
+    Returns:
+        {cluster: {"size", "centroid", "medoid", "representatives", "top_terms"}}
+        con filas (índices) en medoid y representatives
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    labels = np.asarray(labels, dtype=np.int64)
+    
+    if counts is not None:
+        presence = sparse.csr_matrix(counts, dtype=np.float32, copy=True)
+        presence.data[:] = 1
+        corpus_rate = np.asarray(presence.sum(axis=0)).ravel() / len(labels)
+    
+    summaries: Dict[int, dict] = {}
+    for cluster in np.unique(labels):
+        members = np.flatnonzero(labels == cluster)
+        vectors = embeddings[members]
+        
+        centroid = vectors.mean(axis=0)
+        centroid /= max(float(np.linalg.norm(centroid)), 1e-12)
+        similarity = vectors @ centroid
+        order = np.argsort(-similarity, kind="stable")
+        
+        # Medoide entre los más cercanos al centroide (distancia euclídea total)
+        candidates = order[:medoid_candidates]
+        squared = np.einsum("nd,nd->n", vectors, vectors)
+        distances = np.sqrt(np.maximum(
+            squared[candidates, None] + squared[None, :] - 2 * vectors[candidates] @ vectors.T, 0
+        ))
+        medoid = members[candidates[distances.sum(axis=1).argmin()]]
+        
+        summary = {
+            "size": len(members),
+            "centroid": centroid,
+            "medoid": int(medoid),
+            "representatives": [int(row) for row in members[order[:n_members]]],
+            "top_terms": [],
+        }
+        
+        if counts is not None:
+            rate = np.asarray(presence[members].sum(axis=0)).ravel() / len(members)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = np.nan_to_num(rate * np.log(rate / corpus_rate))
+            top = [column for column in np.argsort(-scores, kind="stable")[:n_terms] if scores[column] > 0]
+            summary["top_terms"] = [(vocabulary[column], round(float(scores[column]), 4)) for column in top]
+        
+        summaries[int(cluster)] = summary
+    
+    return summaries
@@ -0,0 +1,198 @@
+"""
+DETECCIÓN DE CVs CASI DUPLICADOS (LSH DE HIPERPLANOS ALEATORIOS)
+El mismo CV llega desde varios portales con pequeñas ediciones. Comparar
+todos los pares es cuadrático (2M CVs = 2·10¹² pares), así que cada
+embedding se firma con n_bits hiperplanos aleatorios por tabla (SimHash):
+dos vectores con ángulo θ coinciden en un bit con probabilidad 1 - θ/π.
+Solo los vectores que comparten cubeta en alguna tabla se comparan con
+coseno exacto contra el umbral.
+
+Con los valores por defecto (16 tablas de 16 bits) un par con coseno 0.95
+se detecta con probabilidad ~0.96 y 0.98 con ~0.999, mientras que un par
+no relacionado (coseno ~0) cae en la misma cubeta con probabilidad
+~16/65536.
+
+La inserción es incremental: cada vector nuevo se compara con lo ya
+insertado (incluido su propio batch) y los duplicados se unen en grupos
+(union-find), así que los grupos son transitivos.
+"""
+
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from loader import normalize_embeddings
+
+
+class LSHDeduplicator:
+    """Índice LSH incremental para agrupar embeddings casi duplicados"""
+    
+    def __init__(
+        self,
+        dimension: int,
+        threshold: float = 0.95,
+        n_tables: int = 16,
+        n_bits: int = 16,
+        seed: int = 42,
+        initial_capacity: int = 1024
+    ):
+        """
+        Args:
+            dimension: Dimensión de los embeddings
+            threshold: Coseno mínimo para considerar dos vectores duplicados
+            n_tables: Tablas hash (más tablas = más recall, más memoria)
+            n_bits: Hiperplanos por tabla (más bits = cubetas más chicas)
+            seed: Semilla de los hiperplanos
+            initial_capacity: Filas reservadas inicialmente
+        """
+        if not 1 <= n_bits <= 63:
+            raise ValueError("n_bits debe estar entre 1 y 63")
+        
+        self.dimension = dimension
+        self.threshold = threshold
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((dimension, n_tables * n_bits)).astype(np.float32)
+        self._powers = (np.uint64(1) << np.arange(n_bits, dtype=np.uint64))
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(n_tables)]
+        
+        self._matrix = np.zeros((max(1, initial_capacity), dimension), dtype=np.float32)
+        self._size = 0
+        self._ids: List[Hashable] = []
+        self._parent: List[int] = []
+        
+        # Estadísticas (comparaciones exactas vs. todos los pares)
+        self.comparisons = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    # =========================================================================
+    # INSERCIÓN
+    # =========================================================================
+    
+    def add(
+        self,
+        embeddings: np.ndarray,
+        ids: Optional[Sequence[Hashable]] = None
+    ) -> List[Optional[Hashable]]:
+        """
+        Insertar embeddings (streaming) y unirlos a sus duplicados
+        
+        Args:
+            embeddings: Matriz (n, dim); se normaliza
+            ids: Identificador de cada fila (por defecto, su posición global)
+        
+        Returns:
+            Por cada fila, el id del duplicado más parecido ya insertado
+            (o None si es nuevo)
+        """
+        embeddings = normalize_embeddings(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        if ids is None:
+            ids = range(self._size, self._size + len(embeddings))
+        ids = list(ids)
+        if len(ids) != len(embeddings):
+            raise ValueError("ids y embeddings deben tener la misma longitud")
+        
+        self._reserve(self._size + len(embeddings))
+        keys = self._signatures(embeddings)
+        
+        matches: List[Optional[Hashable]] = []
+        for vector, vector_keys, item_id in zip(embeddings, keys, ids):
+            row = self._size
+            rows, similarities = self._matches(vector, vector_keys)
+            
+            self._matrix[row] = vector
+            self._ids.append(item_id)
+            self._parent.append(row)
+            for table, key in zip(self._tables, vector_keys.tolist()):
+                table.setdefault(key, []).append(row)
+            self._size += 1
+            
+            # Unir con todos los que superan el umbral (puede fusionar grupos)
+            for match in rows.tolist():
+                self._union(row, match)
+            matches.append(self._ids[rows[similarities.argmax()]] if len(rows) else None)
+        
+        return matches
+    
+    # =========================================================================
+    # CONSULTA
+    # =========================================================================
+    
+    def query(self, embedding: np.ndarray) -> List[Tuple[Hashable, float]]:
+        """Duplicados ya insertados de un embedding (sin insertarlo), mejor primero"""
+        vector = normalize_embeddings(np.atleast_2d(np.asarray(embedding, dtype=np.float32)))[0]
+        rows, similarities = self._matches(vector, self._signatures(vector[None, :])[0])
+        order = np.argsort(-similarities, kind="stable")
+        return [(self._ids[rows[i]], float(similarities[i])) for i in order]
+    
+    def groups(self, min_size: int = 2) -> List[List[Hashable]]:
+        """Grupos de duplicados (componentes conexas), en orden de inserción"""
+        members: Dict[int, List[Hashable]] = {}
+        for row in range(self._size):
+            members.setdefault(self._find(row), []).append(self._ids[row])
+        return [group for group in members.values() if len(group) >= min_size]
+    
+    def get_stats(self) -> dict:
+        """Tamaño, cubetas y comparaciones exactas realizadas"""
+        all_pairs = self._size * (self._size - 1) // 2
+        return {
+            "size": self._size,
+            "n_tables": self.n_tables,
+            "n_bits": self.n_bits,
+            "threshold": self.threshold,
+            "buckets": sum(len(table) for table in self._tables),
+            "comparisons": self.comparisons,
+            "comparison_ratio": self.comparisons / all_pairs if all_pairs else 0.0,
+        }
+    
+    # =========================================================================
+    # UTILIDADES INTERNAS
+    # =========================================================================
+    
+    def _signatures(self, embeddings: np.ndarray) -> np.ndarray:
+        """Clave de cubeta por tabla: (n, n_tables) uint64"""
+        bits = (embeddings @ self._planes > 0).reshape(len(embeddings), self.n_tables, self.n_bits)
+        return (bits.astype(np.uint64) * self._powers).sum(axis=2, dtype=np.uint64)
+    
+    def _candidates(self, keys: np.ndarray) -> np.ndarray:
+        rows = [table[key] for table, key in zip(self._tables, keys.tolist()) if key in table]
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(rows))
+    
+    def _matches(self, vector: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Filas candidatas que superan el umbral con coseno exacto"""
+        rows = self._candidates(keys)
+        self.comparisons += len(rows)
+        similarities = self._matrix[rows] @ vector
+        keep = similarities >= self.threshold
+        return rows[keep], similarities[keep]
+    
+    def _find(self, row: int) -> int:
+        parent = self._parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+    
+    def _union(self, a: int, b: int) -> None:
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            # El representante es la fila más antigua del grupo
+            self._parent[max(root_a, root_b)] = min(root_a, root_b)
+    
+    def _reserve(self, size: int) -> None:
+        """Asegurar capacidad para `size` filas (crecimiento x2)"""
+        capacity = self._matrix.shape[0]
+        if size <= capacity:
+            return
+        
+        while capacity < size:
+            capacity *= 2
+        
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
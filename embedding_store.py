@@ -0,0 +1,292 @@
+"""
+ALMACÉN DE EMBEDDINGS EN DISCO
+Formato simple para embeddings precalculados que se abre con numpy.memmap:
+varios procesos (workers de uvicorn) comparten la misma copia en page cache
+
+Estructura de un almacén (directorio):
+    header.json      - dtype, dimensión, número de filas, fingerprint del modelo
+    embeddings.bin   - matriz cruda (count x dimension) float32 o float16, row-major
+    ids.txt          - un ID por línea, en el orden de las filas
+
+EmbeddingWriter añade filas por chunks: el `count` del header hace de
+checkpoint (los datos escritos después del último header se descartan
+al reanudar).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+
+
+FORMAT_NAME = "modrrhh-embeddings"
+FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16")
+
+HEADER_FILE = "header.json"
+MATRIX_FILE = "embeddings.bin"
+IDS_FILE = "ids.txt"
+
+
+def save_embeddings(
+    path: str,
+    ids: Iterable[str],
+    embeddings: np.ndarray,
+    dtype: str = "float32",
+    fingerprint: Optional[str] = None,
+    normalized: bool = True,
+    chunk_size: int = 65536
+) -> Path:
+    """
+    Guardar embeddings en formato memmap
+    
+    Args:
+        path: Directorio del almacén (se crea si no existe)
+        ids: IDs en el orden de las filas (sin saltos de línea)
+        embeddings: Matriz (n, dim); puede ser a su vez un memmap
+        dtype: 'float32' o 'float16'
+        fingerprint: Fingerprint del modelo que generó los vectores
+        normalized: Si los vectores ya tienen norma L2 = 1
+        chunk_size: Filas escritas por bloque (memoria acotada)
+    
+    Returns:
+        Ruta del almacén
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"dtype no soportado: {dtype} (usar {SUPPORTED_DTYPES})")
+    
+    ids = [str(i) for i in ids]
+    if any("\n" in i or "\r" in i for i in ids):
+        raise ValueError("Los IDs no pueden contener saltos de línea")
+    
+    count, dimension = embeddings.shape
+    if len(ids) != count:
+        raise ValueError(f"{len(ids)} IDs para {count} embeddings")
+    
+    store_dir = Path(path)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Se escribe en temporales: el almacén puede estar abierto con memmap
+    # (p. ej. guardar un índice sobre la misma ruta de la que se cargó)
+    matrix_tmp = store_dir / (MATRIX_FILE + ".tmp")
+    with open(matrix_tmp, "wb") as f:
+        for start in range(0, count, chunk_size):
+            np.ascontiguousarray(embeddings[start:start + chunk_size], dtype=dtype).tofile(f)
+    
+    ids_tmp = store_dir / (IDS_FILE + ".tmp")
+    with open(ids_tmp, "w", encoding="utf-8") as f:
+        for candidate_id in ids:
+            f.write(candidate_id + "\n")
+    
+    # Sin header el almacén no es válido: se quita antes de reemplazar
+    # los datos y se escribe al final
+    if (store_dir / HEADER_FILE).exists():
+        os.remove(store_dir / HEADER_FILE)
+    os.replace(matrix_tmp, store_dir / MATRIX_FILE)
+    os.replace(ids_tmp, store_dir / IDS_FILE)
+    
+    _write_header(store_dir, {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "dtype": dtype,
+        "dimension": int(dimension),
+        "count": int(count),
+        "normalized": bool(normalized),
+        "model_fingerprint": fingerprint,
+    })
+    
+    return store_dir
+
+
+class EmbeddingWriter:
+    """
+    Escritura incremental de un almacén, chunk a chunk, con reanudación
+    
+    Cada append() escribe las filas y los IDs al final de los archivos,
+    hace fsync y solo entonces actualiza el header. Si el proceso muere a
+    mitad de un chunk, al reabrir con resume=True se truncan los datos
+    al `count` del header y se continúa desde ahí.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        dimension: int,
+        dtype: str = "float32",
+        fingerprint: Optional[str] = None,
+        normalized: bool = True,
+        resume: bool = True
+    ):
+        """
+        Args:
+            path: Directorio del almacén
+            dimension: Dimensión de los embeddings
+            dtype: 'float32' o 'float16'
+            fingerprint: Fingerprint del modelo que genera los vectores
+            normalized: Si los vectores tienen norma L2 = 1
+            resume: True = continuar un almacén existente; False = empezar de cero
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype no soportado: {dtype} (usar {SUPPORTED_DTYPES})")
+        
+        self.store_dir = Path(path)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.header = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "dtype": dtype,
+            "dimension": int(dimension),
+            "count": 0,
+            "normalized": bool(normalized),
+            "model_fingerprint": fingerprint,
+            "complete": False,
+        }
+        
+        if resume and (self.store_dir / HEADER_FILE).exists():
+            self._resume(read_header(self.store_dir))
+        else:
+            if (self.store_dir / HEADER_FILE).exists():
+                os.remove(self.store_dir / HEADER_FILE)
+            open(self.store_dir / MATRIX_FILE, "wb").close()
+            open(self.store_dir / IDS_FILE, "w", encoding="utf-8").close()
+            _write_header(self.store_dir, self.header)
+        
+        self._matrix_file = open(self.store_dir / MATRIX_FILE, "ab")
+        self._ids_file = open(self.store_dir / IDS_FILE, "a", encoding="utf-8")
+    
+    @property
+    def count(self) -> int:
+        """Filas confirmadas (checkpoint)"""
+        return self.header["count"]
+    
+    def append(self, ids: Iterable[str], embeddings: np.ndarray) -> int:
+        """
+        Añadir un chunk de filas y confirmar el checkpoint
+        
+        Returns:
+            Filas totales del almacén
+        """
+        ids = [str(i) for i in ids]
+        if any("\n" in i or "\r" in i for i in ids):
+            raise ValueError("Los IDs no pueden contener saltos de línea")
+        if embeddings.shape != (len(ids), self.header["dimension"]):
+            raise ValueError(
+                f"Chunk con forma {embeddings.shape}, se esperaba "
+                f"({len(ids)}, {self.header['dimension']})"
+            )
+        
+        np.ascontiguousarray(embeddings, dtype=self.header["dtype"]).tofile(self._matrix_file)
+        self._ids_file.write("".join(candidate_id + "\n" for candidate_id in ids))
+        for f in (self._matrix_file, self._ids_file):
+            f.flush()
+            os.fsync(f.fileno())
+        
+        self.header["count"] += len(ids)
+        _write_header(self.store_dir, self.header)
+        return self.count
+    
+    def close(self, complete: bool = True) -> Path:
+        """Cerrar archivos; complete=True marca el almacén como terminado"""
+        self._matrix_file.close()
+        self._ids_file.close()
+        if complete and not self.header["complete"]:
+            self.header["complete"] = True
+            _write_header(self.store_dir, self.header)
+        return self.store_dir
+    
+    def __enter__(self) -> "EmbeddingWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Con excepción el almacén queda incompleto pero reanudable
+        self.close(complete=exc_type is None)
+    
+    def _resume(self, header: dict) -> None:
+        for key in ("dtype", "dimension", "normalized", "model_fingerprint"):
+            if header.get(key) != self.header[key]:
+                raise ValueError(
+                    f"No se puede reanudar {self.store_dir}: {key} "
+                    f"{header.get(key)!r} != {self.header[key]!r}"
+                )
+        
+        count = header["count"]
+        row_bytes = header["dimension"] * np.dtype(header["dtype"]).itemsize
+        matrix_path = self.store_dir / MATRIX_FILE
+        if matrix_path.stat().st_size < count * row_bytes:
+            raise ValueError(f"Almacén corrupto: faltan filas en {matrix_path}")
+        
+        # Descartar lo escrito después del último checkpoint
+        with open(matrix_path, "r+b") as f:
+            f.truncate(count * row_bytes)
+        
+        with open(self.store_dir / IDS_FILE, "r+b") as f:
+            for _ in range(count):
+                if not f.readline():
+                    raise ValueError(f"Almacén corrupto: menos de {count} IDs")
+            f.truncate(f.tell())
+        
+        self.header.update(header, complete=False)
+        _write_header(self.store_dir, self.header)
+
+
+def load_embeddings(path: str, mmap: bool = True) -> Tuple[List[str], np.ndarray, dict]:
+    """
+    Abrir un almacén de embeddings
+    
+    Args:
+        path: Directorio del almacén
+        mmap: True = numpy.memmap de solo lectura (zero-copy, compartido
+              entre procesos); False = cargar la matriz en RAM
+    
+    Returns:
+        (ids, matriz, header)
+    """
+    store_dir = Path(path)
+    header = read_header(store_dir)
+    
+    count = header["count"]
+    shape = (count, header["dimension"])
+    matrix_path = store_dir / MATRIX_FILE
+    
+    if count == 0:
+        matrix = np.zeros(shape, dtype=header["dtype"])
+    elif mmap:
+        matrix = np.memmap(matrix_path, dtype=header["dtype"], mode="r", shape=shape)
+    else:
+        matrix = np.fromfile(matrix_path, dtype=header["dtype"], count=count * shape[1]).reshape(shape)
+    
+    with open(store_dir / IDS_FILE, "r", encoding="utf-8") as f:
+        ids = [line.rstrip("\n") for _, line in zip(range(count), f)]
+    
+    if len(ids) != count:
+        raise ValueError(f"Almacén corrupto: {len(ids)} IDs para {count} filas")
+    
+    return ids, matrix, header
+
+
+def read_header(path: str) -> dict:
+    """Leer y validar el header de un almacén"""
+    header_path = Path(path) / HEADER_FILE
+    if not header_path.exists():
+        raise FileNotFoundError(f"No se encontró almacén de embeddings en {path}")
+    
+    with open(header_path, "r", encoding="utf-8") as f:
+        header = json.load(f)
+    
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError(f"Formato de almacén desconocido: {header.get('format')}")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Versión de almacén no soportada: {header.get('version')}")
+    if header.get("dtype") not in SUPPORTED_DTYPES:
+        raise ValueError(f"dtype no soportado en almacén: {header.get('dtype')}")
+    
+    return header
+
+
+def _write_header(store_dir: Path, header: dict) -> None:
+    """Escribir header de forma atómica (tmp + rename)"""
+    tmp_path = store_dir / (HEADER_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp_path, store_dir / HEADER_FILE)
@@ -6,11 +6,30 @@ Mide el rendimiento del modelo en diferentes aspectos
 import os
 import json
 import time
+import itertools
 import numpy as np
 from pathlib import Path
 from typing import List, Tuple, Dict
 from sklearn.metrics.pairwise import cosine_similarity
-from loader import load_model
+from loader import load_model, normalize_embeddings
+
+
+# Ground truth de búsqueda (compartido por search_quality y ann_recall)
+SEARCH_QUERY = "senior python developer with machine learning experience"
+
+# Candidatos con relevancia manual (1=relevante, 0=no relevante)
+SEARCH_RELEVANCE = {
+    "python developer 5 years experience": 1,
+    "senior python engineer ml": 1,
+    "java developer 10 years": 0,
+    "python and machine learning specialist": 1,
+    "data scientist with python": 1,
+    "frontend developer javascript": 0,
+    "senior ml engineer tensorflow": 1,
+    "devops engineer kubernetes": 0,
+    "python backend developer": 1,
+    "marketing manager": 0
+}
 
 
 class ModelEvaluator:
@@ -138,39 +157,15 @@ class ModelEvaluator:
         """Evaluar calidad de búsqueda (ranking)"""
         print("🔎 Evaluando calidad de búsqueda...")
         
-        # Query
-        query = "senior python developer with machine learning experience"
-        
-        # Candidatos (algunos relevantes, otros no)
-        candidates = [
-            "python developer 5 years experience",
-            "senior python engineer ml",
-            "java developer 10 years",
-            "python and machine learning specialist",
-            "data scientist with python",
-            "frontend developer javascript",
-            "senior ml engineer tensorflow",
-            "devops engineer kubernetes",
-            "python backend developer",
-            "marketing manager"
-        ]
+        # Query y candidatos (algunos relevantes, otros no)
+        query = SEARCH_QUERY
+        candidates = list(SEARCH_RELEVANCE)
         
         # Buscar
         results = self.model.search(query, candidates, top_k=len(candidates))
         
         # Relevancia manual (1=relevante, 0=no relevante)
-        relevance = {
-            "python developer 5 years experience": 1,
-            "senior python engineer ml": 1,
-            "java developer 10 years": 0,
-            "python and machine learning specialist": 1,
-            "data scientist with python": 1,
-            "frontend developer javascript": 0,
-            "senior ml engineer tensorflow": 1,
-            "devops engineer kubernetes": 0,
-            "python backend developer": 1,
-            "marketing manager": 0
-        }
+        relevance = SEARCH_RELEVANCE
         
         # Calcular MRR (Mean Reciprocal Rank)
         mrr = 0
@@ -402,7 +397,180 @@ class ModelEvaluator:
         return results_dict
     
     # =========================================================================
-    # 7. RESUMEN EJECUTIVO
+    # 7. BÚSQUEDA APROXIMADA (ANN) VS EXACTA
+    # =========================================================================
+    
+    def measure_ann_recall(
+        self,
+        num_candidates: int = 5000,
+        k: int = 10,
+        backend: str = "numpy-ivf",
+        param_values: List[int] = None
+    ) -> Dict:
+        """
+        Medir recall@k y latencia del índice ANN contra búsqueda exacta
+        
+        El corpus son los candidatos del ground truth de búsqueda más
+        perfiles sintéticos de relleno (todos distintos, para que el top-k
+        exacto no dependa de desempates). Para cada valor de nprobe (IVF) o
+        ef (HNSW), según el backend que resulte de `backend` ("auto"
+        incluido), se reporta recall@k frente a fuerza bruta y cuántos
+        relevantes de SEARCH_RELEVANCE recupera la query de referencia.
+        """
+        print(f"🧭 Midiendo recall@{k} de ANN ({backend})...")
+        
+        corpus, index, queries, query_embs = self._recall_corpus(num_candidates)
+        exact = [set(index.search_embedding(q, k, exact=True)[0].tolist()) for q in query_embs]
+        
+        relevant_rows = {i for i, text in enumerate(corpus[:len(SEARCH_RELEVANCE)])
+                         if SEARCH_RELEVANCE[text] == 1}
+        relevant_in_exact = len(exact[0] & relevant_rows)
+        
+        start = time.time()
+        index.enable_ann(backend)
+        build_seconds = time.time() - start
+        
+        # El nombre del parámetro depende del backend resuelto, no del pedido
+        backend = index.ann.name
+        if backend == "hnswlib":
+            param_name = "ef"
+            param_values = param_values or [16, 32, 64, 128, 256]
+        else:
+            param_name = "nprobe"
+            param_values = param_values or [1, 2, 4, 8, 16, 32]
+        
+        sweep = []
+        for value in param_values:
+            index.set_ann_params(**{param_name: value})
+            
+            start = time.time()
+            approx = [set(index.search_embedding(q, k)[0].tolist()) for q in query_embs]
+            ms_per_query = (time.time() - start) / len(queries) * 1000
+            
+            recall = float(np.mean([len(a & e) / max(1, len(e)) for a, e in zip(approx, exact)]))
+            sweep.append({
+                param_name: value,
+                f"recall@{k}": recall,
+                "ms_per_query": ms_per_query,
+                "relevant_found": len(approx[0] & relevant_rows),
+            })
+            print(f"  ✓ {param_name}={value}: recall@{k}={recall:.4f}, {ms_per_query:.2f}ms/query")
+        
+        start = time.time()
+        for q in query_embs:
+            index.search_embedding(q, k, exact=True)
+        exact_ms = (time.time() - start) / len(queries) * 1000
+        print(f"  ✓ Exacta: {exact_ms:.2f}ms/query ({relevant_in_exact} relevantes en top-{k})\n")
+        
+        results_dict = {
+            "backend": backend,
+            "corpus_size": len(corpus),
+            "queries": len(queries),
+            "k": k,
+            "build_seconds": build_seconds,
+            "exact_ms_per_query": exact_ms,
+            "relevant_found_exact": relevant_in_exact,
+            "sweep": sweep,
+        }
+        
+        self.results["ann_recall"] = results_dict
+        return results_dict
+    
+    def measure_quantization_recall(
+        self,
+        num_candidates: int = 5000,
+        k: int = 10,
+        rescore_values: List[int] = None
+    ) -> Dict:
+        """
+        Medir la pérdida de recall@k de los códigos int8, binarios y PQ
+        
+        Se compara contra la búsqueda exacta float32 sobre el mismo corpus
+        que measure_ann_recall, sin re-scoring (rescore=0) y re-puntuando
+        con float32 los rescore*k mejores de cada código. Los codebooks PQ
+        se entrenan con este corpus sin guardarlos junto al modelo.
+        """
+        from quantization import PQCodebook
+        
+        print(f"🗜️  Midiendo recall@{k} de embeddings cuantizados...")
+        
+        corpus, index, queries, query_embs = self._recall_corpus(num_candidates)
+        exact = [set(index.search_embedding(q, k, exact=True)[0].tolist()) for q in query_embs]
+        rescore_values = rescore_values or [0, 2, 4, 10]
+        
+        backends = {}
+        for backend in ("int8", "binary", "pq"):
+            params = {"codebook": PQCodebook.train(index.embeddings)} if backend == "pq" else {}
+            index.enable_ann(backend, **params)
+            sweep = []
+            for rescore in rescore_values:
+                index.set_ann_params(rescore=rescore)
+                
+                start = time.time()
+                approx = [set(index.search_embedding(q, k)[0].tolist()) for q in query_embs]
+                ms_per_query = (time.time() - start) / len(queries) * 1000
+                
+                recall = float(np.mean([len(a & e) / max(1, len(e)) for a, e in zip(approx, exact)]))
+                sweep.append({"rescore": rescore, f"recall@{k}": recall, "ms_per_query": ms_per_query})
+                print(f"  ✓ {backend} rescore={rescore}: recall@{k}={recall:.4f}, {ms_per_query:.2f}ms/query")
+            
+            backends[backend] = {**index.ann.get_params(), "sweep": sweep}
+        index.disable_ann()
+        
+        results_dict = {
+            "corpus_size": len(corpus),
+            "queries": len(queries),
+            "k": k,
+            "float32_bytes_per_vector": index.dimension * 4,
+            "backends": backends,
+        }
+        print()
+        
+        self.results["quantization_recall"] = results_dict
+        return results_dict
+    
+    def _recall_corpus(self, num_candidates: int) -> Tuple:
+        """
+        Corpus de ground truth + perfiles sintéticos indexado, y queries
+        
+        Returns:
+            (corpus, índice, queries, embeddings de las queries)
+        """
+        from candidate_index import CandidateIndex
+        
+        roles = ["python developer", "java engineer", "data scientist", "frontend developer",
+                 "devops engineer", "ml engineer", "qa analyst", "product manager"]
+        skills = ["django", "spring", "tensorflow", "react", "kubernetes", "aws", "sql", "selenium"]
+        cities = ["madrid", "barcelona", "valencia", "sevilla", "bilbao",
+                  "lisboa", "berlin", "paris", "londres", "remote"]
+        
+        # Textos únicos: con duplicados el top-k exacto tiene empates y el
+        # recall dependería del orden en que cada backend los resuelve
+        combos = (
+            f"{role} with {first} and {second}, {years} years, {city}"
+            for years, city, role, first, second in itertools.product(
+                range(1, 16), cities, roles, skills, skills
+            )
+            if first != second
+        )
+        combos = itertools.chain(combos, (f"profile {i} with {skills[i % len(skills)]}"
+                                          for i in itertools.count()))
+        seen = set(SEARCH_RELEVANCE)
+        synthetic = list(itertools.islice(
+            (text for text in combos if text not in seen),
+            max(0, num_candidates - len(SEARCH_RELEVANCE))
+        ))
+        corpus = list(SEARCH_RELEVANCE) + synthetic
+        
+        index = CandidateIndex(self.model)
+        index.add([f"C{i:07d}" for i in range(len(corpus))], corpus)
+        
+        queries = [SEARCH_QUERY] + [f"senior {role}" for role in roles]
+        query_embs = normalize_embeddings(self.model.encode(queries))
+        return corpus, index, queries, query_embs
+    
+    # =========================================================================
+    # 8. RESUMEN EJECUTIVO
     # =========================================================================
     
     def generate_summary_report(self) -> Dict:
@@ -439,7 +607,7 @@ class ModelEvaluator:
         return summary
     
     # =========================================================================
-    # 8. GUARDAR RESULTADOS
+    # 9. GUARDAR RESULTADOS
     # =========================================================================
     
     def save_results(self, output_path: str = "evaluation_results.json"):
@@ -461,6 +629,8 @@ class ModelEvaluator:
         self.measure_clustering_quality()
         self.measure_embedding_distribution()
         self.measure_multilingual_performance()
+        self.measure_ann_recall(num_candidates=2000)
+        self.measure_quantization_recall(num_candidates=2000)
         
         # Resumen
         summary = self.generate_summary_report()
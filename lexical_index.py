@@ -0,0 +1,233 @@
+"""
+ÍNDICE LÉXICO BM25
+Complementa la búsqueda por embeddings con coincidencia exacta de tokens
+("Kubernetes", "AWS", "python 3.11", "c++") que los embeddings diluyen.
+
+Las filas siguen la convención de CandidateIndex (al eliminar, la última
+fila ocupa el hueco) para poder vivir al lado de la matriz de embeddings.
+También incluye la fusión de rankings (RRF y ponderada) usada por la
+búsqueda híbrida y la matriz de conteos usada para resumir clusters.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+
+from loader import top_k_indices
+
+
+# Palabras con puntos/símbolos internos: "node.js", "3.11", "c++", "c#"
+_TOKEN = re.compile(r"\w[\w.+#]*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens en minúsculas (NFC), conservando versiones y lenguajes tipo c++"""
+    text = unicodedata.normalize("NFC", text or "").casefold()
+    return [token.rstrip(".") for token in _TOKEN.findall(text)]
+
+
+class BM25Index:
+    """Índice invertido con scoring BM25 (Okapi)"""
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1: Saturación de la frecuencia de término
+            b: Normalización por longitud del documento
+        """
+        self.k1 = k1
+        self.b = b
+        
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._row_terms: List[Counter] = []
+        self._lengths: List[int] = []
+        self._total_length = 0
+        self._cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._row_terms)
+    
+    @property
+    def avg_length(self) -> float:
+        return self._total_length / len(self) if len(self) else 0.0
+    
+    # =========================================================================
+    # MODIFICACIÓN
+    # =========================================================================
+    
+    def add(self, text: str) -> int:
+        """Agregar un documento al final; retorna su fila"""
+        row = len(self._row_terms)
+        terms = Counter(tokenize(text))
+        self._row_terms.append(terms)
+        self._lengths.append(sum(terms.values()))
+        self._total_length += self._lengths[row]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[row] = tf
+            self._cache.pop(term, None)
+        return row
+    
+    def update(self, row: int, text: str) -> None:
+        """Reemplazar el texto de una fila"""
+        for term in self._row_terms[row]:
+            self._drop(term, row)
+        terms = Counter(tokenize(text))
+        self._total_length += sum(terms.values()) - self._lengths[row]
+        self._row_terms[row] = terms
+        self._lengths[row] = sum(terms.values())
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[row] = tf
+            self._cache.pop(term, None)
+    
+    def remove(self, row: int) -> None:
+        """Eliminar una fila moviendo la última al hueco (como CandidateIndex)"""
+        last = len(self._row_terms) - 1
+        for term in self._row_terms[row]:
+            self._drop(term, row)
+        self._total_length -= self._lengths[row]
+        
+        if row != last:
+            for term, tf in self._row_terms[last].items():
+                postings = self._postings[term]
+                del postings[last]
+                postings[row] = tf
+                self._cache.pop(term, None)
+            self._row_terms[row] = self._row_terms[last]
+            self._lengths[row] = self._lengths[last]
+        
+        self._row_terms.pop()
+        self._lengths.pop()
+    
+    # =========================================================================
+    # BÚSQUEDA
+    # =========================================================================
+    
+    def scores(self, query: str) -> np.ndarray:
+        """Score BM25 de la query para todas las filas (0 = sin coincidencias)"""
+        n = len(self)
+        scores = np.zeros(n, dtype=np.float32)
+        if not n:
+            return scores
+        
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(self.avg_length, 1e-9))
+        
+        for term in set(tokenize(query)):
+            rows, tfs = self._term_arrays(term)
+            if not len(rows):
+                continue
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+        return scores
+    
+    def search(
+        self,
+        query: str,
+        top_k: Optional[int] = 10,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k por BM25 (solo filas con al menos un término de la query)
+        
+        Args:
+            rows: Restringir a estas filas (pre-filtro)
+        
+        Returns:
+            (filas, scores) ordenados por score descendente
+        """
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if rows is not None:
+            candidates = np.intersect1d(candidates, rows)
+        order = top_k_indices(scores[candidates], top_k)
+        return candidates[order], scores[candidates[order]]
+    
+    # =========================================================================
+    # UTILIDADES INTERNAS
+    # =========================================================================
+    
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        if term not in self._cache:
+            postings = self._postings.get(term, {})
+            self._cache[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+        return self._cache[term]
+    
+    def _drop(self, term: str, row: int) -> None:
+        postings = self._postings[term]
+        del postings[row]
+        if not postings:
+            del self._postings[term]
+        self._cache.pop(term, None)
+
+
+# =============================================================================
+# FUSIÓN DE RANKINGS
+# =============================================================================
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int = 60) -> Dict[int, float]:
+    """
+    Reciprocal Rank Fusion: score(fila) = Σ 1 / (k + rank)
+    
+    Args:
+        rankings: Listas de filas ordenadas (mejor primero)
+        k: Constante de suavizado (60 es el valor estándar)
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (k + rank)
+    return fused
+
+
+def weighted_fusion(
+    dense_scores: np.ndarray,
+    lexical_scores: np.ndarray,
+    alpha: float = 0.5
+) -> np.ndarray:
+    """
+    alpha·similitud_coseno + (1 - alpha)·BM25 normalizado a [0, 1]
+    
+    Ambos arrays se refieren a las mismas filas.
+    """
+    peak = float(lexical_scores.max()) if len(lexical_scores) else 0.0
+    lexical = lexical_scores / peak if peak > 0 else lexical_scores
+    return alpha * dense_scores + (1 - alpha) * lexical
+
+
+# =============================================================================
+# MATRIZ DE CONTEOS
+# =============================================================================
+
+def count_matrix(texts: List[str], binary: bool = False) -> Tuple[sparse.csr_matrix, List[str]]:
+    """
+    Matriz dispersa (documentos, términos) de conteos con el mismo tokenizador
+    
+    Args:
+        texts: Documentos
+        binary: 1 si el término aparece (frecuencia documental) en vez del conteo
+    
+    Returns:
+        (matriz CSR, vocabulario: columna -> término)
+    """
+    vocabulary: Dict[str, int] = {}
+    indices: List[int] = []
+    values: List[int] = []
+    indptr = [0]
+    for text in texts:
+        for term, tf in Counter(tokenize(text)).items():
+            indices.append(vocabulary.setdefault(term, len(vocabulary)))
+            values.append(1 if binary else tf)
+        indptr.append(len(indices))
+    
+    matrix = sparse.csr_matrix(
+        (np.asarray(values, dtype=np.float32), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(texts), len(vocabulary))
+    )
+    return matrix, list(vocabulary)
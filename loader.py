@@ -4,25 +4,223 @@ Permite cargar el modelo desde cualquier proyecto
 """
 
 import os
+import csv
 import json
+import hashlib
+import time
+import unicodedata
+from collections import deque
+from itertools import islice
 from pathlib import Path
-from typing import Optional, Union, List
+from typing import Callable, Iterable, Iterator, Optional, Union, List
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from cache import LRUCache
+
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Normalizar embeddings a norma L2 = 1 (float32)
+    
+    Con vectores normalizados la similitud coseno es un producto punto.
+    
+    Args:
+        embeddings: Vector (dim,) o matriz (n, dim)
+    
+    Returns:
+        Copia normalizada en float32 con la misma forma
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def top_k_indices(scores: np.ndarray, top_k: Optional[int] = None) -> np.ndarray:
+    """
+    Índices de los top_k scores más altos, ordenados de mayor a menor
+    
+    Usa np.argpartition (O(n)) y solo ordena los k ganadores.
+    
+    Args:
+        scores: Vector de scores
+        top_k: Número de resultados (None = todos)
+    
+    Returns:
+        Array de índices
+    """
+    n = len(scores)
+    if top_k is None or top_k >= n:
+        return np.argsort(-scores, kind="stable")
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    
+    winners = np.argpartition(-scores, top_k - 1)[:top_k]
+    return winners[np.argsort(-scores[winners], kind="stable")]
+
+
+def blocked_top_k(
+    queries_emb: np.ndarray,
+    corpus_emb: np.ndarray,
+    top_k: Optional[int] = None,
+    query_block: int = 256,
+    corpus_block: int = 8192
+):
+    """
+    Top-k por query sobre una matriz de scores queries x corpus por bloques
+    
+    Nunca se materializa la matriz completa: el pico de memoria es
+    query_block x (corpus_block + top_k) scores. Los embeddings deben
+    estar normalizados (producto punto = coseno).
+    
+    Args:
+        queries_emb: Matriz (m, dim)
+        corpus_emb: Matriz (n, dim); puede ser un memmap float16
+        top_k: Resultados por query (None = todos)
+        query_block: Queries por bloque
+        corpus_block: Filas del corpus por bloque
+    
+    Returns:
+        (índices (m, k), scores (m, k)) ordenados por score descendente
+    """
+    queries_emb = np.asarray(queries_emb, dtype=np.float32)
+    m, n = len(queries_emb), len(corpus_emb)
+    k = n if top_k is None else max(0, min(top_k, n))
+    
+    all_indices = np.zeros((m, k), dtype=np.int64)
+    all_scores = np.zeros((m, k), dtype=np.float32)
+    if k == 0:
+        return all_indices, all_scores
+    
+    for q_start in range(0, m, query_block):
+        q_block = queries_emb[q_start:q_start + query_block]
+        best_idx = np.zeros((len(q_block), 0), dtype=np.int64)
+        best_scores = np.zeros((len(q_block), 0), dtype=np.float32)
+        
+        for c_start in range(0, n, corpus_block):
+            block = np.asarray(corpus_emb[c_start:c_start + corpus_block], dtype=np.float32)
+            block_scores = q_block @ block.T
+            block_idx = np.broadcast_to(
+                np.arange(c_start, c_start + len(block), dtype=np.int64), block_scores.shape
+            )
+            
+            # Fusionar el bloque con los mejores acumulados y quedarse con k
+            cand_scores = np.concatenate([best_scores, block_scores], axis=1)
+            cand_idx = np.concatenate([best_idx, block_idx], axis=1)
+            if cand_scores.shape[1] > k:
+                keep = np.argpartition(-cand_scores, k - 1, axis=1)[:, :k]
+                cand_scores = np.take_along_axis(cand_scores, keep, axis=1)
+                cand_idx = np.take_along_axis(cand_idx, keep, axis=1)
+            best_scores, best_idx = cand_scores, cand_idx
+        
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        all_scores[q_start:q_start + len(q_block)] = np.take_along_axis(best_scores, order, axis=1)
+        all_indices[q_start:q_start + len(q_block)] = np.take_along_axis(best_idx, order, axis=1)
+    
+    return all_indices, all_scores
+
+
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[list]:
+    """Agrupar un iterable (posiblemente infinito) en listas de chunk_size"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_records(
+    path: str,
+    text_field: Union[str, List[str]] = "profile",
+    id_field: Optional[str] = "id",
+    skip: int = 0
+) -> Iterator[tuple]:
+    """
+    Leer registros (id, texto) de un CSV o JSONL sin cargarlo en memoria
+    
+    Args:
+        path: Archivo .csv o .jsonl (también .json con un objeto por línea)
+        text_field: Campo con el texto, o lista de campos a concatenar
+        id_field: Campo con el ID (None o ausente = número de fila)
+        skip: Registros a saltar desde el inicio (reanudación)
+    
+    Yields:
+        Tuplas (id, texto) en el orden del archivo
+    """
+    fields = [text_field] if isinstance(text_field, str) else list(text_field)
+    path = Path(path)
+    
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        
+        for row_number, row in enumerate(islice(rows, skip, None), start=skip):
+            text = ". ".join(
+                " ".join(map(str, value)) if isinstance(value, list) else str(value)
+                for value in (row.get(field) for field in fields)
+                if value not in (None, "")
+            )
+            record_id = row.get(id_field) if id_field else None
+            yield (str(record_id) if record_id not in (None, "") else str(row_number)), text
+
+
+# Modelo de cada proceso worker de encode_corpus (uno por proceso)
+_WORKER_MODEL = None
+_WORKER_BATCH_SIZE = 32
+
+
+def _init_corpus_worker(model_path: str, device: str, threads: int, batch_size: int) -> None:
+    """Cargar el modelo una vez por worker con threads de torch fijados"""
+    global _WORKER_MODEL, _WORKER_BATCH_SIZE
+    import torch
+    
+    # Sin esto cada proceso usa todos los cores y compiten entre sí
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    
+    _WORKER_MODEL = SentenceTransformer(model_path, device=device)
+    _WORKER_BATCH_SIZE = batch_size
+
+
+def _encode_corpus_chunk(texts: List[str]) -> np.ndarray:
+    return _WORKER_MODEL.encode(
+        texts,
+        batch_size=_WORKER_BATCH_SIZE,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+
 
 class ModeloPortable:
     """Wrapper universal para el modelo entrenado"""
     
-    def __init__(self, model_path: str, device: str = "cpu"):
+    def __init__(
+        self,
+        model_path: str,
+        device: str = "cpu",
+        batch_size: int = 32,
+        cache_size: Optional[int] = None,
+        cache_bytes: Optional[int] = None
+    ):
         """
         Inicializar modelo
         
         Args:
             model_path: Ruta al directorio del modelo o ruta directa a archivos
             device: 'cpu' o 'cuda'
+            batch_size: Tamaño de batch por defecto para encode/search
+            cache_size: Máximo de embeddings en caché LRU (None = sin caché)
+            cache_bytes: Máximo de bytes en caché LRU (None = sin límite de bytes)
         """
         self.device = device
+        self.batch_size = batch_size
         self.model_path = Path(model_path)
         
         # Buscar directorio del modelo
@@ -35,11 +233,19 @@ class ModeloPortable:
         else:
             raise FileNotFoundError(f"No se encontró modelo en {model_path}")
         
+        self.actual_path = Path(actual_path)
+        self._fingerprint = None
+        
         print(f"📦 Cargando modelo desde: {actual_path}")
         self.model = SentenceTransformer(actual_path, device=device)
         
         # Cargar metadata si existe
         self.metadata = self._load_metadata(actual_path)
+        
+        # Caché opcional de embeddings (texto normalizado + fingerprint)
+        self.cache = None
+        if cache_size is not None or cache_bytes is not None:
+            self.cache = LRUCache(max_entries=cache_size, max_bytes=cache_bytes)
         print(f"✅ Modelo cargado correctamente (Device: {device})")
     
     def _load_metadata(self, model_path: str) -> dict:
@@ -51,12 +257,143 @@ class ModeloPortable:
                 return json.load(f)
         return {}
     
-    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+    @property
+    def fingerprint(self) -> str:
+        """
+        Identificador corto de los pesos del modelo
+        
+        Se calcula con los archivos de configuración, el tamaño de
+        model.safetensors y su primer/último MB (sin leer el archivo entero).
+        Sirve para invalidar embeddings guardados con otro modelo.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for name in ("config.json", "modules.json", "training_metadata.json"):
+                config_path = self.actual_path / name
+                if config_path.exists():
+                    digest.update(config_path.read_bytes())
+            
+            weights_path = self.actual_path / "model.safetensors"
+            size = weights_path.stat().st_size
+            digest.update(str(size).encode())
+            with open(weights_path, "rb") as f:
+                digest.update(f.read(1 << 20))
+                f.seek(max(0, size - (1 << 20)))
+                digest.update(f.read(1 << 20))
+            
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+    
+    def embeddings_path(self, name: str) -> Path:
+        """Ruta por defecto de un almacén de embeddings (junto al modelo)"""
+        return self.actual_path.parent / "embeddings" / name
+    
+    def clusters_path(self, name: str) -> Path:
+        """Ruta de un modelo de clusters persistido (junto al modelo)"""
+        return self.actual_path.parent / "clusters" / f"{name}.npz"
+    
+    def codebook_path(self, m: int) -> Path:
+        """Ruta de los codebooks PQ de m sub-vectores (junto al modelo)"""
+        return self.actual_path.parent / "codebooks" / f"pq-m{m}.npz"
+    
+    def train_pq_codebook(self, embeddings: np.ndarray, m: int = 48, **params):
+        """
+        Entrenar codebooks PQ con una muestra del corpus y guardarlos
+        
+        Se guardan con el fingerprint del modelo: si cambian los pesos,
+        load_pq_codebook() deja de devolverlos.
+        
+        Args:
+            embeddings: Embeddings del corpus (n, 768); puede ser un memmap
+            m: Sub-vectores = bytes por CV
+            **params: ks, iterations, sample_size, seed (ver PQCodebook.train)
+        
+        Returns:
+            PQCodebook entrenado
+        """
+        from quantization import PQCodebook
+        
+        codebook = PQCodebook.train(embeddings, m=m, **params)
+        codebook.save(self.codebook_path(m), fingerprint=self.fingerprint)
+        print(f"✅ Codebooks PQ guardados: {self.codebook_path(m)}")
+        return codebook
+    
+    def load_pq_codebook(self, m: int = 48):
+        """Codebooks PQ guardados para este modelo (None si no hay o son de otro modelo)"""
+        from quantization import PQCodebook
+        
+        path = self.codebook_path(m)
+        if not path.exists():
+            return None
+        try:
+            return PQCodebook.load(path, fingerprint=self.fingerprint)
+        except ValueError as e:
+            print(f"⚠️  {e}")
+            return None
+    
+    def save_embeddings(
+        self,
+        name_or_path: str,
+        ids: List[str],
+        embeddings: np.ndarray,
+        dtype: str = "float32"
+    ) -> Path:
+        """
+        Guardar embeddings precalculados en formato memmap
+        
+        Args:
+            name_or_path: Nombre (se guarda en ../embeddings/<nombre>) o ruta
+            ids: IDs en el orden de las filas
+            embeddings: Matriz (n, 768)
+            dtype: 'float32' o 'float16'
+        
+        Returns:
+            Ruta del almacén
+        """
+        from embedding_store import save_embeddings
+        
+        return save_embeddings(
+            self._resolve_store(name_or_path),
+            ids,
+            normalize_embeddings(embeddings),
+            dtype=dtype,
+            fingerprint=self.fingerprint,
+        )
+    
+    def open_embeddings(self, name_or_path: str, mmap: bool = True):
+        """
+        Abrir un almacén de embeddings con numpy.memmap (zero-copy)
+        
+        Args:
+            name_or_path: Nombre del almacén o ruta
+            mmap: False = cargar la matriz completa en RAM
+        
+        Returns:
+            (ids, matriz, header)
+        """
+        from embedding_store import load_embeddings
+        
+        ids, matrix, header = load_embeddings(self._resolve_store(name_or_path), mmap=mmap)
+        
+        if header.get("model_fingerprint") not in (None, self.fingerprint):
+            print(f"⚠️  Embeddings generados con otro modelo "
+                  f"({header['model_fingerprint']} != {self.fingerprint})")
+        
+        return ids, matrix, header
+    
+    def _resolve_store(self, name_or_path: str) -> Path:
+        raw = str(name_or_path)
+        if "/" in raw or os.sep in raw:
+            return Path(raw)
+        return self.embeddings_path(raw)
+    
+    def encode(self, texts: Union[str, List[str]], batch_size: Optional[int] = None) -> np.ndarray:
         """
         Generar embeddings para textos
         
         Args:
             texts: Texto o lista de textos
+            batch_size: Textos por forward pass (None = self.batch_size)
         
         Returns:
             numpy array con embeddings (768 dimensiones)
@@ -64,12 +401,230 @@ class ModeloPortable:
         if isinstance(texts, str):
             texts = [texts]
         
-        embeddings = self.model.encode(texts)
+        embeddings = self._encode_batch(texts, batch_size)
         
         if len(texts) == 1:
             return embeddings[0]
         return embeddings
     
+    def _encode_batch(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        use_cache: bool = True
+    ) -> np.ndarray:
+        """
+        Codificar una lista de textos en batches, siempre retorna matriz 2D
+        
+        SentenceTransformer ordena los textos por longitud antes de formar
+        los batches (minimiza padding) y restaura el orden original.
+        Con caché activa, los aciertos no se tokenizan ni pasan por el
+        modelo: solo se codifican los textos ausentes (sin repetidos).
+        """
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        
+        if self.cache is None or not use_cache:
+            return self._forward(texts, batch_size)
+        
+        keys = [self._cache_key(text) for text in texts]
+        cached = [self.cache.get(key) for key in keys]
+        
+        missing = {}
+        for text, key, hit in zip(texts, keys, cached):
+            if hit is None and key not in missing:
+                missing[key] = text
+        
+        computed = {}
+        if missing:
+            embeddings = self._forward(list(missing.values()), batch_size)
+            for key, embedding in zip(missing, embeddings):
+                # Copia propia por fila: no retener el batch completo en memoria
+                embedding = embedding.copy()
+                embedding.flags.writeable = False
+                self.cache.put(key, embedding)
+                computed[key] = embedding
+        
+        return np.stack([
+            hit if hit is not None else computed[key]
+            for key, hit in zip(keys, cached)
+        ])
+    
+    def encode_corpus(
+        self,
+        texts: Iterable[str],
+        workers: Optional[int] = None,
+        chunk_size: int = 1024,
+        batch_size: Optional[int] = None,
+        threads_per_worker: Optional[int] = None,
+        progress: Union[bool, Callable[[int], None]] = True
+    ) -> Iterator[np.ndarray]:
+        """
+        Codificar un corpus grande repartiéndolo entre varios procesos
+        
+        El iterable se consume por chunks (no hace falta tenerlo en memoria)
+        y los embeddings se entregan chunk a chunk en el orden de entrada.
+        Cada worker carga el modelo una sola vez con `threads_per_worker`
+        threads de torch; como mucho hay 2 chunks en vuelo por worker.
+        No usa la caché de embeddings.
+        
+        Args:
+            texts: Iterable de textos (lista, generador, archivo...)
+            workers: Procesos worker (None o 1 = en este proceso)
+            chunk_size: Textos por chunk enviado a un worker
+            batch_size: Textos por forward pass (None = self.batch_size)
+            threads_per_worker: Threads de torch por worker
+                                (default: cores / workers)
+            progress: True = imprimir avance; callable = recibe los textos
+                      codificados hasta el momento
+        
+        Yields:
+            Matrices (n_chunk, 768), en el orden de entrada
+        """
+        batch_size = batch_size or self.batch_size
+        report = progress if callable(progress) else None
+        if progress is True:
+            report = self._progress_printer()
+        
+        chunks = iter_chunks(texts, chunk_size)
+        pool = None
+        
+        if not workers or workers <= 1:
+            results = (self._forward(chunk, batch_size) for chunk in chunks)
+        else:
+            import multiprocessing
+            
+            threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+            # spawn: no heredar el estado de torch del proceso padre
+            context = multiprocessing.get_context("spawn")
+            pool = context.Pool(
+                workers,
+                initializer=_init_corpus_worker,
+                initargs=(str(self.actual_path), self.device, threads, batch_size)
+            )
+            results = self._ordered_results(pool, chunks, max_in_flight=2 * workers)
+        
+        done = 0
+        try:
+            for embeddings in results:
+                done += len(embeddings)
+                if report:
+                    report(done)
+                yield embeddings
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        
+        if progress is True and done:
+            print()
+    
+    def encode_file(
+        self,
+        input_path: str,
+        store: str,
+        text_field: Union[str, List[str]] = "profile",
+        id_field: Optional[str] = "id",
+        chunk_size: int = 1024,
+        workers: Optional[int] = None,
+        dtype: str = "float32",
+        resume: bool = True,
+        progress: bool = True
+    ) -> Path:
+        """
+        Codificar un CSV/JSONL en streaming hacia un almacén de embeddings
+        
+        Los registros se leen de forma perezosa, se codifican por chunks
+        (ver encode_corpus) y cada chunk se añade al almacén con un
+        checkpoint. La memoria no depende del tamaño del corpus. Si el
+        proceso se interrumpe, volver a llamar con resume=True continúa
+        desde la última fila confirmada.
+        
+        Args:
+            input_path: Archivo .csv o .jsonl
+            store: Nombre (../embeddings/<nombre>) o ruta del almacén
+            text_field: Campo(s) de texto a codificar
+            id_field: Campo con el ID del registro
+            chunk_size: Registros por chunk (y por checkpoint)
+            workers: Procesos de encode (None = en este proceso)
+            dtype: 'float32' o 'float16'
+            resume: Continuar un almacén existente
+            progress: Imprimir avance
+        
+        Returns:
+            Ruta del almacén (abrir con open_embeddings o CandidateIndex.load)
+        """
+        from embedding_store import EmbeddingWriter
+        
+        writer = EmbeddingWriter(
+            self._resolve_store(store),
+            self.model.get_sentence_embedding_dimension(),
+            dtype=dtype,
+            fingerprint=self.fingerprint,
+            resume=resume
+        )
+        
+        with writer:
+            if progress and writer.count:
+                print(f"↻ Reanudando {writer.store_dir} desde la fila {writer.count:,}")
+            
+            # encode_corpus consume textos por adelantado: los IDs esperan
+            # en una cola hasta que llega el chunk de embeddings que les toca
+            pending_ids = deque()
+            
+            def texts():
+                for record_id, text in iter_records(input_path, text_field, id_field, skip=writer.count):
+                    pending_ids.append(record_id)
+                    yield text
+            
+            for embeddings in self.encode_corpus(
+                texts(),
+                workers=workers,
+                chunk_size=chunk_size,
+                progress=progress
+            ):
+                ids = [pending_ids.popleft() for _ in range(len(embeddings))]
+                writer.append(ids, normalize_embeddings(embeddings))
+        
+        return writer.store_dir
+    
+    @staticmethod
+    def _ordered_results(pool, chunks: Iterator[list], max_in_flight: int) -> Iterator[np.ndarray]:
+        """Enviar chunks al pool con ventana acotada y entregarlos en orden"""
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.apply_async(_encode_corpus_chunk, (chunk,)))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().get()
+        
+        while in_flight:
+            yield in_flight.popleft().get()
+    
+    @staticmethod
+    def _progress_printer() -> Callable[[int], None]:
+        start = time.perf_counter()
+        
+        def report(done: int) -> None:
+            elapsed = time.perf_counter() - start
+            rate = done / elapsed if elapsed > 0 else 0.0
+            print(f"\r   ⏳ {done:,} textos codificados ({rate:,.0f} textos/s)", end="", flush=True)
+        
+        return report
+    
+    def _forward(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Forward pass del modelo (sin caché)"""
+        return self.model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+    
+    def _cache_key(self, text: str) -> str:
+        """Hash del texto normalizado (NFC, espacios colapsados) + fingerprint"""
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha1(f"{self.fingerprint}\0{normalized}".encode("utf-8")).hexdigest()
+    
     def similarity(self, text1: str, text2: str) -> float:
         """
         Calcular similitud entre dos textos
@@ -81,15 +636,17 @@ class ModeloPortable:
         Returns:
             Similitud (0-1)
         """
-        from sklearn.metrics.pairwise import cosine_similarity
+        emb1, emb2 = normalize_embeddings(self._encode_batch([text1, text2]))
         
-        emb1 = self.encode(text1)
-        emb2 = self.encode(text2)
-        
-        sim = cosine_similarity([emb1], [emb2])[0][0]
-        return float(sim)
+        return float(emb1 @ emb2)
     
-    def search(self, query: str, candidates: List[str], top_k: int = None) -> List[dict]:
+    def search(
+        self,
+        query: str,
+        candidates: List[str],
+        top_k: int = None,
+        batch_size: Optional[int] = None
+    ) -> List[dict]:
         """
         Buscar candidatos similares a una consulta
         
@@ -97,62 +654,356 @@ class ModeloPortable:
             query: Texto de búsqueda
             candidates: Lista de candidatos
             top_k: Número de resultados (None = todos)
+            batch_size: Textos por forward pass (None = self.batch_size)
         
         Returns:
             Lista de resultados ordenados por similitud
         """
-        from sklearn.metrics.pairwise import cosine_similarity
+        # Query y candidatos en una sola pasada por batches
+        embeddings = self._encode_batch([query] + list(candidates), batch_size)
+        
+        return self.search_embeddings(embeddings[0], embeddings[1:], candidates, top_k)
+    
+    @staticmethod
+    def search_embeddings(
+        query_emb: np.ndarray,
+        candidates_emb: np.ndarray,
+        candidates: List[str],
+        top_k: int = None
+    ) -> List[dict]:
+        """
+        Rankear candidatos a partir de embeddings ya calculados
         
-        query_emb = self.encode(query)
-        candidates_emb = np.array([self.encode(c) for c in candidates])
+        Args:
+            query_emb: Embedding de la query
+            candidates_emb: Matriz de embeddings de los candidatos
+            candidates: Textos de los candidatos (mismo orden)
+            top_k: Número de resultados (None = todos)
         
-        # Calcular similitudes
-        similarities = cosine_similarity([query_emb], candidates_emb)[0]
+        Returns:
+            Lista de resultados ordenados por similitud (como search())
+        """
+        # Similitud coseno = producto matriz-vector sobre vectores normalizados
+        similarities = normalize_embeddings(candidates_emb) @ normalize_embeddings(query_emb)
         
-        # Crear resultados
+        # Top-k con argpartition; solo se crean resultados para los ganadores
         results = []
-        for candidate, similarity in zip(candidates, similarities):
+        for i in top_k_indices(similarities, top_k or None):
+            similarity = float(similarities[i])
             results.append({
-                "candidate": candidate,
-                "similarity": float(similarity),
-                "score": float(similarity)
+                "candidate": candidates[i],
+                "similarity": similarity,
+                "score": similarity
             })
         
-        # Ordenar por similitud descendente
-        results = sorted(results, key=lambda x: x["similarity"], reverse=True)
+        return results
+    
+    def search_many(
+        self,
+        queries: List[str],
+        corpus: List[str],
+        top_k: Optional[int] = 10,
+        batch_size: Optional[int] = None,
+        corpus_block: int = 8192
+    ) -> List[List[dict]]:
+        """
+        Buscar muchas queries contra el mismo corpus en una sola llamada
+        
+        Queries y corpus se codifican juntos en batches; los scores se
+        calculan como producto matriz-matriz por bloques (memoria acotada).
         
-        # Limitar a top_k si se especifica
-        if top_k:
-            results = results[:top_k]
+        Args:
+            queries: Lista de textos de búsqueda
+            corpus: Lista de candidatos
+            top_k: Resultados por query (None = todos)
+            batch_size: Textos por forward pass (None = self.batch_size)
+            corpus_block: Filas del corpus por bloque de scoring
         
-        return results
+        Returns:
+            Una lista de resultados (como search()) por query
+        """
+        embeddings = normalize_embeddings(
+            self._encode_batch(list(queries) + list(corpus), batch_size)
+        )
+        queries_emb = embeddings[:len(queries)]
+        corpus_emb = embeddings[len(queries):]
+        
+        indices, scores = blocked_top_k(queries_emb, corpus_emb, top_k or None, corpus_block=corpus_block)
+        
+        all_results = []
+        for row_indices, row_scores in zip(indices, scores):
+            all_results.append([
+                {
+                    "candidate": corpus[i],
+                    "similarity": float(score),
+                    "score": float(score)
+                }
+                for i, score in zip(row_indices, row_scores)
+            ])
+        
+        return all_results
     
-    def cluster(self, texts: List[str], n_clusters: int = 3) -> dict:
+    def cluster(self, texts: List[str], n_clusters: Union[int, str] = 3) -> dict:
         """
         Agrupar textos en clusters
         
+        Los textos se codifican en batch y se agrupan con k-means por
+        mini-batches (ver clustering.py); para corpus grandes y centroides
+        reutilizables usar cluster_store().
+        
         Args:
             texts: Lista de textos
-            n_clusters: Número de clusters
+            n_clusters: Número de clusters, o "auto" para elegirlo con
+                cluster_auto() (que además retorna los scores por k)
         
         Returns:
             Diccionario con clusters
         """
-        from sklearn.cluster import KMeans
+        if n_clusters == "auto":
+            return self.cluster_auto(texts)["clusters"]
+        
+        embeddings = normalize_embeddings(self._encode_batch(list(texts)))
+        return self._cluster_result(texts, embeddings, int(n_clusters))["clusters"]
+    
+    def cluster_summary(
+        self,
+        texts: List[str],
+        n_clusters: Union[int, str] = 3,
+        n_members: int = 3,
+        n_terms: int = 8,
+        **auto_params
+    ) -> dict:
+        """
+        Agrupar textos y resumir cada cluster
+        
+        Además de los clusters retorna, por cluster, el centroide, el
+        medoide, los miembros más cercanos al centroide y los términos
+        distintivos (ver clustering.summarize_clusters). Todo sale de los
+        embeddings ya calculados y de una matriz de conteos de tokens: no
+        hay una segunda pasada por el modelo.
+        
+        Args:
+            texts: Lista de textos
+            n_clusters: Número de clusters o "auto"
+            n_members: Representantes por cluster
+            n_terms: Términos distintivos por cluster
+            **auto_params: Parámetros de cluster_auto() (solo con "auto")
+        
+        Returns:
+            {"n_clusters", "clusters", "summaries": {cluster: {"size",
+            "centroid", "medoid", "representatives", "top_terms"}}}
+            (+ "metric" y "scores" con "auto")
+        """
+        summary = {"n_members": n_members, "n_terms": n_terms}
+        if n_clusters == "auto":
+            return self.cluster_auto(texts, summarize=summary, **auto_params)
+        
+        embeddings = normalize_embeddings(self._encode_batch(list(texts)))
+        return self._cluster_result(texts, embeddings, int(n_clusters), summarize=summary)
+    
+    def cluster_auto(
+        self,
+        texts: List[str],
+        min_clusters: int = 2,
+        max_clusters: int = 10,
+        metric: str = "silhouette",
+        sample_size: int = 2000,
+        summarize: Union[bool, dict] = False
+    ) -> dict:
+        """
+        Agrupar textos eligiendo el número de clusters automáticamente
+        
+        Barre k en [min_clusters, max_clusters] sobre una submuestra de
+        los embeddings (silhouette o Davies–Bouldin, ver
+        clustering.select_n_clusters) y agrupa todo el corpus con el k
+        elegido. Los textos se codifican una sola vez.
+        
+        Args:
+            texts: Lista de textos
+            min_clusters, max_clusters: Rango de k a probar
+            metric: 'silhouette' o 'davies_bouldin'
+            sample_size: Vectores usados para puntuar cada k
+            summarize: Agregar "summaries" (True o parámetros de
+                clustering.summarize_clusters; ver cluster_summary())
+        
+        Returns:
+            {"n_clusters", "metric", "scores": {k: score}, "clusters"}
+        """
+        from clustering import select_n_clusters
         
-        # Generar embeddings
-        embeddings = np.array([self.encode(text) for text in texts])
+        embeddings = normalize_embeddings(self._encode_batch(list(texts)))
         
-        # Clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        labels = kmeans.fit_predict(embeddings)
+        # Con menos de 3 textos no hay k que comparar
+        if len(texts) < 3:
+            n_clusters, scores = min(len(texts), 1), {}
+        else:
+            n_clusters, scores = select_n_clusters(
+                embeddings,
+                range(min_clusters, max_clusters + 1),
+                metric=metric,
+                sample_size=sample_size
+            )
+        
+        result = self._cluster_result(texts, embeddings, n_clusters, summarize)
+        result.update(metric=metric, scores=scores)
+        return result
+    
+    def _cluster_result(
+        self,
+        texts: List[str],
+        embeddings: np.ndarray,
+        n_clusters: int,
+        summarize: Union[bool, dict] = False
+    ) -> dict:
+        from clustering import ClusterModel, summarize_clusters
+        from lexical_index import count_matrix
+        
+        if not n_clusters:
+            return {"n_clusters": 0, "clusters": {}, **({"summaries": {}} if summarize else {})}
+        
+        # Con pocos textos cada época es un batch completo (= una iteración de Lloyd)
+        model = ClusterModel(n_clusters).fit(embeddings, epochs=10)
+        labels = model.predict(embeddings)
         
         # Agrupar
         clusters = {i: [] for i in range(n_clusters)}
         for text, label in zip(texts, labels):
-            clusters[label].append(text)
+            clusters[int(label)].append(text)
+        
+        result = {"n_clusters": n_clusters, "clusters": clusters}
+        if summarize:
+            counts, vocabulary = count_matrix(texts, binary=True)
+            params = summarize if isinstance(summarize, dict) else {}
+            summaries = summarize_clusters(embeddings, labels, counts, vocabulary, **params)
+            for summary in summaries.values():
+                summary["medoid"] = texts[summary["medoid"]]
+                summary["representatives"] = [texts[row] for row in summary["representatives"]]
+            result["summaries"] = summaries
+        
+        return result
+    
+    def cluster_store(
+        self,
+        name_or_path: str,
+        n_clusters: int,
+        name: Optional[str] = None,
+        epochs: int = 3,
+        warm_start: bool = True,
+        history_weight: float = 0.1,
+        batch_size: int = 4096
+    ):
+        """
+        Agrupar un almacén de embeddings completo y persistir los centroides
+        
+        El almacén se recorre por bloques desde el memmap (no se re-codifica
+        nada ni se carga entero en RAM). Los centroides quedan en
+        ../clusters/<nombre>.npz con el fingerprint del modelo.
+        
+        Args:
+            name_or_path: Almacén de embeddings (nombre o ruta)
+            n_clusters: Número de clusters
+            name: Nombre del modelo de clusters (default: el del almacén)
+            epochs: Pasadas sobre el almacén
+            warm_start: Partir de los centroides guardados si existen (mismo k)
+            history_weight: Peso de los conteos previos en warm start
+                            (0 = los centroides previos solo inicializan)
+            batch_size: Vectores por actualización
+        
+        Returns:
+            ClusterModel entrenado
+        """
+        from clustering import ClusterModel
         
-        return clusters
+        _, matrix, _ = self.open_embeddings(name_or_path)
+        name = name or Path(str(name_or_path)).name
+        
+        model = self.load_clusters(name, batch_size=batch_size) if warm_start else None
+        if model is not None and model.n_clusters == n_clusters:
+            model.counts *= history_weight
+            print(f"♻️  Warm start desde {self.clusters_path(name)}")
+        else:
+            model = ClusterModel(n_clusters, batch_size=batch_size)
+        
+        model.fit(matrix, epochs=epochs)
+        model.save(self.clusters_path(name), fingerprint=self.fingerprint)
+        print(f"✅ {n_clusters} clusters de {len(matrix)} vectores guardados: {self.clusters_path(name)}")
+        return model
+    
+    def load_clusters(self, name: str, **params):
+        """Modelo de clusters guardado (None si no existe o es de otro modelo)"""
+        from clustering import ClusterModel
+        
+        path = self.clusters_path(name)
+        if not path.exists():
+            return None
+        try:
+            return ClusterModel.load(path, fingerprint=self.fingerprint, **params)
+        except ValueError as e:
+            print(f"⚠️  {e}")
+            return None
+    
+    def assign_clusters(self, texts: Union[str, List[str]], name: str) -> np.ndarray:
+        """
+        Asignar textos nuevos a clusters persistidos (O(k) por texto, sin re-agrupar)
+        
+        Raises:
+            FileNotFoundError: no hay clusters guardados con ese nombre
+        """
+        model = self.load_clusters(name)
+        if model is None:
+            raise FileNotFoundError(f"No hay clusters '{name}' para este modelo (use cluster_store())")
+        if isinstance(texts, str):
+            texts = [texts]
+        return model.predict(normalize_embeddings(self._encode_batch(list(texts))))
+    
+    def dedupe(
+        self,
+        texts: List[str],
+        ids: Optional[List] = None,
+        threshold: float = 0.95,
+        deduplicator=None,
+        batch_size: int = 4096,
+        **lsh_params
+    ):
+        """
+        Detectar textos casi duplicados con LSH (ver dedupe.py)
+        
+        Los textos se codifican e insertan por bloques de batch_size, así
+        que una lista grande no se materializa entera como matriz. Pasar un
+        deduplicador existente permite la ingesta incremental (los textos
+        nuevos se comparan con todo lo insertado antes).
+        
+        Args:
+            texts: Textos a insertar
+            ids: Identificador de cada texto (por defecto, su posición)
+            threshold: Coseno mínimo para considerar duplicados
+            deduplicator: LSHDeduplicator existente (opcional)
+            batch_size: Textos codificados por bloque
+            **lsh_params: Parámetros de LSHDeduplicator (n_tables, n_bits...)
+        
+        Returns:
+            El LSHDeduplicator; los grupos salen de .groups()
+        """
+        from dedupe import LSHDeduplicator
+        
+        texts = list(texts)
+        if deduplicator is None:
+            deduplicator = LSHDeduplicator(
+                self.model.get_sentence_embedding_dimension(),
+                threshold=threshold,
+                **lsh_params
+            )
+        if ids is None:
+            ids = range(len(deduplicator), len(deduplicator) + len(texts))
+        ids = list(ids)
+        if len(ids) != len(texts):
+            raise ValueError("ids y texts deben tener la misma longitud")
+        
+        for start in range(0, len(texts), batch_size):
+            embeddings = self._encode_batch(texts[start:start + batch_size])
+            deduplicator.add(embeddings, ids[start:start + batch_size])
+        
+        return deduplicator
     
     def get_info(self) -> dict:
         """Obtener información del modelo"""
@@ -167,21 +1018,39 @@ class ModeloPortable:
             info["training"] = self.metadata.get("training_config", {})
             info["timestamp"] = self.metadata.get("timestamp", "Unknown")
         
+        if self.cache is not None:
+            info["cache"] = self.cache.stats()
+        
         return info
 
 
-def load_model(model_path: str, device: str = "cpu") -> ModeloPortable:
+def load_model(
+    model_path: str,
+    device: str = "cpu",
+    batch_size: int = 32,
+    cache_size: Optional[int] = None,
+    cache_bytes: Optional[int] = None
+) -> ModeloPortable:
     """
     Función auxiliar para cargar modelo
     
     Args:
         model_path: Ruta al modelo
         device: 'cpu' o 'cuda'
+        batch_size: Tamaño de batch por defecto para encode/search
+        cache_size: Máximo de embeddings en caché LRU (None = sin caché)
+        cache_bytes: Máximo de bytes en caché LRU
     
     Returns:
         Instancia de ModeloPortable
     """
-    return ModeloPortable(model_path, device=device)
+    return ModeloPortable(
+        model_path,
+        device=device,
+        batch_size=batch_size,
+        cache_size=cache_size,
+        cache_bytes=cache_bytes
+    )
 
 
 # ============================================================================
@@ -200,10 +1069,16 @@ Uso: python loader.py <ruta_modelo> [comando]
 Comandos:
   test    - Probar el modelo con ejemplos
   info    - Mostrar información del modelo
+  encode  - Codificar un CSV/JSONL a un almacén de embeddings
+            (encode <archivo> <almacén> [workers]; reanuda si se interrumpe)
+  cluster - Agrupar un almacén y guardar los centroides
+            (cluster <almacén> <k> [nombre]; warm start si ya existen)
   
 Ejemplos:
   python loader.py ./modelo_entrenado_multiloss_portable test
   python loader.py ./modelo_entrenado_multiloss_portable info
+  python loader.py ./modelo_entrenado_multiloss_portable encode candidatos.jsonl candidatos 8
+  python loader.py ./modelo_entrenado_multiloss_portable cluster candidatos 50 familias
         """)
         sys.exit(1)
     
@@ -266,3 +1141,20 @@ Ejemplos:
             print(f"{key:20}: {value}")
         
         print("\n" + "="*70 + "\n")
+    
+    elif command == "encode":
+        if len(sys.argv) < 5:
+            print("Uso: python loader.py <ruta_modelo> encode <archivo> <almacén> [workers]")
+            sys.exit(1)
+        
+        workers = int(sys.argv[5]) if len(sys.argv) > 5 else None
+        store_path = modelo.encode_file(sys.argv[3], sys.argv[4], workers=workers)
+        print(f"✅ Embeddings guardados en: {store_path}")
+    
+    elif command == "cluster":
+        if len(sys.argv) < 5:
+            print("Uso: python loader.py <ruta_modelo> cluster <almacén> <k> [nombre]")
+            sys.exit(1)
+        
+        name = sys.argv[5] if len(sys.argv) > 5 else None
+        modelo.cluster_store(sys.argv[3], int(sys.argv[4]), name=name)
@@ -0,0 +1,144 @@
+"""
+SCORING VECTORIZADO CANDIDATO-POSICIÓN
+Calcula los tres componentes del matching (similitud de perfil, skills y
+experiencia) para 1×N o M×N pares con operaciones de matrices:
+
+    profile_similarity = E_jobs · E_candidatos^T        (embeddings normalizados)
+    skills_match       = (S_jobs · S_candidatos^T) / len(required_skills)
+    experience_match   = min(1, años_candidato / años_requeridos)
+    overall_score      = 0.5·profile + 0.3·skills + 0.2·experience
+
+Los skills se representan como vectores multi-hot dispersos (CSR) sobre un
+vocabulario compartido, y los años como arrays float. Los resultados son
+los del cálculo por pares original: coincidencia exacta de skills (sin
+normalizar mayúsculas), intersección de conjuntos en el numerador y
+largo de la lista de skills requeridos (con repetidos) en el denominador.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+from scipy import sparse
+
+
+PROFILE_WEIGHT = 0.5
+SKILLS_WEIGHT = 0.3
+EXPERIENCE_WEIGHT = 0.2
+
+
+def normalize_skill(skill: str) -> str:
+    """Forma canónica de un skill para filtros: minúsculas y espacios colapsados"""
+    return " ".join(str(skill).casefold().split())
+
+
+class SkillVocabulary:
+    """Vocabulario creciente de skills -> columna"""
+    
+    def __init__(self, normalize: Optional[Callable[[str], str]] = None):
+        """
+        Args:
+            normalize: Clave de cada skill (None = el texto exacto, como el
+                       scoring original; normalize_skill = sin mayúsculas)
+        """
+        self.normalize = normalize
+        self.columns: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self.columns)
+    
+    def column(self, skill: str, add: bool = True) -> Optional[int]:
+        """Columna de un skill (None si no existe y add=False)"""
+        key = self.normalize(skill) if self.normalize else skill
+        column = self.columns.get(key)
+        if column is None and add:
+            column = self.columns[key] = len(self.columns)
+        return column
+    
+    def multi_hot(self, skill_lists: Iterable[Iterable[str]], add: bool = True) -> sparse.csr_matrix:
+        """
+        Matriz multi-hot (n, len(vocabulario)) en CSR
+        
+        Los skills repetidos cuentan una vez; con add=False los skills
+        desconocidos se ignoran.
+        """
+        indptr = [0]
+        indices: List[int] = []
+        for skills in skill_lists:
+            columns = {self.column(skill, add) for skill in skills}
+            columns.discard(None)
+            indices.extend(sorted(columns))
+            indptr.append(len(indices))
+        
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix(
+            (data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, len(self.columns))
+        )
+
+
+def score_matches(
+    job_embeddings: np.ndarray,
+    job_skills: sparse.csr_matrix,
+    job_years: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    candidate_skills: sparse.csr_matrix,
+    candidate_years: np.ndarray,
+    job_required: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Scores de matching para todos los pares (job, candidato)
+    
+    Args:
+        job_embeddings: (M, dim) normalizados
+        job_skills: Multi-hot (M, V)
+        job_years: Años requeridos (M,)
+        candidate_embeddings: (N, dim) normalizados
+        candidate_skills: Multi-hot (N, V) del mismo vocabulario
+        candidate_years: Años de experiencia (N,)
+        job_required: len(required_skills) de cada job, con repetidos
+                      (None = skills distintos de job_skills)
+    
+    Returns:
+        Dict con matrices (M, N): profile_similarity, skills_match,
+        experience_match, overall_score
+    """
+    job_embeddings = np.atleast_2d(job_embeddings)
+    job_years = np.asarray(job_years, dtype=np.float32)
+    candidate_years = np.asarray(candidate_years, dtype=np.float32)
+    
+    profile = np.asarray(job_embeddings @ candidate_embeddings.T, dtype=np.float32)
+    
+    # El vocabulario puede haber crecido después de construir una de las
+    # matrices: alinear columnas (las nuevas no tienen ningún 1 en la otra)
+    vocab_size = max(job_skills.shape[1], candidate_skills.shape[1])
+    job_skills = _pad_columns(job_skills, vocab_size)
+    candidate_skills = _pad_columns(candidate_skills, vocab_size)
+    
+    overlap = np.asarray((job_skills @ candidate_skills.T).todense(), dtype=np.float32)
+    if job_required is None:
+        required = np.asarray(job_skills.sum(axis=1), dtype=np.float32).reshape(-1, 1)
+    else:
+        required = np.asarray(job_required, dtype=np.float32).reshape(-1, 1)
+    skills = np.divide(overlap, required, out=np.zeros_like(overlap), where=required > 0)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = candidate_years[None, :] / job_years[:, None]
+    experience = np.where(
+        candidate_years[None, :] >= job_years[:, None],
+        np.float32(1.0),
+        ratio
+    ).astype(np.float32)
+    
+    overall = profile * PROFILE_WEIGHT + skills * SKILLS_WEIGHT + experience * EXPERIENCE_WEIGHT
+    
+    return {
+        "profile_similarity": profile,
+        "skills_match": skills,
+        "experience_match": experience,
+        "overall_score": overall,
+    }
+
+
+def _pad_columns(matrix: sparse.csr_matrix, n_columns: int) -> sparse.csr_matrix:
+    if matrix.shape[1] == n_columns:
+        return matrix
+    return sparse.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], n_columns))
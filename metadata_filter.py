@@ -0,0 +1,151 @@
+"""
+FILTROS DE METADATA SOBRE COLUMNAS NUMPY
+Los campos estructurados de los registros (años, ubicación, salario...) se
+guardan como arrays columnares alineados con las filas del índice. Un
+filtro es una lista de condiciones (campo, operador, valor) combinadas con
+AND; se evalúa de forma vectorizada y produce una máscara booleana que se
+aplica ANTES del top-k, de modo que top_k=10 devuelve 10 resultados que
+cumplen los filtros (si existen).
+
+    [("years", ">=", 5), ("location", "in", ["Boston", "Austin"])]
+"""
+
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+Condition = Tuple[str, str, Any]
+
+NUMERIC_OPERATORS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+SET_OPERATORS = ("in", "not in")
+
+_SALARY_NUMBER = re.compile(r"(\d+(?:[.,]\d+)*)\s*([kKmM])?")
+
+
+def parse_salary_range(text: Optional[str]) -> Tuple[float, float]:
+    """
+    Convertir un rango salarial de texto a (mínimo, máximo)
+    
+    "$120k-$150k" -> (120000.0, 150000.0); "$90,000" -> (90000.0, 90000.0).
+    Si no hay números retorna (nan, nan): no pasa ningún filtro numérico.
+    """
+    values = []
+    for number, suffix in _SALARY_NUMBER.findall(str(text or "")):
+        value = float(number.replace(",", ""))
+        if suffix:
+            value *= 1_000 if suffix.lower() == "k" else 1_000_000
+        values.append(value)
+    
+    if not values:
+        return float("nan"), float("nan")
+    return min(values), max(values)
+
+
+def _normalize_category(value: Any) -> str:
+    return " ".join(str(value).casefold().split())
+
+
+class ColumnStore:
+    """
+    Columnas numéricas y categóricas de un conjunto de registros
+    
+    Las numéricas son float32 (nan = desconocido); las categóricas se
+    codifican como int32 sobre un vocabulario normalizado (minúsculas),
+    así que comparar ubicaciones es comparar enteros.
+    """
+    
+    def __init__(
+        self,
+        records: Sequence[Dict],
+        numeric: Dict[str, Callable[[Dict], float]],
+        categorical: Dict[str, Callable[[Dict], Any]]
+    ):
+        """
+        Args:
+            records: Registros en el orden de las filas
+            numeric: Nombre de columna -> extractor de valor numérico
+            categorical: Nombre de columna -> extractor de valor categórico
+        """
+        self.size = len(records)
+        self.numeric: Dict[str, np.ndarray] = {}
+        self.categorical: Dict[str, np.ndarray] = {}
+        self.vocabularies: Dict[str, Dict[str, int]] = {}
+        
+        for name, extract in numeric.items():
+            self.numeric[name] = np.array(
+                [_as_float(extract(record)) for record in records],
+                dtype=np.float32
+            )
+        
+        for name, extract in categorical.items():
+            vocabulary: Dict[str, int] = {}
+            codes = np.empty(self.size, dtype=np.int32)
+            for row, record in enumerate(records):
+                key = _normalize_category(extract(record))
+                codes[row] = vocabulary.setdefault(key, len(vocabulary))
+            self.categorical[name] = codes
+            self.vocabularies[name] = vocabulary
+    
+    @property
+    def fields(self) -> List[str]:
+        return list(self.numeric) + list(self.categorical)
+    
+    def mask(self, conditions: Iterable[Condition]) -> np.ndarray:
+        """
+        Evaluar condiciones (AND) de forma vectorizada
+        
+        Raises:
+            ValueError: campo u operador desconocido
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for field, operator, value in conditions:
+            mask &= self._evaluate(field, operator, value)
+        return mask
+    
+    def rows(self, conditions: Iterable[Condition]) -> np.ndarray:
+        """Filas que cumplen las condiciones"""
+        return np.flatnonzero(self.mask(conditions))
+    
+    def _evaluate(self, field: str, operator: str, value: Any) -> np.ndarray:
+        if field in self.numeric:
+            column = self.numeric[field]
+            if operator in NUMERIC_OPERATORS:
+                return NUMERIC_OPERATORS[operator](column, _as_float(value))
+            if operator in SET_OPERATORS:
+                matched = np.isin(column, [_as_float(v) for v in _as_list(value)])
+                return matched if operator == "in" else ~matched
+        
+        elif field in self.categorical:
+            column = self.categorical[field]
+            vocabulary = self.vocabularies[field]
+            if operator in ("==", "!="):
+                value, operator = [value], ("in" if operator == "==" else "not in")
+            if operator in SET_OPERATORS:
+                codes = [vocabulary[key] for key in map(_normalize_category, _as_list(value)) if key in vocabulary]
+                matched = np.isin(column, codes)
+                return matched if operator == "in" else ~matched
+        
+        else:
+            raise ValueError(f"Campo de filtro desconocido: {field} (disponibles: {self.fields})")
+        
+        raise ValueError(f"Operador no soportado para {field}: {operator}")
+
+
+def _as_float(value: Any) -> float:
+    if value is None:
+        return float("nan")
+    return float(value)
+
+
+def _as_list(value: Any) -> list:
+    if isinstance(value, (str, bytes)) or not isinstance(value, Iterable):
+        return [value]
+    return list(value)
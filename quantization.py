@@ -0,0 +1,600 @@
+"""
+CUANTIZACIÓN DE EMBEDDINGS
+Representaciones compactas del corpus para búsqueda en RAM:
+
+    int8    - cuantización escalar por dimensión (1 byte/dim, 4x menos que float32)
+    binary  - 1 bit por dimensión (signo) con distancia de Hamming (32x menos)
+    pq      - product quantization: m sub-vectores de 1 byte cada uno (768
+              dims con m=48 -> 48 bytes, 64x menos), puntuado con tablas
+              de distancia asimétrica (ADC)
+
+Los índices exponen la misma interfaz que los backends de ann.py
+(build/add/remove/search con etiquetas estables), así que se activan con
+CandidateIndex.enable_ann("int8" | "binary" | "pq"). Con rescore > 0 el índice de
+candidatos re-puntúa los mejores con los float32 (que pueden quedarse en
+disco vía memmap): la cuantización ordena, los floats deciden.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+# Bits en 1 de cada byte (fallback de np.bitwise_count, NumPy < 2.0)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Sub-vectores por defecto de PQ (768 / 48 = 16 dimensiones cada uno)
+PQ_SUBSPACES = 48
+
+# Centroides por subespacio (códigos de 1 byte) y vectores de entrenamiento
+# por centroide: con menos, el k-means solo memoriza los pocos vectores vistos
+PQ_CENTROIDS = 256
+PQ_MIN_TRAIN_PER_CENTROID = 4
+
+
+def sample_rows(vectors: np.ndarray, sample_size: int, seed: int = 42) -> np.ndarray:
+    """Muestra aleatoria (en orden de filas) de hasta sample_size vectores, en float32"""
+    if len(vectors) > sample_size:
+        rng = np.random.default_rng(seed)
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def fit_int8_scale(vectors: np.ndarray, sample_size: int = 100000, seed: int = 42) -> np.ndarray:
+    """
+    Escala por dimensión para cuantización int8 simétrica
+    
+    scale[d] = max|x_d| / 127 sobre una muestra del corpus.
+    """
+    vectors = sample_rows(vectors, sample_size, seed)
+    if not len(vectors):
+        raise ValueError("Se necesita al menos un vector para calcular la escala")
+    peak = np.abs(vectors).max(axis=0)
+    peak[peak == 0] = 1.0
+    return (peak / 127.0).astype(np.float32)
+
+
+def quantize_int8(vectors: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Cuantizar a int8 con la escala dada (los valores fuera de rango se recortan)"""
+    codes = np.rint(np.asarray(vectors, dtype=np.float32) / scale)
+    return np.clip(codes, -127, 127).astype(np.int8)
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Códigos de 1 bit (signo de cada dimensión) empaquetados en uint8"""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Distancia de Hamming entre cada fila de `codes` y `query_code`"""
+    xor = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+
+
+class _FlatCodesIndex:
+    """
+    Códigos compactos en una matriz contigua con etiquetas estables
+    
+    Como en CandidateIndex, eliminar mueve la última posición al hueco.
+    Las subclases definen cómo se codifica un vector y cómo se puntúa.
+    """
+    
+    name = ""
+    
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._codes = np.zeros((0, self.code_size), dtype=self.code_dtype)
+        self._labels = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._where: Dict[int, int] = {}
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes ocupados por los códigos"""
+        return self._size * self.code_size * np.dtype(self.code_dtype).itemsize
+    
+    def build(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        """Codificar todo el corpus (las subclases calibran aquí)"""
+        self._size = 0
+        self._where = {}
+        self.add(vectors, labels)
+    
+    def add(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        """Inserción incremental al final"""
+        labels = np.asarray(labels, dtype=np.int64)
+        start = self._size
+        end = start + len(labels)
+        self._reserve(end)
+        
+        for offset in range(0, len(labels), 65536):
+            block = np.asarray(vectors[offset:offset + 65536], dtype=np.float32)
+            self._codes[start + offset:start + offset + len(block)] = self.encode(block)
+        self._labels[start:end] = labels
+        for pos, label in enumerate(labels.tolist(), start=start):
+            self._where[label] = pos
+        self._size = end
+    
+    def remove(self, labels) -> None:
+        """Eliminar etiquetas (swap con la última posición)"""
+        for label in labels:
+            pos = self._where.pop(int(label))
+            last = self._size - 1
+            if pos != last:
+                moved = int(self._labels[last])
+                self._codes[pos] = self._codes[last]
+                self._labels[pos] = moved
+                self._where[moved] = pos
+            self._size = last
+    
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k aproximado sobre los códigos
+        
+        Returns:
+            (etiquetas, scores) ordenados por score descendente
+        """
+        k = min(k, self._size)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        scores = self.scores(np.asarray(query, dtype=np.float32))
+        winners = np.argpartition(-scores, k - 1)[:k]
+        winners = winners[np.argsort(-scores[winners], kind="stable")]
+        return self._labels[winners], scores[winners]
+    
+    def codes_for(self, labels) -> np.ndarray:
+        """Códigos de las etiquetas dadas (en ese orden)"""
+        return self._codes[[self._where[int(label)] for label in labels]]
+    
+    def set_params(self, **params) -> None:
+        if params:
+            raise ValueError(f"Parámetros no soportados por {self.name}: {sorted(params)}")
+    
+    def get_params(self) -> dict:
+        return {
+            "backend": self.name,
+            "bytes_per_vector": self.code_size * np.dtype(self.code_dtype).itemsize,
+            "compression": round(self.dimension * 4 / (self.code_size * np.dtype(self.code_dtype).itemsize), 1),
+        }
+    
+    # =========================================================================
+    # PERSISTENCIA
+    # =========================================================================
+    
+    def save(self, path: str, labels, fingerprint: Optional[str] = None) -> Path:
+        """
+        Guardar los códigos de `labels` (en ese orden) en un .npz
+        
+        Al cargar, la posición i recibe la etiqueta i: guardando en orden
+        de filas el resultado encaja con CandidateIndex.load().
+        """
+        path = Path(path)
+        meta = {"backend": self.name, "dimension": self.dimension, "model_fingerprint": fingerprint}
+        
+        positions = [self._where[int(label)] for label in labels]
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, codes=self._codes[positions], meta=np.array(json.dumps(meta)), **self._state(positions))
+        tmp_path.replace(path)
+        return path
+    
+    @classmethod
+    def load(cls, path: str, fingerprint: Optional[str] = None) -> "_FlatCodesIndex":
+        """
+        Cargar códigos guardados con save()
+        
+        Raises:
+            ValueError: backend o fingerprint del modelo distintos
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["backend"] != cls.name:
+                raise ValueError(f"{path} contiene códigos {meta['backend']}, no {cls.name}")
+            if fingerprint and meta.get("model_fingerprint") and meta["model_fingerprint"] != fingerprint:
+                raise ValueError(f"{path} se generó con otro modelo")
+            
+            index = cls(meta["dimension"])
+            index._load_state(data)
+            index._codes = np.array(data["codes"])
+        
+        index._size = len(index._codes)
+        index._labels = np.arange(index._size, dtype=np.int64)
+        index._where = {label: label for label in range(index._size)}
+        return index
+    
+    # =========================================================================
+    # UTILIDADES INTERNAS
+    # =========================================================================
+    
+    def _reserve(self, size: int) -> None:
+        if size <= len(self._codes):
+            return
+        capacity = max(size, 2 * len(self._codes), 16)
+        codes = np.zeros((capacity, self.code_size), dtype=self.code_dtype)
+        codes[:self._size] = self._codes[:self._size]
+        labels = np.zeros(capacity, dtype=np.int64)
+        labels[:self._size] = self._labels[:self._size]
+        self._codes, self._labels = codes, labels
+    
+    def _state(self, positions: List[int]) -> dict:
+        """Arrays extra a guardar (positions = orden de guardado)"""
+        return {}
+    
+    def _load_state(self, data) -> None:
+        pass
+
+
+class Int8Index(_FlatCodesIndex):
+    """
+    Cuantización escalar int8 por dimensión
+    
+    score ≈ q · (códigos * escala): la escala se aplica a la query, así
+    que el corpus se recorre solo como int8 (convertido por bloques).
+    """
+    
+    name = "int8"
+    code_dtype = np.int8
+    
+    def __init__(self, dimension: int, scale: Optional[np.ndarray] = None, block_size: int = 16384):
+        """
+        Args:
+            dimension: Dimensión de los vectores
+            scale: Escala por dimensión (None = calibrar en build())
+            block_size: Filas convertidas a float32 por bloque al puntuar
+        """
+        self.code_size = dimension
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+        self.block_size = block_size
+        super().__init__(dimension)
+    
+    def build(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        """Calibrar la escala con el corpus y codificarlo"""
+        if len(vectors):
+            self.scale = fit_int8_scale(vectors)
+        super().build(vectors, labels)
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.scale is None:
+            # Vectores normalizados: ninguna componente supera 1
+            self.scale = np.full(self.dimension, 1.0 / 127.0, dtype=np.float32)
+        return quantize_int8(vectors, self.scale)
+    
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Similitud aproximada de la query con todos los códigos"""
+        if self.scale is None:
+            return np.zeros(self._size, dtype=np.float32)
+        scaled = query * self.scale
+        scores = np.empty(self._size, dtype=np.float32)
+        for start in range(0, self._size, self.block_size):
+            block = self._codes[start:min(start + self.block_size, self._size)]
+            scores[start:start + len(block)] = block.astype(np.float32) @ scaled
+        return scores
+    
+    def _state(self, positions: List[int]) -> dict:
+        # Índice vacío sin calibrar: no hay escala que guardar
+        return {} if self.scale is None else {"scale": self.scale}
+    
+    def _load_state(self, data) -> None:
+        self.scale = np.array(data["scale"], dtype=np.float32) if "scale" in data.files else None
+
+
+class BinaryIndex(_FlatCodesIndex):
+    """
+    Códigos binarios (signo) con ranking por distancia de Hamming
+    
+    El score 1 - 2·hamming/dim aproxima el coseno entre los signos de los
+    vectores; sirve para pre-rankear, no como similitud final.
+    """
+    
+    name = "binary"
+    code_dtype = np.uint8
+    
+    def __init__(self, dimension: int):
+        self.code_size = (dimension + 7) // 8
+        super().__init__(dimension)
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return binarize(vectors)
+    
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Similitud aproximada (a partir de Hamming) con todos los códigos"""
+        distances = hamming_distances(self._codes[:self._size], binarize(query))
+        return (1.0 - 2.0 * distances / self.dimension).astype(np.float32)
+
+
+# =============================================================================
+# PRODUCT QUANTIZATION
+# =============================================================================
+
+class PQCodebook:
+    """
+    Codebooks de product quantization
+    
+    El vector se parte en m sub-vectores de dimension/m componentes y cada
+    uno se reemplaza por el índice (1 byte) del centroide más cercano de
+    su subespacio. Para una query se precalcula una tabla (m, ks) con el
+    producto punto de cada sub-query con cada centroide: el score de un
+    código es la suma de m entradas de la tabla (ADC).
+    """
+    
+    def __init__(self, centroids: np.ndarray):
+        """
+        Args:
+            centroids: (m, ks, dimension / m) centroides por subespacio
+        """
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.m, self.ks, self.dsub = self.centroids.shape
+        self.dimension = self.m * self.dsub
+        self._half_norms = 0.5 * np.einsum("mkd,mkd->mk", self.centroids, self.centroids)
+    
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        m: int = PQ_SUBSPACES,
+        ks: int = PQ_CENTROIDS,
+        iterations: int = 20,
+        sample_size: int = 65536,
+        seed: int = 42
+    ) -> "PQCodebook":
+        """
+        Entrenar un k-means por subespacio sobre una muestra del corpus
+        
+        Args:
+            vectors: Embeddings del corpus (n, dimension); puede ser un memmap
+            m: Número de sub-vectores (debe dividir a la dimensión)
+            ks: Centroides por subespacio (máx. 256: códigos de 1 byte)
+            iterations: Iteraciones de Lloyd
+            sample_size: Vectores usados para entrenar
+            seed: Semilla
+        """
+        dimension = vectors.shape[1]
+        if dimension % m:
+            raise ValueError(f"m={m} no divide la dimensión {dimension}")
+        if not 1 <= ks <= 256:
+            raise ValueError(f"ks debe estar entre 1 y 256 (códigos de 1 byte), no {ks}")
+        
+        sample = sample_rows(vectors, sample_size, seed)
+        if not len(sample):
+            raise ValueError("Se necesita al menos un vector para entrenar PQ")
+        
+        rng = np.random.default_rng(seed)
+        ks = min(ks, len(sample))
+        dsub = dimension // m
+        centroids = np.empty((m, ks, dsub), dtype=np.float32)
+        for sub in range(m):
+            centroids[sub] = _lloyd(sample[:, sub * dsub:(sub + 1) * dsub], ks, iterations, rng)
+        return cls(centroids)
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Códigos (n, m) uint8: centroide más cercano por subespacio"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.m, self.dsub)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for sub in range(self.m):
+            # argmin ||x - c||² = argmax (x·c - ||c||²/2)
+            affinity = vectors[:, sub] @ self.centroids[sub].T - self._half_norms[sub]
+            codes[:, sub] = np.argmax(affinity, axis=1)
+        return codes
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstrucción aproximada (n, dimension) a partir de los códigos"""
+        return self.centroids[np.arange(self.m), codes].reshape(len(codes), self.dimension)
+    
+    def lookup_table(self, query: np.ndarray) -> np.ndarray:
+        """Tabla ADC (m, ks): producto punto de cada sub-query con cada centroide"""
+        query = np.asarray(query, dtype=np.float32).reshape(self.m, self.dsub)
+        return np.einsum("md,mkd->mk", query, self.centroids)
+    
+    def save(self, path: str, fingerprint: Optional[str] = None) -> Path:
+        """Guardar los codebooks con el fingerprint del modelo que generó el corpus"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"m": self.m, "ks": self.ks, "dimension": self.dimension, "model_fingerprint": fingerprint}
+        
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.centroids, meta=np.array(json.dumps(meta)))
+        tmp_path.replace(path)
+        return path
+    
+    @classmethod
+    def load(cls, path: str, fingerprint: Optional[str] = None) -> "PQCodebook":
+        """
+        Cargar codebooks guardados con save()
+        
+        Raises:
+            ValueError: los codebooks se entrenaron con otro modelo
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if fingerprint and meta.get("model_fingerprint") != fingerprint:
+                raise ValueError(
+                    f"Codebooks de {path} entrenados con otro modelo "
+                    f"({meta.get('model_fingerprint')} != {fingerprint})"
+                )
+            return cls(data["centroids"])
+
+
+class PQIndex(_FlatCodesIndex):
+    """
+    Corpus comprimido con product quantization, puntuado con tablas ADC
+    
+    Sin codebook se entrena uno con el corpus, pero solo cuando hay al
+    menos `min_train_size` vectores: hasta entonces los vectores se
+    guardan en float32 y se puntúan de forma exacta (un codebook entrenado
+    con el primer batch de pocos vectores quedaría fijo para siempre).
+    Al llegar al mínimo se entrena y se codifica todo lo acumulado.
+    CandidateIndex usa los codebooks persistidos junto al modelo.
+    """
+    
+    name = "pq"
+    code_dtype = np.uint8
+    
+    def __init__(
+        self,
+        dimension: int,
+        m: int = PQ_SUBSPACES,
+        codebook: Optional[PQCodebook] = None,
+        block_size: int = 65536,
+        ks: int = PQ_CENTROIDS,
+        min_train_size: Optional[int] = None
+    ):
+        """
+        Args:
+            dimension: Dimensión de los vectores
+            m: Sub-vectores (bytes por vector) si hay que entrenar codebook
+            codebook: Codebooks ya entrenados
+            block_size: Códigos sumados por bloque al puntuar
+            ks: Centroides por subespacio si hay que entrenar codebook
+            min_train_size: Vectores necesarios para entrenar
+                            (None = PQ_MIN_TRAIN_PER_CENTROID * ks)
+        """
+        if codebook is not None:
+            if codebook.dimension != dimension:
+                raise ValueError(f"Codebook de dimensión {codebook.dimension}, se esperaba {dimension}")
+            m, ks = codebook.m, codebook.ks
+        self.m = m
+        self.code_size = m
+        self.codebook = codebook
+        self.block_size = block_size
+        self.ks = ks
+        self.min_train_size = min_train_size or PQ_MIN_TRAIN_PER_CENTROID * ks
+        # float32 alineados con las posiciones mientras no hay codebook
+        self._pending = np.zeros((0, dimension), dtype=np.float32)
+        super().__init__(dimension)
+    
+    @property
+    def trained(self) -> bool:
+        return self.codebook is not None
+    
+    @property
+    def nbytes(self) -> int:
+        pending = 0 if self.trained else self._size * self.dimension * 4
+        return super().nbytes + pending
+    
+    def _train_pending(self) -> None:
+        """Entrenar codebooks con los vectores acumulados y codificarlos"""
+        self.codebook = PQCodebook.train(self._pending[:self._size], self.m, ks=self.ks)
+        for start in range(0, self._size, self.block_size):
+            end = min(start + self.block_size, self._size)
+            self._codes[start:end] = self.codebook.encode(self._pending[start:end])
+        self._pending = np.zeros((0, self.dimension), dtype=np.float32)
+    
+    def build(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        """Entrenar codebooks (si no hay y alcanza el corpus) y codificarlo"""
+        self._pending = np.zeros((0, self.dimension), dtype=np.float32)
+        if not self.trained and len(vectors) >= self.min_train_size:
+            self.codebook = PQCodebook.train(vectors, self.m, ks=self.ks)
+        super().build(vectors, labels)
+    
+    def add(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        """Inserción incremental; sin codebook se acumula hasta poder entrenar"""
+        start = self._size
+        super().add(vectors, labels)
+        if self.trained:
+            return
+        
+        if len(self._pending) < self._size:
+            pending = np.zeros((max(self._size, 2 * len(self._pending), 16), self.dimension), dtype=np.float32)
+            pending[:start] = self._pending[:start]
+            self._pending = pending
+        self._pending[start:self._size] = vectors
+        if self._size >= self.min_train_size:
+            self._train_pending()
+    
+    def remove(self, labels) -> None:
+        """Eliminar etiquetas (swap con la última posición)"""
+        if self.trained:
+            super().remove(labels)
+            return
+        for label in labels:
+            self._pending[self._where[int(label)]] = self._pending[self._size - 1]
+            super().remove([label])
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        if not self.trained:
+            # Códigos de relleno: los vectores esperan en _pending
+            return np.zeros((len(vectors), self.m), dtype=np.uint8)
+        return self.codebook.encode(vectors)
+    
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Producto punto aproximado (ADC) de la query con todos los códigos"""
+        if not self.trained:
+            return self._pending[:self._size] @ query
+        table = self.codebook.lookup_table(query)
+        subspaces = np.arange(self.m)
+        scores = np.empty(self._size, dtype=np.float32)
+        for start in range(0, self._size, self.block_size):
+            block = self._codes[start:min(start + self.block_size, self._size)]
+            scores[start:start + len(block)] = table[subspaces, block].sum(axis=1)
+        return scores
+    
+    def get_params(self) -> dict:
+        params = super().get_params()
+        params.update(
+            m=self.m,
+            ks=self.codebook.ks if self.trained else None,
+            trained=self.trained,
+            min_train_size=self.min_train_size,
+        )
+        return params
+    
+    def _state(self, positions: List[int]) -> dict:
+        # Sin codebook se guardan los vectores pendientes en el orden de guardado
+        if not self.trained:
+            return {
+                "m": np.array(self.m),
+                "ks": np.array(self.ks),
+                "min_train_size": np.array(self.min_train_size),
+                "pending": self._pending[positions],
+            }
+        return {"centroids": self.codebook.centroids}
+    
+    def _load_state(self, data) -> None:
+        if "centroids" in data.files:
+            self.codebook = PQCodebook(data["centroids"])
+            self.m = self.code_size = self.codebook.m
+            self.ks = self.codebook.ks
+            self.min_train_size = PQ_MIN_TRAIN_PER_CENTROID * self.ks
+            return
+        
+        self.codebook = None
+        self.m = self.code_size = int(data["m"])
+        if "pending" in data.files:
+            self.ks = int(data["ks"])
+            self.min_train_size = int(data["min_train_size"])
+            self._pending = np.array(data["pending"], dtype=np.float32)
+
+
+def _lloyd(points: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means euclídeo (Lloyd) de un subespacio"""
+    centroids = points[rng.choice(len(points), k, replace=False)].copy()
+    for _ in range(iterations):
+        half_norms = 0.5 * np.einsum("kd,kd->k", centroids, centroids)
+        assignments = np.argmax(points @ centroids.T - half_norms, axis=1)
+        
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.stack(
+            [np.bincount(assignments, weights=points[:, d], minlength=k) for d in range(points.shape[1])],
+            axis=1
+        )
+        
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Clusters vacíos: reiniciar en puntos aleatorios
+        if not filled.all():
+            centroids[~filled] = points[rng.choice(len(points), int((~filled).sum()))]
+    return centroids
+
+
+QUANTIZED_BACKENDS = {
+    Int8Index.name: Int8Index,
+    BinaryIndex.name: BinaryIndex,
+    PQIndex.name: PQIndex,
+}
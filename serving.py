@@ -0,0 +1,274 @@
+"""
+UTILIDADES DE SERVICIO PARA LA API
+Micro-batching dinámico de peticiones de encode (las peticiones
+concurrentes comparten un mismo forward pass del modelo) y pool acotado
+de inferencia con backpressure
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor
+from functools import partial
+from typing import Callable, List, Optional
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Agrupa textos de peticiones concurrentes en un solo batch
+    
+    Cada petición encola sus textos y espera un future. Un único consumidor
+    junta peticiones hasta llegar a `max_batch_size` textos o hasta que
+    pasen `max_wait_ms` desde la primera, ejecuta el encode fuera del
+    event loop y reparte las filas resultantes a cada petición.
+    
+    Con `pool`, cada flush pasa por InferencePool.run(): el forward pass
+    ocupa un hueco del pool como cualquier otro trabajo de inferencia y,
+    si el pool está lleno, las peticiones del batch fallan con
+    PoolSaturatedError. `max_pending` es un límite aparte (peticiones
+    esperando a ser agrupadas).
+    """
+    
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+        max_pending: Optional[int] = None,
+        pool: Optional["InferencePool"] = None
+    ):
+        """
+        Args:
+            encode_fn: Función bloqueante textos -> matriz (n, dim)
+            max_batch_size: Textos por batch antes de forzar el flush
+            max_wait_ms: Espera máxima desde la primera petición del batch
+            executor: Executor donde correr encode_fn (None = el del loop)
+            max_pending: Peticiones en espera antes de rechazar con
+                         PoolSaturatedError (None = sin límite)
+            pool: InferencePool por el que pasan los flush (tiene prioridad
+                  sobre executor y cuenta para su límite de admisión)
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.pool = pool
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+    
+    async def start(self) -> None:
+        """Arrancar el consumidor (llamar dentro del event loop)"""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Detener el consumidor"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+    
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encolar textos y esperar sus embeddings
+        
+        Returns:
+            Matriz (len(texts), dim) en el orden recibido
+        """
+        if self._worker is None:
+            raise RuntimeError("MicroBatcher no iniciado. Use start() primero.")
+        
+        if self.max_pending is not None and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolSaturatedError(
+                f"Servicio saturado: {self.pending} peticiones de encode pendientes"
+            )
+        
+        self.pending += 1
+        try:
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((list(texts), future))
+            return await future
+        finally:
+            self.pending -= 1
+    
+    def stats(self) -> dict:
+        """Contadores de batching"""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "texts": self.texts,
+            "avg_texts_per_batch": self.texts / self.batches if self.batches else 0.0,
+            "pending_requests": self.pending,
+            "queued_requests": self._queue.qsize() if self._queue is not None else 0,
+            "rejected": self.rejected,
+            "max_pending": self.max_pending,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            
+            # Juntar peticiones hasta llenar el batch o agotar la espera
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                if self.pool is not None:
+                    embeddings = await self.pool.run(self.encode_fn, texts)
+                else:
+                    embeddings = await loop.run_in_executor(self.executor, self.encode_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += len(texts)
+            
+            # Repartir las filas a cada petición
+            start = 0
+            for request_texts, future in batch:
+                end = start + len(request_texts)
+                if not future.done():
+                    future.set_result(embeddings[start:end])
+                start = end
+
+
+class PoolSaturatedError(RuntimeError):
+    """El pool de inferencia no admite más trabajos (backpressure)"""
+
+
+class InferencePool:
+    """
+    Pool acotado para ejecutar inferencia fuera del event loop
+    
+    Admite como máximo `max_workers` trabajos en ejecución más `max_queue`
+    en espera. Con el pool lleno, run() falla de inmediato con
+    PoolSaturatedError en vez de acumular peticiones: el handler responde
+    503 y los endpoints baratos (/health) siguen respondiendo.
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 32,
+        use_processes: bool = False,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = ()
+    ):
+        """
+        Args:
+            max_workers: Trabajos de inferencia simultáneos
+            max_queue: Trabajos en espera antes de rechazar
+            use_processes: True = ProcessPoolExecutor (las funciones deben
+                           ser picklables); False = threads (torch libera el GIL)
+            initializer: Función de inicialización por worker (p. ej. cargar modelo)
+            initargs: Argumentos del initializer
+        """
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = "process" if use_processes else "thread"
+        
+        if use_processes:
+            self.executor = ProcessPoolExecutor(max_workers, initializer=initializer, initargs=initargs)
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers,
+                thread_name_prefix="inference",
+                initializer=initializer,
+                initargs=initargs
+            )
+        
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+    
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+    
+    def acquire(self) -> None:
+        """Reservar un hueco o rechazar (llamar desde el event loop)"""
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise PoolSaturatedError(
+                f"Servicio saturado: {self.pending} trabajos pendientes (máximo {self.capacity})"
+            )
+        self.pending += 1
+    
+    def release(self, failed: bool = False) -> None:
+        """Liberar un hueco reservado con acquire()"""
+        self.pending -= 1
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+    
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Ejecutar fn(*args, **kwargs) en el pool y esperar el resultado
+        
+        Raises:
+            PoolSaturatedError: si ya hay max_workers + max_queue trabajos
+        """
+        self.acquire()
+        failed = False
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(failed)
+    
+    def stats(self) -> dict:
+        """Profundidad de cola y contadores"""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "running": min(self.pending, self.max_workers),
+            "queue_depth": max(0, self.pending - self.max_workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+    
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
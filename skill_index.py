@@ -0,0 +1,225 @@
+"""
+ÍNDICE INVERTIDO DE SKILLS
+Skill normalizado -> filas (posting list ordenada) de los registros que lo
+tienen. Permite filtrar candidatos por skills (AND / OR / mínimo de
+coincidencias) tocando solo las filas de esos skills, y restringir la
+búsqueda por embeddings al subconjunto resultante.
+
+Las filas siguen la misma convención que CandidateIndex: al eliminar, la
+última fila pasa a ocupar el hueco.
+"""
+
+import bisect
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+from match_scoring import normalize_skill
+
+
+class SkillIndex:
+    """Índice invertido skill -> filas, sincronizable con una DB por filas"""
+    
+    def __init__(self):
+        self._postings: Dict[str, List[int]] = {}
+        self._row_skills: List[frozenset] = []
+        self._cache: Dict[str, np.ndarray] = {}
+        
+        # Primera grafía vista de cada skill (para mostrarlo)
+        self.labels: Dict[str, str] = {}
+    
+    def __len__(self) -> int:
+        return len(self._row_skills)
+    
+    @property
+    def skills(self) -> List[str]:
+        """Skills normalizados con al menos una fila"""
+        return [skill for skill, rows in self._postings.items() if rows]
+    
+    # =========================================================================
+    # MODIFICACIÓN
+    # =========================================================================
+    
+    def add(self, skills: Iterable[str]) -> int:
+        """Agregar una fila al final; retorna su número"""
+        row = len(self._row_skills)
+        keys = self._keys(skills)
+        self._row_skills.append(keys)
+        for key in keys:
+            # Las filas nuevas son siempre las mayores: append mantiene el orden
+            self._postings.setdefault(key, []).append(row)
+            self._cache.pop(key, None)
+        return row
+    
+    def add_many(self, skill_lists: Iterable[Iterable[str]]) -> None:
+        """Agregar varias filas al final"""
+        for skills in skill_lists:
+            self.add(skills)
+    
+    def update(self, row: int, skills: Iterable[str]) -> None:
+        """Reemplazar los skills de una fila"""
+        old_keys = self._row_skills[row]
+        new_keys = self._keys(skills)
+        for key in old_keys - new_keys:
+            self._discard(key, row)
+        for key in new_keys - old_keys:
+            bisect.insort(self._postings.setdefault(key, []), row)
+            self._cache.pop(key, None)
+        self._row_skills[row] = new_keys
+    
+    def remove(self, row: int) -> None:
+        """Eliminar una fila moviendo la última al hueco (como CandidateIndex)"""
+        last = len(self._row_skills) - 1
+        for key in self._row_skills[row]:
+            self._discard(key, row)
+        
+        if row != last:
+            last_keys = self._row_skills[last]
+            for key in last_keys:
+                postings = self._postings[key]
+                postings.pop()  # `last` es siempre el último de su posting list
+                bisect.insort(postings, row)
+                self._cache.pop(key, None)
+            self._row_skills[row] = last_keys
+        
+        self._row_skills.pop()
+    
+    # =========================================================================
+    # CONSULTAS
+    # =========================================================================
+    
+    def rows(self, skill: str) -> np.ndarray:
+        """Filas ordenadas que tienen un skill"""
+        key = normalize_skill(skill)
+        if key not in self._cache:
+            self._cache[key] = np.asarray(self._postings.get(key, []), dtype=np.int64)
+        return self._cache[key]
+    
+    def match(
+        self,
+        all_of: Optional[Iterable[str]] = None,
+        any_of: Optional[Iterable[str]] = None,
+        min_overlap: int = 1
+    ) -> np.ndarray:
+        """
+        Filas que cumplen los filtros de skills
+        
+        Args:
+            all_of: Skills obligatorios (AND)
+            any_of: Skills opcionales (OR)
+            min_overlap: Mínimo de skills de any_of que debe tener cada fila
+        
+        Returns:
+            Filas ordenadas (todas las filas si no hay filtros)
+        """
+        result = None
+        
+        if all_of:
+            # Intersectar empezando por la posting list más corta
+            for postings in sorted((self.rows(skill) for skill in set(all_of)), key=len):
+                result = postings if result is None else np.intersect1d(result, postings, assume_unique=True)
+                if not len(result):
+                    return result
+        
+        if any_of:
+            postings = [self.rows(skill) for skill in {normalize_skill(s) for s in any_of}]
+            hits = np.concatenate(postings) if postings else np.zeros(0, dtype=np.int64)
+            if min_overlap <= 1:
+                matched = np.unique(hits)
+            else:
+                counts = np.bincount(hits, minlength=len(self))
+                matched = np.flatnonzero(counts >= min_overlap)
+            result = matched if result is None else np.intersect1d(result, matched, assume_unique=True)
+        
+        if result is None:
+            return np.arange(len(self), dtype=np.int64)
+        return result
+    
+    def mask(self, rows: np.ndarray) -> np.ndarray:
+        """Bitmap booleano (n_filas,) a partir de una lista de filas"""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows] = True
+        return mask
+    
+    def groups(self) -> Dict[str, np.ndarray]:
+        """Skill (grafía original) -> filas, para analítica"""
+        return {self.labels[key]: self.rows(key) for key in self.skills}
+    
+    # =========================================================================
+    # PERSISTENCIA
+    # =========================================================================
+    
+    def save(self, path: str, ids: Optional[List[str]] = None) -> Path:
+        """
+        Guardar el índice en un .npz
+        
+        Args:
+            path: Archivo de destino
+            ids: IDs en el orden de las filas (para validar al cargar)
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        keys = sorted(self._postings)
+        offsets = np.cumsum([0] + [len(self._postings[key]) for key in keys], dtype=np.int64)
+        rows = np.zeros(0, dtype=np.int64)
+        if keys:
+            rows = np.concatenate([np.asarray(self._postings[key], dtype=np.int64) for key in keys])
+        meta = {"count": len(self), "labels": {key: self.labels.get(key, key) for key in keys}, "ids": ids}
+        
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                keys=np.array(keys, dtype=str),
+                offsets=offsets,
+                rows=rows,
+                meta=np.array(json.dumps(meta))
+            )
+        tmp_path.replace(path)
+        return path
+    
+    @classmethod
+    def load(cls, path: str) -> tuple:
+        """
+        Cargar un índice guardado con save()
+        
+        Returns:
+            (índice, ids guardados o None)
+        """
+        with np.load(path, allow_pickle=False) as data:
+            keys = [str(key) for key in data["keys"]]
+            offsets = data["offsets"]
+            rows = data["rows"]
+            meta = json.loads(str(data["meta"]))
+        
+        index = cls()
+        row_skills = [set() for _ in range(meta["count"])]
+        for i, key in enumerate(keys):
+            postings = rows[offsets[i]:offsets[i + 1]].tolist()
+            index._postings[key] = postings
+            for row in postings:
+                row_skills[row].add(key)
+        
+        index._row_skills = [frozenset(skills) for skills in row_skills]
+        index.labels = meta["labels"]
+        return index, meta.get("ids")
+    
+    # =========================================================================
+    # UTILIDADES INTERNAS
+    # =========================================================================
+    
+    def _keys(self, skills: Iterable[str]) -> frozenset:
+        keys = set()
+        for skill in skills:
+            key = normalize_skill(skill)
+            if key:
+                self.labels.setdefault(key, skill)
+                keys.add(key)
+        return frozenset(keys)
+    
+    def _discard(self, key: str, row: int) -> None:
+        postings = self._postings[key]
+        del postings[bisect.bisect_left(postings, row)]
+        self._cache.pop(key, None)
@@ -0,0 +1,57 @@
+"""
+Configuración de pytest: los módulos del proyecto viven en la raíz del
+repositorio (loader.py, candidate_index.py, ...), no en un paquete
+
+Si sentence_transformers no está instalado se registra un sustituto
+determinista (bolsa de palabras con hash) para que loader.py, el índice y
+el agente se puedan probar sin torch ni pesos del modelo.
+"""
+
+import hashlib
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "agent"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+STUB_DIMENSION = 32
+
+
+class StubSentenceTransformer:
+    """
+    Mismo contrato que SentenceTransformer.encode, sin red neuronal
+    
+    Cada palabra aporta un vector pseudoaleatorio fijo (semilla = hash), así
+    que textos que comparten palabras quedan cerca.
+    """
+    
+    def __init__(self, model_name_or_path=None, device=None, **kwargs):
+        self.calls = 0
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return STUB_DIMENSION
+    
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        self.calls += 1
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        
+        embeddings = np.zeros((len(texts), STUB_DIMENSION), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in str(text).lower().split() or [""]:
+                seed = int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16)
+                embeddings[i] += np.random.default_rng(seed).standard_normal(STUB_DIMENSION)
+        return embeddings[0] if single else embeddings
+
+
+try:
+    import sentence_transformers  # noqa: F401
+except ImportError:
+    stub = types.ModuleType("sentence_transformers")
+    stub.SentenceTransformer = StubSentenceTransformer
+    sys.modules["sentence_transformers"] = stub
@@ -0,0 +1,374 @@
+"""
+AdvancedRecruitmentAgent: matrices de embeddings alineadas con la DB, IDs
+resueltos en O(1), lecturas en paralelo y escrituras exclusivas (DB,
+índices y skill_index siguen alineados bajo concurrencia); la caché de
+búsquedas retorna copias y se invalida con cada cambio en la DB
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from agents_advanced import AdvancedRecruitmentAgent
+from loader import normalize_embeddings
+
+
+@pytest.fixture
+def agent():
+    return AdvancedRecruitmentAgent(search_cache_ttl=None)
+
+
+def _candidate(candidate_id, skills=("Python",)):
+    return {
+        "id": candidate_id,
+        "name": f"Candidate {candidate_id}",
+        "profile": f"python developer {candidate_id}",
+        "skills": list(skills),
+        "years": 3,
+        "location": "Boston",
+    }
+
+
+def _check_aligned(agent):
+    """Fila i de la matriz, del skill_index y de la DB = mismo registro"""
+    ids = [c["id"] for c in agent.candidates_db]
+    assert agent.candidate_index.ids == ids
+    assert len(agent.skill_index) == len(ids)
+    python_rows = agent.skill_index.rows("python").tolist()
+    for row, candidate in enumerate(agent.candidates_db):
+        assert agent.candidate_index.row_of(candidate["id"]) == row
+        assert (row in python_rows) == ("Python" in candidate["skills"])
+
+
+def _run_threads(targets):
+    errors = []
+    
+    def guarded(target):
+        try:
+            target()
+        except Exception as e:   # pragma: no cover - solo si falla el test
+            errors.append(e)
+    
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not errors
+
+
+def test_reads_run_in_parallel(agent):
+    # Cada búsqueda espera a las demás dentro del lock: si las lecturas
+    # fueran exclusivas la barrera vencería su timeout
+    barrier = threading.Barrier(4, timeout=5)
+    search_rows = agent.candidate_index.search_rows
+    
+    def slow_search_rows(*args, **kwargs):
+        barrier.wait()
+        return search_rows(*args, **kwargs)
+    
+    agent.candidate_index.search_rows = slow_search_rows
+    queries = ["python", "react", "machine learning", "backend apis"]
+    _run_threads([lambda q=q: agent.search_candidates(q) for q in queries])
+
+
+def test_writes_exclude_reads(agent):
+    inside_read = threading.Event()
+    release_read = threading.Event()
+    written = threading.Event()
+    
+    # Una lectura en curso (p. ej. un matching largo) retiene el lock compartido
+    def read():
+        agent._lock.acquire_read()
+        try:
+            inside_read.set()
+            release_read.wait(5)
+        finally:
+            agent._lock.release_read()
+    
+    def write():
+        agent.add_candidate(_candidate("C100"))
+        written.set()
+    
+    reader = threading.Thread(target=read)
+    reader.start()
+    assert inside_read.wait(5)
+    writer = threading.Thread(target=write)
+    writer.start()
+    assert not written.wait(0.2)   # la escritura espera a la lectura
+    release_read.set()
+    reader.join(5)
+    writer.join(5)
+    assert written.is_set()
+    assert agent.get_candidate("C100")["name"] == "Candidate C100"
+
+
+def test_cannot_write_from_inside_a_read(agent):
+    agent._lock.acquire_read()
+    try:
+        with pytest.raises(RuntimeError):
+            agent.add_candidate(_candidate("C100"))
+    finally:
+        agent._lock.release_read()
+    assert agent.get_candidate("C100") is None
+
+
+def test_concurrent_writes_and_reads_stay_consistent(agent):
+    def writer(prefix):
+        def run():
+            for i in range(15):
+                skills = ["Python"] if i % 2 else ["React"]
+                agent.add_candidate(_candidate(f"{prefix}{i:02d}", skills))
+                if i % 3 == 0:
+                    agent.remove_candidate(f"{prefix}{i:02d}")
+                elif i % 3 == 1:
+                    agent.update_candidate(f"{prefix}{i:02d}", skills=["Python", "Go"])
+        return run
+    
+    def reader(query):
+        def run():
+            for _ in range(20):
+                for result in agent.search_candidates(query, top_k=3, skills_any=["Python"]):
+                    assert "Python" in result["skills"]
+                agent.match_all_candidates("J001", top_k=3)
+                agent.list_candidates()
+        return run
+    
+    _run_threads([writer("W"), writer("X"), reader("python"), reader("developer"), reader("react")])
+    
+    assert len(agent.candidates_db) == 4 + 2 * 10
+    _check_aligned(agent)
+
+
+# ----------------------------------------------------------------------------
+# Matrices pre-calculadas
+# ----------------------------------------------------------------------------
+
+def _count_forward(agent):
+    texts = []
+    encode = agent.model.model.encode
+    
+    def counting_encode(batch, *args, **kwargs):
+        texts.extend([batch] if isinstance(batch, str) else batch)
+        return encode(batch, *args, **kwargs)
+    
+    agent.model.model.encode = counting_encode
+    return texts, encode
+
+
+def test_embedding_matrices_follow_db_changes(agent):
+    encoded, encode = _count_forward(agent)
+    
+    agent.add_candidate(_candidate("C100"))
+    agent.update_candidate("C100", years=9)                     # sin cambio de texto
+    agent.update_candidate("C002", profile="golang sre kubernetes")
+    agent.remove_candidate("C001")
+    agent.add_job({
+        "id": "J100", "title": "SRE", "description": "site reliability engineer",
+        "required_skills": ["Go"], "years_required": 2,
+    })
+    
+    # Solo se codificó cada texto nuevo, una vez
+    assert encoded == ["python developer C100", "golang sre kubernetes", "site reliability engineer"]
+    
+    for db, matrix, field in (
+        (agent.candidates_db, agent.candidate_embeddings, "profile"),
+        (agent.jobs_db, agent.job_embeddings, "description"),
+    ):
+        expected = normalize_embeddings(encode([record[field] for record in db]))
+        np.testing.assert_allclose(matrix, expected, atol=1e-6)
+    _check_aligned(agent)
+
+
+@pytest.mark.parametrize("record", [
+    {"id": "C100", "name": "No profile", "skills": ["Python"], "years": 1},
+    dict(_candidate("C100"), skills="Python"),
+    _candidate("C001"),                                        # ID repetido
+])
+def test_invalid_candidate_leaves_agent_untouched(agent, record):
+    before = agent.list_candidates()
+    matrix = agent.candidate_embeddings.copy()
+    version = agent.db_version
+    
+    with pytest.raises(ValueError):
+        agent.add_candidate(record)
+    
+    assert agent.list_candidates() == before
+    np.testing.assert_array_equal(agent.candidate_embeddings, matrix)
+    assert agent.db_version == version
+    _check_aligned(agent)
+    
+    with pytest.raises(ValueError):
+        agent.update_candidate("C001", skills="Python")
+    assert agent.get_candidate("C001")["skills"] == before[0]["skills"]
+
+
+# ----------------------------------------------------------------------------
+# Búsqueda de IDs y filas
+# ----------------------------------------------------------------------------
+
+def test_ids_resolve_to_their_record_after_removals(agent):
+    # Dos perfiles idénticos: la búsqueda por filas no los confunde
+    agent.add_candidate(_candidate("C100"))
+    agent.add_candidate(dict(_candidate("C101"), name="Twin"))
+    agent.remove_candidate("C001")   # la última fila pasa al hueco
+    agent.remove_job("J001")
+    
+    for candidate in agent.candidates_db:
+        assert agent.get_candidate(candidate["id"]) is candidate
+    for job in agent.jobs_db:
+        assert agent.get_job(job["id"]) is job
+    assert agent.get_candidate("C001") is None
+    assert agent.get_job("J001") is None
+    
+    rows, scores = agent.search_candidate_rows("python developer C100", top_k=len(agent.candidates_db))
+    results = agent.search_candidates("python developer C100", top_k=len(agent.candidates_db))
+    assert [agent.candidates_db[row]["id"] for row in rows] == [r["id"] for r in results]
+    assert {"C100", "C101"} <= {r["id"] for r in results}
+    
+    match = agent.calculate_candidate_job_match("C101", "J002")
+    assert match["candidate"]["name"] == "Twin"
+    assert match["job"]["id"] == "J002"
+    assert "error" in agent.calculate_candidate_job_match("C001", "J002")
+
+
+# ----------------------------------------------------------------------------
+# Pre-filtrado por skills y metadata
+# ----------------------------------------------------------------------------
+
+def test_skill_filters_restrict_the_searched_rows(agent):
+    results = agent.search_candidates("developer", top_k=10, skills_all=["python", "ML"])
+    assert [r["id"] for r in results] == ["C004"]
+    
+    results = agent.search_candidates("developer", top_k=10, skills_any=["React", "FastAPI"])
+    assert {r["id"] for r in results} == {"C002", "C003"}
+    assert agent.search_candidates("developer", skills_all=["Cobol"]) == []
+
+
+def test_skill_index_is_reused_while_it_matches_the_db(tmp_path):
+    path = tmp_path / "skills.npz"
+    AdvancedRecruitmentAgent(skill_index_path=str(path))
+    saved = path.stat().st_mtime_ns
+    
+    agent = AdvancedRecruitmentAgent(skill_index_path=str(path))
+    assert path.stat().st_mtime_ns == saved
+    
+    agent.add_candidate(_candidate("C100", skills=["Rust"]))
+    agent.save_skill_index()
+    
+    # El índice guardado ya no coincide con la DB de arranque: se reconstruye
+    reloaded = AdvancedRecruitmentAgent(skill_index_path=str(path))
+    assert reloaded.skill_index.rows("rust").tolist() == []
+
+
+def test_metadata_filters_combine_with_skills(agent):
+    filters = [("years", ">=", 7)]
+    assert {r["id"] for r in agent.search_candidates("developer", top_k=10, filters=filters)} == {"C001", "C004"}
+    
+    filters = [("years", ">=", 7), ("location", "in", [" boston "])]
+    assert [r["id"] for r in agent.search_candidates("developer", top_k=10, filters=filters)] == ["C004"]
+    assert agent.search_candidates("developer", top_k=10, filters=filters, skills_all=["React"]) == []
+    
+    filters = [("salary_min", ">=", 120_000)]
+    assert {r["id"] for r in agent.search_jobs("python", top_k=10, filters=filters)} == {"J001", "J003"}
+    
+    # Los filtros se recalculan tras modificar la DB
+    agent.update_candidate("C003", years=12)
+    filters = [("years", ">=", 7)]
+    assert {r["id"] for r in agent.search_candidates("developer", top_k=10, filters=filters)} == {"C001", "C003", "C004"}
+
+
+# ----------------------------------------------------------------------------
+# Modos de búsqueda y pipeline recuperar -> re-rankear
+# ----------------------------------------------------------------------------
+
+def test_lexical_and_hybrid_search_modes(agent):
+    assert [r["id"] for r in agent.search_candidates("APIs", mode="lexical")] == ["C002"]
+    assert agent.search_candidates("APIs", mode="hybrid")[0]["id"] == "C002"
+    assert [r["id"] for r in agent.search_jobs("react", mode="lexical")] == ["J002"]
+    
+    # La caché distingue el modo de búsqueda
+    assert len(agent.search_candidates("APIs", top_k=4, mode="dense")) == 4
+
+
+def _add_pool(agent, n=40):
+    skills = [["Python", "Django"], ["React", "CSS"], ["Python", "ML"], ["Java"], ["Python", "APIs"]]
+    for i in range(n):
+        agent.add_candidate(dict(
+            _candidate(f"P{i:02d}", skills[i % len(skills)]),
+            profile=f"{' '.join(skills[i % len(skills)])} engineer {i}",
+            years=i % 12,
+        ))
+
+
+def _ranking(results):
+    return [(r["candidate"]["id"], r["job"]["id"], round(r["overall_score"], 6)) for r in results]
+
+
+def test_rerank_over_the_whole_pool_equals_full_matching(agent):
+    _add_pool(agent)
+    n = len(agent.candidates_db)
+    
+    results, stats = agent.get_top_candidates_for_job("J001", top_k=10, retrieve_k=n, return_stats=True)
+    assert _ranking(results) == _ranking(agent.match_all_candidates("J001", top_k=10))
+    assert stats["retrieved"] == n and stats["returned"] == 10
+    
+    recommendations = agent.get_job_recommendations_for_candidate("P02", top_k=3, retrieve_k=10)
+    full = [agent.calculate_candidate_job_match("P02", job["id"]) for job in agent.jobs_db]
+    full.sort(key=lambda r: -r["overall_score"])
+    assert _ranking(recommendations) == _ranking(full)
+
+
+def test_rerank_scores_only_the_retrieved_candidates(agent):
+    _add_pool(agent)
+    results, stats = agent.get_top_candidates_for_job("J003", top_k=5, retrieve_k=8, return_stats=True)
+    
+    retrieved, _ = agent.candidate_index.search_embedding(agent.job_embeddings[agent.job_index.row_of("J003")], 8)
+    retrieved_ids = {agent.candidates_db[row]["id"] for row in retrieved}
+    assert stats["retrieved"] == 8
+    assert {r["candidate"]["id"] for r in results} <= retrieved_ids
+    assert agent.pipeline_stats["candidates_for_job"] is stats
+    assert agent.get_top_candidates_for_job("J999") == []
+
+
+# ----------------------------------------------------------------------------
+# Caché de búsquedas
+# ----------------------------------------------------------------------------
+
+def test_search_cache_returns_copies_until_the_db_changes(agent):
+    calls = []
+    search_rows = agent.search_candidate_rows
+    agent.search_candidate_rows = lambda *args, **kwargs: calls.append(args) or search_rows(*args, **kwargs)
+    
+    first = agent.search_candidates("python developer", top_k=3, filters=[("years", ">=", 1)])
+    first[0]["name"] = "modificado"
+    again = agent.search_candidates("python developer", top_k=3, filters=[("years", ">=", 1)])
+    assert len(calls) == 1
+    assert again[0]["name"] != "modificado"
+    assert agent.search_cache.stats()["hits"] == 1
+    
+    # Cada cambio en la DB sube db_version: la misma consulta se recalcula
+    version = agent.db_version
+    agent.add_candidate(_candidate("C900"))
+    assert agent.db_version == version + 1
+    assert "C900" in [r["id"] for r in agent.search_candidates("python developer C900", top_k=3)]
+    
+    agent.update_candidate(again[0]["id"], name="Otro nombre")
+    updated = agent.search_candidates("python developer", top_k=3, filters=[("years", ">=", 1)])
+    assert len(calls) == 3
+    assert {r["id"]: r["name"] for r in updated}[again[0]["id"]] == "Otro nombre"
+
+
+def test_search_cache_entries_expire(agent):
+    from cache import LRUCache
+    
+    now = [0.0]
+    agent.search_cache = LRUCache(max_entries=8, ttl=10.0, clock=lambda: now[0])
+    agent.search_jobs("python developer", top_k=2)
+    agent.search_jobs("python developer", top_k=2)
+    now[0] = 10.0
+    agent.search_jobs("python developer", top_k=2)
+    
+    stats = agent.search_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
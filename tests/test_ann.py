@@ -0,0 +1,142 @@
+"""
+Backends ANN: recall@k frente a búsqueda exacta, altas / bajas
+incrementales y re-entrenamiento del IVF en NumPy
+"""
+
+import numpy as np
+import pytest
+
+from ann import NumpyIVFIndex, create_ann_index
+
+DIMENSION = 32
+K = 10
+
+
+def _corpus(n=3000, n_groups=30, seed=0):
+    """Vectores normalizados agrupados (como perfiles de unos pocos roles)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_groups, DIMENSION))
+    points = centers[rng.integers(n_groups, size=n)] + 0.5 * rng.standard_normal((n, DIMENSION))
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _recall(index, vectors, labels, queries, k=K):
+    hits = 0
+    for query in queries:
+        exact = labels[np.argsort(-(vectors @ query), kind="stable")[:k]]
+        found, _ = index.search(query, k)
+        hits += len(set(found.tolist()) & set(exact.tolist()))
+    return hits / (k * len(queries))
+
+
+def _backend(name):
+    if name == "hnswlib":
+        pytest.importorskip("hnswlib")
+    if name == "faiss-ivf":
+        pytest.importorskip("faiss")
+    params = {"hnswlib": {"ef": 128}, "faiss-ivf": {"nprobe": 16}, "numpy-ivf": {"nprobe": 16}}
+    return create_ann_index(DIMENSION, backend=name, **params[name])
+
+
+@pytest.mark.parametrize("backend", ["numpy-ivf", "hnswlib", "faiss-ivf"])
+def test_recall_against_exact_search(backend):
+    vectors = _corpus()
+    labels = np.arange(len(vectors), dtype=np.int64) * 7   # etiquetas != filas
+    queries = _corpus(n=50, seed=1)
+    
+    index = _backend(backend)
+    index.build(vectors, labels)
+    
+    assert len(index) == len(vectors)
+    assert _recall(index, vectors, labels, queries) >= 0.9
+    
+    found, scores = index.search(queries[0], K)
+    assert np.all(np.diff(scores) <= 1e-6)
+    np.testing.assert_allclose(scores, vectors[found // 7] @ queries[0], rtol=1e-4, atol=1e-5)
+
+
+def test_ivf_visiting_every_list_is_exact():
+    vectors = _corpus(n=500)
+    labels = np.arange(len(vectors), dtype=np.int64)
+    index = NumpyIVFIndex(DIMENSION, nlist=8, nprobe=8)
+    index.build(vectors, labels)
+    assert _recall(index, vectors, labels, _corpus(n=20, seed=1)) == 1.0
+
+
+@pytest.mark.parametrize("backend", ["numpy-ivf", "hnswlib", "faiss-ivf"])
+def test_incremental_add_and_remove(backend):
+    vectors = _corpus(n=1500)
+    labels = np.arange(len(vectors), dtype=np.int64)
+    index = _backend(backend)
+    index.build(vectors[:1000], labels[:1000])
+    index.add(vectors[1000:], labels[1000:])
+    
+    removed = set(range(0, 1500, 3))
+    index.remove(sorted(removed))
+    alive = np.array(sorted(set(range(1500)) - removed), dtype=np.int64)
+    assert len(index) == len(alive)
+    
+    queries = _corpus(n=30, seed=2)
+    for query in queries:
+        found, _ = index.search(query, K)
+        assert not removed & set(found.tolist())
+    assert _recall(index, vectors[alive], alive, queries) >= 0.85
+
+
+def test_ivf_retrains_after_outgrowing_its_training_set():
+    vectors = _corpus(n=4000)
+    labels = np.arange(len(vectors), dtype=np.int64)
+    index = NumpyIVFIndex(DIMENSION, nprobe=16, retrain_factor=2.0)
+    index.build(vectors[:500], labels[:500])
+    
+    index.add(vectors[500:1500], labels[500:1500])     # 1000 = 2x: aún no
+    assert index.retrains == 0
+    assert index.added_since_training == 1000
+    
+    index.add(vectors[1500:1600], labels[1500:1600])   # 1100 > 2x: re-entrena
+    assert index.retrains == 1
+    assert index.trained_size == 1600
+    assert index.added_since_training == 0
+    assert len(index.centroids) == int(4 * np.sqrt(1600))
+    
+    index.add(vectors[1600:], labels[1600:])
+    assert len(index) == len(vectors)
+    assert _recall(index, vectors, labels, _corpus(n=30, seed=3)) >= 0.9
+
+
+def test_ivf_retrain_can_be_disabled_or_forced():
+    vectors = _corpus(n=1000)
+    labels = np.arange(len(vectors), dtype=np.int64)
+    index = NumpyIVFIndex(DIMENSION, retrain_factor=None)
+    index.build(vectors[:100], labels[:100])
+    index.add(vectors[100:], labels[100:])
+    assert index.retrains == 0
+    
+    index.remove(range(0, 1000, 2))
+    index.retrain()
+    assert index.retrains == 1
+    assert index.trained_size == len(index) == 500
+    found, _ = index.search(vectors[1], 1)
+    assert found.tolist() == [1]
+
+
+def test_empty_build_trains_on_first_add():
+    index = NumpyIVFIndex(DIMENSION)
+    index.build(np.zeros((0, DIMENSION), dtype=np.float32), np.zeros(0, dtype=np.int64))
+    assert len(index.search(_corpus(n=1)[0], K)[0]) == 0
+    
+    vectors = _corpus(n=200)
+    index.add(vectors, np.arange(200))
+    assert index.trained_size == 200
+    assert index.search(vectors[5], 1)[0].tolist() == [5]
+
+
+def test_factory_params():
+    # auto descarta los parámetros de otros backends
+    index = create_ann_index(DIMENSION, backend="auto", nprobe=4, ef=32)
+    assert index.get_params()["backend"] in ("hnswlib", "faiss-ivf", "numpy-ivf")
+    
+    with pytest.raises(ValueError):
+        create_ann_index(DIMENSION, backend="annoy")
+    with pytest.raises(ValueError):
+        NumpyIVFIndex(DIMENSION).set_params(ef=10)
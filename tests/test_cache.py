@@ -0,0 +1,135 @@
+"""
+LRUCache: orden de desalojo, límite de entradas / bytes y expiración (TTL)
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from cache import LRUCache
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class FakeClock:
+    """Reloj manual para probar el TTL sin dormir"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_requires_a_limit():
+    with pytest.raises(ValueError):
+        LRUCache()
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1      # "a" pasa a ser la más reciente
+    cache.put("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_put_existing_key_replaces_without_growing():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("a", 2)
+    
+    assert len(cache) == 1
+    assert cache.get("a") == 2
+
+
+def test_byte_cap():
+    cache = LRUCache(max_bytes=100)
+    cache.put("a", np.zeros(10, dtype=np.float32))   # 40 bytes
+    cache.put("b", np.zeros(10, dtype=np.float32))   # 80
+    cache.put("c", np.zeros(10, dtype=np.float32))   # 120 -> desaloja "a"
+    
+    stats = cache.stats()
+    assert cache.get("a") is None
+    assert stats["bytes"] == 80
+    assert stats["entries"] == 2
+    
+    # Un valor mayor que el límite no se guarda ni desaloja nada
+    cache.put("big", np.zeros(100, dtype=np.float32))
+    assert cache.get("big") is None
+    assert len(cache) == 2
+
+
+def test_replacing_a_value_updates_bytes():
+    cache = LRUCache(max_bytes=1000, sizeof=len)
+    cache.put("a", "x" * 300)
+    cache.put("a", "x" * 100)
+    assert cache.stats()["bytes"] == 100
+
+
+def test_ttl_expires_entries():
+    clock = FakeClock()
+    cache = LRUCache(max_entries=10, ttl=5.0, clock=clock)
+    cache.put("a", 1)
+    
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    
+    clock.now = 5.0
+    assert cache.get("a", "miss") == "miss"
+    assert len(cache) == 0
+    
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_put_refreshes_ttl():
+    clock = FakeClock()
+    cache = LRUCache(max_entries=10, ttl=5.0, clock=clock)
+    cache.put("a", 1)
+    clock.now = 4.0
+    cache.put("a", 2)
+    clock.now = 8.0
+    assert cache.get("a") == 2
+
+
+def test_clear_keeps_counters():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.clear()
+    
+    assert len(cache) == 0
+    assert cache.stats()["bytes"] == 0
+    assert cache.stats()["hits"] == 1
+
+
+def test_model_encode_only_forwards_missing_texts():
+    from loader import load_model
+    
+    model = load_model(str(ROOT / "model"), cache_size=16)
+    forwarded = []
+    encode = model.model.encode
+    
+    def counting_encode(texts, *args, **kwargs):
+        forwarded.append(list(texts))
+        return encode(texts, *args, **kwargs)
+    
+    model.model.encode = counting_encode
+    first = model.encode(["python developer", "java engineer"])
+    
+    again = model.encode(["java engineer", "python developer", "java engineer"])
+    np.testing.assert_array_equal(again[0], first[1])
+    np.testing.assert_array_equal(again[1], first[0])
+    
+    model.encode(["python developer", "data scientist"])
+    assert forwarded == [["python developer", "java engineer"], ["data scientist"]]
+    assert model.cache.stats()["hits"] == 4
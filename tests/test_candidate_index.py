@@ -0,0 +1,159 @@
+"""
+CandidateIndex: alta / baja / búsqueda por ID; eliminar con swap de la
+última fila mantiene IDs, filas, etiquetas estables y el índice ANN
+sincronizados
+"""
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from candidate_index import CandidateIndex
+from loader import load_model, normalize_embeddings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+DIMENSION = 16
+
+
+@pytest.fixture
+def model():
+    """Solo lo que CandidateIndex usa con add_embeddings (sin codificar textos)"""
+    return SimpleNamespace(
+        model=SimpleNamespace(get_sentence_embedding_dimension=lambda: DIMENSION)
+    )
+
+
+def _vectors(n, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, DIMENSION)).astype(np.float32)
+    return normalize_embeddings(vectors)
+
+
+def _check_consistent(index, expected):
+    """Cada ID conserva su vector y las tablas fila/etiqueta coinciden"""
+    assert len(index) == len(expected)
+    assert sorted(index.ids) == sorted(expected)
+    for row, candidate_id in enumerate(index.ids):
+        assert index.row_of(candidate_id) == row
+        np.testing.assert_allclose(index.embeddings[row], expected[candidate_id], atol=1e-6)
+        assert index._label_to_row[index._labels[row]] == row
+    assert len(index._label_to_row) == len(index)
+
+
+@pytest.mark.parametrize("backend", [None, "numpy-ivf", "int8"])
+def test_remove_keeps_rows_labels_and_ann_in_sync(model, backend):
+    vectors = _vectors(60)
+    ids = [f"C{i:03d}" for i in range(60)]
+    expected = dict(zip(ids, vectors))
+    
+    index = CandidateIndex(model, initial_capacity=8)
+    index.add_embeddings(ids, vectors)
+    if backend == "numpy-ivf":
+        # nprobe = nlist: el IVF recorre todas las listas y debe ser exacto
+        index.enable_ann(backend, nlist=4, nprobe=4)
+    elif backend:
+        index.enable_ann(backend, rescore=60)
+    
+    # Borrar la última fila, una intermedia y la primera, por separado y en lote
+    for batch in (["C059"], ["C010", "C000"], ["C030", "C058", "C031"]):
+        index.remove(batch)
+        for candidate_id in batch:
+            del expected[candidate_id]
+        _check_consistent(index, expected)
+    
+    # Filas nuevas después de borrar reciben etiquetas nuevas
+    new_ids = ["N0", "N1"]
+    new_vectors = _vectors(2, seed=1)
+    index.add_embeddings(new_ids, new_vectors)
+    expected.update(zip(new_ids, new_vectors))
+    _check_consistent(index, expected)
+    assert len(set(index._labels)) == len(index)
+    
+    if backend:
+        assert len(index.ann) == len(index)
+        for query in _vectors(5, seed=2):
+            exact_rows, _ = index.search_embedding(query, 10, exact=True)
+            ann_rows, _ = index.search_embedding(query, 10)
+            assert ann_rows.tolist() == exact_rows.tolist()
+
+
+def test_remove_validates_before_mutating(model):
+    index = CandidateIndex(model)
+    index.add_embeddings(["a", "b"], _vectors(2))
+    
+    with pytest.raises(KeyError):
+        index.remove(["a", "missing"])
+    assert index.ids == ["a", "b"]
+    
+    with pytest.raises(ValueError):
+        index.add_embeddings(["b", "c"], _vectors(2))
+    assert index.ids == ["a", "b"]
+
+
+@pytest.mark.parametrize("backend", [None, "numpy-ivf"])
+def test_duplicate_ids_are_rejected_before_mutating(model, backend):
+    vectors = _vectors(10)
+    ids = [f"C{i}" for i in range(10)]
+    expected = dict(zip(ids, vectors))
+    index = CandidateIndex(model)
+    index.add_embeddings(ids, vectors)
+    index.enable_lexical()
+    if backend:
+        index.enable_ann(backend, nlist=2, nprobe=2)
+    
+    with pytest.raises(ValueError):
+        index.remove(["C1", "C1"])
+    with pytest.raises(ValueError):
+        index._update_rows(["C2", "C2"], _vectors(2, seed=1), ["x", "y"])
+    
+    _check_consistent(index, expected)
+    assert len(index.lexical) == len(index)
+    if backend:
+        assert len(index.ann) == len(index)
+    
+    index.remove(["C1", "C9"])
+    del expected["C1"], expected["C9"]
+    _check_consistent(index, expected)
+
+
+def test_add_search_update_remove_by_id():
+    model = load_model(str(ROOT / "model"))
+    index = CandidateIndex(model)
+    index.add(["py", "js", "ml"], [
+        "python backend developer django",
+        "frontend react javascript developer",
+        "machine learning engineer tensorflow",
+    ])
+    
+    assert [r["id"] for r in index.search("python backend developer django", top_k=1)] == ["py"]
+    np.testing.assert_allclose(np.linalg.norm(index.get_embedding("js")), 1.0, rtol=1e-5)
+    
+    index.update("js", "machine learning engineer tensorflow pytorch")
+    assert index.search("machine learning engineer tensorflow", top_k=2)[1]["id"] == "js"
+    
+    index.remove("py")
+    assert "py" not in index
+    assert {r["id"] for r in index.search("python", top_k=None)} == {"js", "ml"}
+
+
+@pytest.mark.parametrize("backend", [None, "numpy-ivf"])
+def test_row_prefilter_searches_only_the_subset(model, backend):
+    vectors = _vectors(200)
+    index = CandidateIndex(model)
+    index.add_embeddings([f"C{i}" for i in range(200)], vectors)
+    if backend:
+        index.enable_ann(backend, nlist=8, nprobe=1)   # ANN impreciso: no debe usarse
+    
+    mask = np.zeros(200, dtype=bool)
+    mask[::7] = True
+    query = _vectors(1, seed=3)[0]
+    expected = np.flatnonzero(mask)[np.argsort(-(vectors[mask] @ query), kind="stable")[:5]]
+    
+    for rows in (mask, np.flatnonzero(mask)):
+        found, scores = index.search_embedding(query, 5, rows=rows)
+        assert found.tolist() == expected.tolist()
+        np.testing.assert_allclose(scores, vectors[found] @ query, atol=1e-6)
+    assert len(index.search_embedding(query, 5, rows=np.zeros(0, dtype=np.int64))[0]) == 0
@@ -0,0 +1,275 @@
+"""
+ClusterModel: convergencia en grupos separados, persistencia y warm start;
+ModeloPortable agrupa almacenes sin re-codificar y asigna textos nuevos.
+Silhouette y Davies–Bouldin contra su definición y selección de k.
+Resumen de clusters: centroide, medoide, representantes y términos
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from clustering import (
+    ClusterModel,
+    davies_bouldin_score,
+    pairwise_distances,
+    select_n_clusters,
+    silhouette_score,
+    summarize_clusters,
+)
+from lexical_index import count_matrix
+from loader import load_model
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _blobs(n_per_cluster=200, k=4, dim=16, seed=0):
+    """Grupos gaussianos bien separados (etiqueta real por fila)"""
+    rng = np.random.default_rng(seed)
+    centers = 5 * rng.standard_normal((k, dim))
+    labels = np.repeat(np.arange(k), n_per_cluster)
+    points = centers[labels] + 0.3 * rng.standard_normal((len(labels), dim))
+    return points.astype(np.float32), labels
+
+
+def _same_partition(a, b):
+    """Las dos asignaciones agrupan igual (salvo el nombre de los clusters)"""
+    pairs = set(zip(a.tolist(), b.tolist()))
+    return len(pairs) == len(set(a.tolist())) == len(set(b.tolist()))
+
+
+def test_fit_recovers_separated_groups():
+    points, truth = _blobs()
+    model = ClusterModel(4, batch_size=128).fit(points, epochs=2)
+    
+    assert _same_partition(model.predict(points), truth)
+    assert model.counts.sum() == 2 * len(points)
+
+
+def test_fit_needs_enough_vectors():
+    with pytest.raises(ValueError):
+        ClusterModel(10).fit(np.zeros((5, 4), dtype=np.float32))
+    with pytest.raises(RuntimeError):
+        ClusterModel(2).predict(np.zeros((1, 4), dtype=np.float32))
+
+
+def test_save_load_round_trip(tmp_path):
+    points, _ = _blobs()
+    model = ClusterModel(4, batch_size=128).fit(points)
+    path = model.save(tmp_path / "clusters.npz", fingerprint="abc")
+    
+    loaded = ClusterModel.load(path, fingerprint="abc")
+    np.testing.assert_array_equal(loaded.centroids, model.centroids)
+    np.testing.assert_array_equal(loaded.counts, model.counts)
+    np.testing.assert_array_equal(loaded.predict(points), model.predict(points))
+    
+    with pytest.raises(ValueError):
+        ClusterModel.load(path, fingerprint="otro")
+
+
+def test_warm_start_keeps_centroids_and_counts(tmp_path):
+    points, _ = _blobs()
+    model = ClusterModel(4, batch_size=128).fit(points)
+    labels = model.predict(points)
+    loaded = ClusterModel.load(model.save(tmp_path / "clusters.npz"), batch_size=64)
+    
+    # Datos nuevos de los mismos grupos: los centroides casi no se mueven
+    rng = np.random.default_rng(1)
+    new_points = points[::10] + 0.3 * rng.standard_normal(points[::10].shape).astype(np.float32)
+    before = loaded.centroids.copy()
+    loaded.partial_fit(new_points)
+    
+    assert loaded.batch_size == 64
+    assert loaded.counts.sum() == model.counts.sum() + len(new_points)
+    assert np.abs(loaded.centroids - before).max() < 1.0
+    np.testing.assert_array_equal(loaded.predict(points), labels)
+
+
+# ----------------------------------------------------------------------------
+# ModeloPortable: clusters persistidos
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    model = load_model(str(ROOT / "model"))
+    monkeypatch.setattr(model, "clusters_path", lambda name: tmp_path / "clusters" / f"{name}.npz")
+    return model
+
+
+TEXTS = [
+    "python django backend developer", "python flask backend engineer",
+    "react frontend javascript developer", "react vue frontend engineer",
+    "kubernetes devops aws engineer", "kubernetes docker devops sre",
+]
+
+
+def test_cluster_groups_every_text_once(model):
+    clusters = model.cluster(TEXTS, n_clusters=3)
+    assert sorted(clusters) == [0, 1, 2]
+    assert sorted(text for members in clusters.values() for text in members) == sorted(TEXTS)
+
+
+def test_cluster_store_persists_and_assigns_new_texts(model, tmp_path):
+    from candidate_index import CandidateIndex
+    
+    index = CandidateIndex(model)
+    index.add([f"T{i}" for i in range(len(TEXTS))], TEXTS)
+    index.save(str(tmp_path / "cvs"))
+    
+    encoded = []
+    encode = model.model.encode
+    model.model.encode = lambda batch, **kwargs: encoded.extend(batch) or encode(batch, **kwargs)
+    
+    stored = model.cluster_store(str(tmp_path / "cvs"), n_clusters=3, batch_size=4)
+    assert encoded == []                        # el almacén no se re-codifica
+    assert (tmp_path / "clusters" / "cvs.npz").exists()
+    
+    labels = model.assign_clusters(TEXTS, "cvs")
+    np.testing.assert_array_equal(labels, stored.predict(index.embeddings))
+    assert encoded == TEXTS
+    
+    # Warm start: mismos centroides de partida, conteos previos atenuados
+    again = model.cluster_store(str(tmp_path / "cvs"), n_clusters=3, batch_size=4, epochs=1, history_weight=0.5)
+    assert again.counts.sum() == pytest.approx(0.5 * stored.counts.sum() + len(TEXTS))
+    
+    with pytest.raises(FileNotFoundError):
+        model.assign_clusters("python", "otro")
+
+
+# ----------------------------------------------------------------------------
+# Selección automática de k
+# ----------------------------------------------------------------------------
+
+def _silhouette_brute_force(points, labels):
+    """Definición directa (clusters de un elemento = 0)"""
+    distances = np.linalg.norm(points[:, None] - points[None, :], axis=2)
+    scores = []
+    for i, label in enumerate(labels):
+        own = labels == label
+        if own.sum() == 1:
+            scores.append(0.0)
+            continue
+        a = distances[i, own].sum() / (own.sum() - 1)
+        b = min(distances[i, labels == other].mean() for other in set(labels.tolist()) - {label})
+        scores.append((b - a) / max(a, b))
+    return float(np.mean(scores))
+
+
+def _davies_bouldin_brute_force(points, labels):
+    clusters = sorted(set(labels.tolist()))
+    centroids = [points[labels == c].mean(axis=0) for c in clusters]
+    scatter = [np.linalg.norm(points[labels == c] - centroids[i], axis=1).mean() for i, c in enumerate(clusters)]
+    return float(np.mean([
+        max((scatter[i] + scatter[j]) / np.linalg.norm(centroids[i] - centroids[j])
+            for j in range(len(clusters)) if j != i)
+        for i in range(len(clusters))
+    ]))
+
+
+def test_silhouette_matches_brute_force():
+    rng = np.random.default_rng(0)
+    points = rng.standard_normal((60, 5)).astype(np.float32)
+    labels = rng.integers(0, 4, size=60)
+    labels[7] = 4                                  # cluster de un solo punto
+    expected = _silhouette_brute_force(points, labels)
+    
+    assert silhouette_score(points, labels) == pytest.approx(expected, abs=1e-5)
+    assert silhouette_score(points, labels, block_size=7) == pytest.approx(expected, abs=1e-5)
+    distances = pairwise_distances(points, block_size=9)
+    assert silhouette_score(points, labels, distances=distances) == pytest.approx(expected, abs=1e-5)
+    assert silhouette_score(points, np.zeros(60, dtype=np.int64)) == 0.0
+
+
+def test_davies_bouldin_matches_brute_force():
+    rng = np.random.default_rng(1)
+    points = rng.standard_normal((50, 4)).astype(np.float32)
+    labels = rng.integers(0, 3, size=50) * 2       # etiquetas no contiguas
+    assert davies_bouldin_score(points, labels) == pytest.approx(
+        _davies_bouldin_brute_force(points, labels), rel=1e-4
+    )
+
+
+@pytest.mark.parametrize("metric", ["silhouette", "davies_bouldin"])
+def test_select_n_clusters_finds_the_blobs(metric):
+    points, _ = _blobs(n_per_cluster=300, k=5)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    best, scores = select_n_clusters(points, range(2, 9), metric=metric, sample_size=500)
+    assert best == 5
+    assert sorted(scores) == list(range(2, 9))
+
+
+def test_select_n_clusters_validates_arguments():
+    points, _ = _blobs(n_per_cluster=5, k=2)
+    with pytest.raises(ValueError):
+        select_n_clusters(points, metric="inertia")
+    with pytest.raises(ValueError):
+        select_n_clusters(points, k_values=[10, 20])
+
+
+def test_cluster_auto_encodes_once(model):
+    encoded = []
+    encode = model.model.encode
+    model.model.encode = lambda batch, **kwargs: encoded.extend(batch) or encode(batch, **kwargs)
+    
+    result = model.cluster_auto(TEXTS, max_clusters=4)
+    assert encoded == TEXTS
+    assert result["n_clusters"] in result["scores"]
+    assert sum(len(members) for members in result["clusters"].values()) == len(TEXTS)
+    assert model.cluster(TEXTS[:2], n_clusters="auto") == {0: TEXTS[:2]}
+
+
+# ----------------------------------------------------------------------------
+# Resumen de clusters
+# ----------------------------------------------------------------------------
+
+def test_summarize_clusters_matches_brute_force():
+    points, labels = _blobs(n_per_cluster=40, k=3)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    summaries = summarize_clusters(points, labels, n_members=4, medoid_candidates=1000)
+    
+    assert sorted(summaries) == [0, 1, 2]
+    for cluster, summary in summaries.items():
+        members = np.flatnonzero(labels == cluster)
+        vectors = points[members]
+        assert summary["size"] == 40
+        assert np.linalg.norm(summary["centroid"]) == pytest.approx(1.0, abs=1e-5)
+        
+        distances = np.linalg.norm(vectors[:, None] - vectors[None, :], axis=2).sum(axis=1)
+        assert summary["medoid"] == members[distances.argmin()]
+        closest = members[np.argsort(-(vectors @ summary["centroid"]), kind="stable")[:4]]
+        assert summary["representatives"] == closest.tolist()
+        assert summary["top_terms"] == []
+
+
+def test_summarize_clusters_top_terms_are_distinctive():
+    texts = TEXTS * 2
+    labels = np.array([0, 0, 1, 1, 2, 2] * 2)
+    points = np.eye(3, dtype=np.float32)[labels]
+    counts, vocabulary = count_matrix(texts, binary=True)
+    summaries = summarize_clusters(points, labels, counts, vocabulary, n_terms=3)
+    
+    terms = {cluster: [term for term, _ in s["top_terms"]] for cluster, s in summaries.items()}
+    assert "python" in terms[0] and "react" in terms[1] and "kubernetes" in terms[2]
+    # "engineer" aparece en todos los clusters: no es distintivo
+    assert all("engineer" not in top for top in terms.values())
+    scores = [score for _, score in summaries[0]["top_terms"]]
+    assert scores == sorted(scores, reverse=True) and scores[-1] > 0
+
+
+def test_cluster_summary_maps_rows_to_texts(model):
+    encoded = []
+    encode = model.model.encode
+    model.model.encode = lambda batch, **kwargs: encoded.extend(batch) or encode(batch, **kwargs)
+    
+    result = model.cluster_summary(TEXTS, n_clusters=3, n_members=2, n_terms=4)
+    assert encoded == TEXTS
+    for cluster, summary in result["summaries"].items():
+        members = result["clusters"][cluster]
+        assert summary["size"] == len(members)
+        assert summary["medoid"] in members
+        assert set(summary["representatives"]) <= set(members)
+        assert len(summary["top_terms"]) <= 4
+    
+    auto = model.cluster_summary(TEXTS, n_clusters="auto", max_clusters=4)
+    assert set(auto["summaries"]) == set(auto["clusters"]) and "scores" in auto
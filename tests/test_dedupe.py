@@ -0,0 +1,115 @@
+"""
+LSHDeduplicator: grupos iguales a comparar todos los pares, consultas sin
+insertar, ids propios e ingesta incremental desde ModeloPortable.dedupe
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from dedupe import LSHDeduplicator
+from loader import load_model
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DIMENSION = 48
+
+
+def _near_duplicates(n_groups=60, copies=3, singles=300, noise=0.05, seed=0):
+    """Grupos de copias con ruido chico más vectores sin duplicado"""
+    rng = np.random.default_rng(seed)
+    bases = rng.standard_normal((n_groups, DIMENSION))
+    bases /= np.linalg.norm(bases, axis=1, keepdims=True)
+    copies = np.repeat(bases, copies, axis=0)
+    copies += noise * rng.standard_normal(copies.shape) / np.sqrt(DIMENSION)
+    vectors = np.vstack([copies, rng.standard_normal((singles, DIMENSION))])
+    vectors = vectors[rng.permutation(len(vectors))]
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _exact_groups(vectors, threshold):
+    """Componentes conexas de todos los pares con coseno >= threshold"""
+    similar = vectors @ vectors.T >= threshold
+    parent = list(range(len(vectors)))
+    
+    def find(row):
+        while parent[row] != row:
+            row = parent[row]
+        return row
+    
+    for a, b in zip(*np.nonzero(np.triu(similar, k=1))):
+        parent[max(find(a), find(b))] = min(find(a), find(b))
+    members = {}
+    for row in range(len(vectors)):
+        members.setdefault(find(row), []).append(row)
+    return sorted(group for group in members.values() if len(group) > 1)
+
+
+def test_groups_match_all_pairs_comparison():
+    vectors = _near_duplicates()
+    deduplicator = LSHDeduplicator(DIMENSION, threshold=0.95)
+    deduplicator.add(vectors)
+    
+    assert sorted(deduplicator.groups()) == _exact_groups(vectors, 0.95)
+    stats = deduplicator.get_stats()
+    assert stats["size"] == len(vectors)
+    assert stats["comparison_ratio"] < 0.1
+
+
+def test_streaming_batches_equal_one_batch():
+    vectors = _near_duplicates(seed=1)
+    once = LSHDeduplicator(DIMENSION)
+    once.add(vectors)
+    
+    streamed = LSHDeduplicator(DIMENSION, initial_capacity=1)
+    matches = []
+    for start in range(0, len(vectors), 37):
+        matches += streamed.add(vectors[start:start + 37])
+    
+    assert streamed.groups() == once.groups()
+    # La primera fila de cada grupo es nueva; las demás apuntan al grupo
+    first = {group[0] for group in streamed.groups()}
+    in_groups = {row for group in streamed.groups() for row in group}
+    assert {row for row, match in enumerate(matches) if match is None} >= first
+    assert {row for row, match in enumerate(matches) if match is not None} == in_groups - first
+
+
+def test_query_does_not_insert_and_uses_custom_ids():
+    vectors = _near_duplicates(n_groups=5, copies=2, singles=20, seed=2)
+    ids = [f"CV-{row}" for row in range(len(vectors))]
+    deduplicator = LSHDeduplicator(DIMENSION)
+    deduplicator.add(vectors, ids)
+    
+    found = deduplicator.query(vectors[0])
+    assert found[0] == (ids[0], pytest.approx(1.0, abs=1e-5))
+    assert [similarity for _, similarity in found] == sorted((s for _, s in found), reverse=True)
+    assert all(similarity >= 0.95 for _, similarity in found)
+    assert len(deduplicator) == len(vectors)
+    assert all(item in ids for group in deduplicator.groups() for item in group)
+    
+    with pytest.raises(ValueError):
+        deduplicator.add(vectors[:2], ids[:1])
+    with pytest.raises(ValueError):
+        LSHDeduplicator(DIMENSION, n_bits=64)
+
+
+def test_model_dedupe_is_incremental():
+    model = load_model(str(ROOT / "model"))
+    deduplicator = model.dedupe(
+        ["python developer", "react frontend engineer", "kubernetes devops"],
+        ids=["a", "b", "c"],
+        batch_size=2,
+    )
+    assert deduplicator.groups() == []
+    
+    # Los textos nuevos se comparan con lo insertado antes
+    encoded = []
+    encode = model.model.encode
+    model.model.encode = lambda batch, **kwargs: encoded.extend(batch) or encode(batch, **kwargs)
+    model.dedupe(["developer python", "data scientist"], deduplicator=deduplicator)
+    
+    assert encoded == ["developer python", "data scientist"]
+    assert deduplicator.groups() == [["a", 3]]
+    with pytest.raises(ValueError):
+        model.dedupe(["x"], ids=[1, 2])
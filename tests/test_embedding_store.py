@@ -0,0 +1,149 @@
+"""
+Almacén de embeddings: round-trip, reanudación de EmbeddingWriter y
+apertura del índice con memmap
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from embedding_store import (
+    IDS_FILE,
+    MATRIX_FILE,
+    EmbeddingWriter,
+    load_embeddings,
+    read_header,
+    save_embeddings,
+)
+from loader import load_model, normalize_embeddings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_save_load_round_trip(tmp_path, dtype):
+    vectors = _vectors(20)
+    ids = [f"C{i}" for i in range(20)]
+    save_embeddings(tmp_path, ids, vectors, dtype=dtype, fingerprint="abc")
+    
+    for mmap in (True, False):
+        loaded_ids, matrix, header = load_embeddings(tmp_path, mmap=mmap)
+        assert loaded_ids == ids
+        assert header["model_fingerprint"] == "abc"
+        np.testing.assert_allclose(matrix, vectors.astype(dtype))
+
+
+def test_ids_with_newlines_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        save_embeddings(tmp_path, ["a\nb"], _vectors(1))
+
+
+def test_candidate_index_reopens_with_memmap(tmp_path):
+    from candidate_index import CandidateIndex
+    from loader import load_model
+    
+    model = load_model(str(ROOT / "model"))
+    index = CandidateIndex(model)
+    index.add(["a", "b", "c"], ["python developer", "react frontend", "data scientist"])
+    index.save(str(tmp_path / "store"))
+    
+    loaded = CandidateIndex.load(model, str(tmp_path / "store"))
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert loaded.ids == index.ids
+    np.testing.assert_array_equal(loaded.embeddings, index.embeddings)
+    assert loaded.search("react frontend", top_k=1)[0]["id"] == "b"
+    
+    # La primera modificación copia la matriz a RAM; el archivo no cambia
+    loaded.remove("a")
+    assert not isinstance(loaded.embeddings, np.memmap)
+    assert load_embeddings(tmp_path / "store")[0] == ["a", "b", "c"]
+
+
+def test_empty_store_reopens_and_grows(tmp_path):
+    from candidate_index import CandidateIndex
+    from loader import load_model
+    
+    model = load_model(str(ROOT / "model"))
+    CandidateIndex(model).save(str(tmp_path / "store"))
+    
+    loaded = CandidateIndex.load(model, str(tmp_path / "store"))
+    assert len(loaded) == 0
+    loaded.add(["a", "b"], ["python developer", "react frontend"])
+    assert loaded.search("react frontend", top_k=1)[0]["id"] == "b"
+
+
+def test_writer_resumes_from_last_checkpoint(tmp_path):
+    vectors = _vectors(30)
+    ids = [f"C{i}" for i in range(30)]
+    
+    writer = EmbeddingWriter(tmp_path, dimension=8)
+    writer.append(ids[:10], vectors[:10])
+    writer.append(ids[10:20], vectors[10:20])
+    writer.close(complete=False)
+    
+    # Simular un chunk escrito a medias después del último header
+    with open(tmp_path / MATRIX_FILE, "ab") as f:
+        vectors[20:25].tofile(f)
+    with open(tmp_path / IDS_FILE, "a", encoding="utf-8") as f:
+        f.write("C20\nC21\nC2")
+    
+    with EmbeddingWriter(tmp_path, dimension=8) as writer:
+        assert writer.count == 20
+        writer.append(ids[20:], vectors[20:])
+    
+    loaded_ids, matrix, header = load_embeddings(tmp_path, mmap=False)
+    assert header["complete"]
+    assert loaded_ids == ids
+    np.testing.assert_array_equal(matrix, vectors)
+
+
+def test_writer_refuses_to_resume_a_different_store(tmp_path):
+    EmbeddingWriter(tmp_path, dimension=8, fingerprint="a").close()
+    
+    with pytest.raises(ValueError):
+        EmbeddingWriter(tmp_path, dimension=8, fingerprint="b")
+    with pytest.raises(ValueError):
+        EmbeddingWriter(tmp_path, dimension=8, fingerprint="a", dtype="float16")
+
+
+def test_writer_without_resume_starts_over(tmp_path):
+    with EmbeddingWriter(tmp_path, dimension=8) as writer:
+        writer.append(["a", "b"], _vectors(2))
+    
+    with EmbeddingWriter(tmp_path, dimension=8, resume=False) as writer:
+        assert writer.count == 0
+        writer.append(["c"], _vectors(1, seed=1))
+    
+    assert read_header(tmp_path)["count"] == 1
+    assert load_embeddings(tmp_path)[0] == ["c"]
+
+
+def test_encode_file_resumes_without_re_encoding(tmp_path):
+    model = load_model(str(ROOT / "model"))
+    records = [{"id": f"C{i}", "profile": f"python developer {i}"} for i in range(7)]
+    path = tmp_path / "candidates.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    texts = [r["profile"] for r in records]
+    
+    # Un primer intento que se cortó después del primer chunk
+    store = tmp_path / "store"
+    writer = EmbeddingWriter(store, model.model.get_sentence_embedding_dimension(), fingerprint=model.fingerprint)
+    writer.append(["C0", "C1", "C2"], normalize_embeddings(model.model.encode(texts[:3])))
+    writer.close(complete=False)
+    
+    encoded = []
+    encode = model.model.encode
+    model.model.encode = lambda batch, **kwargs: encoded.extend(batch) or encode(batch, **kwargs)
+    model.encode_file(str(path), str(store), chunk_size=3, progress=False)
+    
+    assert encoded == texts[3:]
+    ids, matrix, header = load_embeddings(store, mmap=False)
+    assert header["complete"]
+    assert ids == [r["id"] for r in records]
+    np.testing.assert_allclose(matrix, normalize_embeddings(encode(texts)), atol=1e-6)
@@ -0,0 +1,163 @@
+"""
+BM25Index contra la fórmula calculada a mano, altas / bajas incrementales,
+fusión de rankings (RRF y ponderada) y modos léxico / híbrido de
+CandidateIndex
+"""
+
+import math
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from candidate_index import CandidateIndex
+from lexical_index import BM25Index, count_matrix, reciprocal_rank_fusion, tokenize, weighted_fusion
+from loader import load_model
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DOCS = [
+    "Senior Python developer, Django and PostgreSQL.",
+    "Frontend engineer: React, node.js and TypeScript",
+    "C++ and C# game developer",
+    "DevOps engineer with Kubernetes, AWS and python 3.11",
+    "Python python python data engineer",
+    "",
+]
+
+
+def _bm25(docs, query, k1=1.5, b=0.75):
+    """BM25 por fuerza bruta sobre los documentos tokenizados"""
+    tokenized = [Counter(tokenize(doc)) for doc in docs]
+    avg = sum(sum(t.values()) for t in tokenized) / len(docs)
+    scores = np.zeros(len(docs))
+    for term in set(tokenize(query)):
+        df = sum(term in t for t in tokenized)
+        if not df:
+            continue
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for row, terms in enumerate(tokenized):
+            tf = terms[term]
+            length = sum(terms.values())
+            scores[row] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg))
+    return scores
+
+
+def _index(docs):
+    index = BM25Index()
+    for doc in docs:
+        index.add(doc)
+    return index
+
+
+def test_tokenize_keeps_versions_and_language_names():
+    assert tokenize("C++, C# y node.js; Python 3.11.") == ["c++", "c#", "y", "node.js", "python", "3.11"]
+
+
+@pytest.mark.parametrize("query", ["python", "python engineer", "c++ developer", "kubernetes aws", "cobol"])
+def test_scores_match_the_bm25_formula(query):
+    np.testing.assert_allclose(_index(DOCS).scores(query), _bm25(DOCS, query), rtol=1e-5)
+
+
+def test_search_returns_only_matching_rows():
+    index = _index(DOCS)
+    rows, scores = index.search("python", top_k=None)
+    assert set(rows.tolist()) == {0, 3, 4}
+    assert rows[0] == 4                    # mayor frecuencia del término
+    assert np.all(np.diff(scores) <= 0)
+    
+    rows, _ = index.search("python", top_k=None, rows=np.array([1, 3]))
+    assert rows.tolist() == [3]
+    assert len(index.search("cobol")[0]) == 0
+
+
+def test_incremental_changes_equal_a_rebuild():
+    index = _index(DOCS)
+    docs = list(DOCS)
+    
+    index.update(1, "React developer with python")
+    docs[1] = "React developer with python"
+    index.remove(0)                        # la última fila pasa a la 0
+    docs[0] = docs.pop()
+    index.remove(len(docs) - 1)
+    docs.pop()
+    index.add("golang python engineer")
+    docs.append("golang python engineer")
+    
+    assert len(index) == len(docs)
+    for query in ("python", "react engineer", "django", "c++"):
+        np.testing.assert_allclose(index.scores(query), _index(docs).scores(query), rtol=1e-5)
+        np.testing.assert_allclose(index.scores(query), _bm25(docs, query), rtol=1e-5)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([np.array([3, 1, 2]), np.array([1, 4])], k=60)
+    assert fused == pytest.approx({3: 1 / 61, 1: 1 / 62 + 1 / 61, 2: 1 / 63, 4: 1 / 62})
+    assert max(fused, key=fused.get) == 1   # en ambos rankings
+
+
+def test_weighted_fusion_normalizes_bm25():
+    dense = np.array([0.9, 0.5, 0.1], dtype=np.float32)
+    lexical = np.array([0.0, 4.0, 8.0], dtype=np.float32)
+    np.testing.assert_allclose(weighted_fusion(dense, lexical, alpha=0.5), [0.45, 0.5, 0.55], rtol=1e-6)
+    np.testing.assert_allclose(weighted_fusion(dense, np.zeros(3), alpha=0.5), dense * 0.5)
+
+
+def test_count_matrix():
+    matrix, vocabulary = count_matrix(["python python django", "react python"])
+    dense = matrix.toarray()
+    assert dense[0, vocabulary.index("python")] == 2
+    assert dense[1, vocabulary.index("react")] == 1
+    binary, _ = count_matrix(["python python django", "react python"], binary=True)
+    assert binary.toarray().max() == 1
+
+
+# ----------------------------------------------------------------------------
+# CandidateIndex: modos de búsqueda
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def index():
+    index = CandidateIndex(load_model(str(ROOT / "model")))
+    index.add([f"C{i}" for i in range(len(DOCS) - 1)], DOCS[:-1])
+    index.enable_lexical()
+    return index
+
+
+def test_lexical_mode_ranks_by_bm25(index):
+    results = index.search("kubernetes", top_k=3, mode="lexical")
+    assert [r["id"] for r in results] == ["C3"]
+
+
+@pytest.mark.parametrize("fusion", ["rrf", "weighted"])
+def test_hybrid_mode_puts_exact_token_matches_first(index, fusion):
+    results = index.search("kubernetes aws", top_k=5, mode="hybrid", fusion=fusion)
+    assert results[0]["id"] == "C3"
+    assert len({r["id"] for r in results}) == len(results)
+
+
+def test_lexical_first_scores_only_bm25_hits(index):
+    results = index.search("python", top_k=None, mode="lexical_first")
+    assert {r["id"] for r in results} == {"C0", "C3", "C4"}
+    # Sin coincidencias léxicas cae a la búsqueda densa
+    assert len(index.search("cobol", top_k=2, mode="lexical_first")) == 2
+
+
+def test_lexical_index_follows_removals(index):
+    index.remove("C3")
+    assert index.search("kubernetes", mode="lexical") == []
+    index.add(["K"], ["kubernetes operator"])
+    assert [r["id"] for r in index.search("kubernetes", mode="lexical")] == ["K"]
+
+
+def test_unknown_mode_or_missing_lexical_index(index):
+    with pytest.raises(ValueError):
+        index.search("python", mode="sparse")
+    with pytest.raises(ValueError):
+        index.search("python", mode="hybrid", fusion="max")
+    
+    plain = CandidateIndex(index.model)
+    plain.add(["a"], ["python"])
+    with pytest.raises(RuntimeError):
+        plain.search("python", mode="lexical")
@@ -0,0 +1,155 @@
+"""
+ModeloPortable: búsqueda con query y candidatos codificados en una pasada;
+encode_corpus entrega los chunks en el orden de entrada
+"""
+
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from loader import blocked_top_k, load_model, normalize_embeddings, top_k_indices
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CANDIDATES = [
+    "python backend developer django",
+    "frontend react javascript developer",
+    "machine learning engineer python tensorflow",
+    "java spring backend engineer",
+]
+
+
+@pytest.fixture
+def model():
+    return load_model(str(ROOT / "model"))
+
+
+def _count_forward(model) -> list:
+    """Registrar cada llamada al modelo subyacente (lista de textos)"""
+    calls = []
+    encode = model.model.encode
+    
+    def counting_encode(texts, *args, **kwargs):
+        calls.append(list(texts))
+        return encode(texts, *args, **kwargs)
+    
+    model.model.encode = counting_encode
+    return calls
+
+
+def _cosine_ranking(model, query, candidates):
+    query_emb = model.model.encode([query])[0]
+    matrix = model.model.encode(candidates)
+    scores = matrix @ query_emb / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_emb))
+    return [candidates[i] for i in np.argsort(-scores, kind="stable")], np.sort(scores)[::-1]
+
+
+def test_search_encodes_query_and_candidates_in_one_pass(model):
+    calls = _count_forward(model)
+    results = model.search("python backend engineer", CANDIDATES, top_k=3)
+    
+    assert calls == [["python backend engineer"] + CANDIDATES]
+    assert len(results) == 3
+    
+    order, scores = _cosine_ranking(model, "python backend engineer", CANDIDATES)
+    assert [r["candidate"] for r in results] == order[:3]
+    np.testing.assert_allclose([r["similarity"] for r in results], scores[:3], rtol=1e-5)
+
+
+@pytest.mark.parametrize("top_k", [None, 0, 1, 3, 10])
+def test_top_k_indices_matches_full_sort(top_k):
+    scores = np.random.default_rng(0).standard_normal(10).astype(np.float32)
+    expected = np.argsort(-scores, kind="stable")
+    expected = expected if top_k is None else expected[:top_k]
+    assert top_k_indices(scores, top_k).tolist() == expected.tolist()
+
+
+def test_top_k_indices_keeps_ties_in_index_order():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.1], dtype=np.float32)
+    assert top_k_indices(scores).tolist() == [1, 3, 0, 2, 4]
+
+
+def test_search_top_k_none_or_zero_returns_everything(model):
+    for top_k in (None, 0):
+        results = model.search("react developer", CANDIDATES, top_k=top_k)
+        assert sorted(r["candidate"] for r in results) == sorted(CANDIDATES)
+        similarities = [r["similarity"] for r in results]
+        assert similarities == sorted(similarities, reverse=True)
+
+
+def test_similarity_is_cosine(model):
+    a, b = model.model.encode(["python developer", "python engineer"])
+    expected = a @ b / (np.linalg.norm(a) * np.linalg.norm(b))
+    assert model.similarity("python developer", "python engineer") == pytest.approx(expected, rel=1e-5)
+
+
+@pytest.mark.parametrize("top_k", [None, 2, 7])
+def test_blocked_top_k_matches_full_score_matrix(top_k):
+    rng = np.random.default_rng(1)
+    queries = normalize_embeddings(rng.standard_normal((9, 16)).astype(np.float32))
+    corpus = normalize_embeddings(rng.standard_normal((50, 16)).astype(np.float32))
+    
+    # Bloques pequeños para forzar varias fusiones por query
+    indices, scores = blocked_top_k(queries, corpus, top_k, query_block=4, corpus_block=8)
+    
+    full = queries @ corpus.T
+    k = len(corpus) if top_k is None else top_k
+    assert indices.shape == scores.shape == (len(queries), k)
+    for i in range(len(queries)):
+        assert indices[i].tolist() == top_k_indices(full[i], k).tolist()
+        np.testing.assert_allclose(scores[i], full[i][indices[i]], rtol=1e-5)
+
+
+def test_search_many_equals_one_search_per_query(model):
+    queries = ["python backend", "react frontend", "machine learning"]
+    calls = _count_forward(model)
+    batched = model.search_many(queries, CANDIDATES, top_k=2, corpus_block=3)
+    
+    assert calls == [queries + CANDIDATES]
+    for query, results in zip(queries, batched):
+        single = model.search(query, CANDIDATES, top_k=2)
+        assert [r["candidate"] for r in results] == [r["candidate"] for r in single]
+        np.testing.assert_allclose(
+            [r["similarity"] for r in results], [r["similarity"] for r in single], rtol=1e-5
+        )
+
+
+def test_encode_corpus_streams_chunks_in_order(model):
+    texts = [f"developer number {i}" for i in range(25)]
+    consumed = []
+    
+    def lazy_texts():
+        for text in texts:
+            consumed.append(text)
+            yield text
+    
+    done = []
+    chunks = model.encode_corpus(lazy_texts(), chunk_size=10, progress=done.append)
+    first = next(chunks)
+    assert len(first) == 10 and len(consumed) == 10   # no lee el corpus entero
+    
+    rest = list(chunks)
+    assert [len(chunk) for chunk in rest] == [10, 5]
+    assert done == [10, 20, 25]
+    np.testing.assert_allclose(np.vstack([first] + rest), model.model.encode(texts), atol=1e-6)
+
+
+def test_worker_results_come_back_in_input_order(monkeypatch):
+    # Mismo reparto que con procesos, pero con threads y un modelo falso
+    from multiprocessing.pool import ThreadPool
+    
+    import loader
+    from loader import ModeloPortable, iter_chunks
+    
+    class SlowFirstModel:
+        def encode(self, texts, **kwargs):
+            if texts[0] == 0:
+                time.sleep(0.05)   # el primer chunk termina el último
+            return np.array(texts, dtype=np.float32)[:, None]
+    
+    monkeypatch.setattr(loader, "_WORKER_MODEL", SlowFirstModel())
+    with ThreadPool(3) as pool:
+        results = ModeloPortable._ordered_results(pool, iter_chunks(range(20), 4), max_in_flight=3)
+        assert np.vstack(list(results)).ravel().tolist() == list(range(20))
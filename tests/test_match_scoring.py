@@ -0,0 +1,75 @@
+"""
+El scoring vectorizado debe dar lo mismo que el cálculo por pares original
+(agents_advanced.calculate_candidate_job_match antes de vectorizar)
+"""
+
+import numpy as np
+import pytest
+
+from match_scoring import SkillVocabulary, normalize_skill, score_matches
+
+
+def _pairwise_skills_match(candidate_skills, required_skills):
+    """Fórmula original: intersección de conjuntos / largo de la lista requerida"""
+    return len(set(candidate_skills) & set(required_skills)) / len(required_skills)
+
+
+def _pairwise_experience_match(years, years_required):
+    return 1.0 if years >= years_required else years / years_required
+
+
+JOBS = [
+    (["Python", "Backend", "APIs"], 5),
+    (["Python", "python", "ML"], 3),         # mayúsculas distintas = skills distintos
+    (["React", "React", "CSS"], 2),           # repetido: cuenta en el denominador
+]
+CANDIDATES = [
+    (["Python", "APIs", "Docker"], 6),
+    (["python", "ML", "ML"], 2),              # repetido: cuenta una vez
+    (["react", "CSS"], 0),
+    ([], 10),
+]
+
+
+def _score(vocabulary=None, job_required=True):
+    vocabulary = SkillVocabulary() if vocabulary is None else vocabulary
+    rng = np.random.default_rng(0)
+    job_embeddings = rng.standard_normal((len(JOBS), 8)).astype(np.float32)
+    candidate_embeddings = rng.standard_normal((len(CANDIDATES), 8)).astype(np.float32)
+    job_skills = vocabulary.multi_hot(skills for skills, _ in JOBS)
+    candidate_skills = vocabulary.multi_hot(skills for skills, _ in CANDIDATES)
+    return score_matches(
+        job_embeddings, job_skills, [years for _, years in JOBS],
+        candidate_embeddings, candidate_skills, [years for _, years in CANDIDATES],
+        job_required=[len(skills) for skills, _ in JOBS] if job_required else None
+    )
+
+
+def test_skills_and_experience_match_pairwise_formula():
+    scores = _score()
+    for j, (required, years_required) in enumerate(JOBS):
+        for i, (skills, years) in enumerate(CANDIDATES):
+            assert scores["skills_match"][j, i] == pytest.approx(_pairwise_skills_match(skills, required))
+            assert scores["experience_match"][j, i] == pytest.approx(_pairwise_experience_match(years, years_required))
+
+
+def test_overall_score_weights():
+    scores = _score()
+    expected = (
+        0.5 * scores["profile_similarity"]
+        + 0.3 * scores["skills_match"]
+        + 0.2 * scores["experience_match"]
+    )
+    np.testing.assert_allclose(scores["overall_score"], expected, rtol=1e-6)
+
+
+def test_skill_matching_is_case_sensitive_by_default():
+    scores = _score()
+    # "react" (candidato) no coincide con "React" (job)
+    assert scores["skills_match"][2, 2] == pytest.approx(1 / 3)
+
+
+def test_normalized_vocabulary_is_opt_in():
+    scores = _score(SkillVocabulary(normalize=normalize_skill), job_required=False)
+    # Con normalización y sin job_required: {react, css} / 2 skills distintos
+    assert scores["skills_match"][2, 2] == pytest.approx(1.0)
@@ -0,0 +1,57 @@
+"""
+ColumnStore: condiciones numéricas y categóricas evaluadas como máscaras
+"""
+
+import math
+
+import pytest
+
+from metadata_filter import ColumnStore, parse_salary_range
+
+
+RECORDS = [
+    {"years": 5, "location": "Boston"},
+    {"years": 2, "location": "austin "},
+    {"years": None, "location": "Remote"},
+    {"years": 10, "location": "Boston"},
+]
+
+
+@pytest.fixture
+def store():
+    return ColumnStore(
+        RECORDS,
+        numeric={"years": lambda record: record["years"]},
+        categorical={"location": lambda record: record["location"]},
+    )
+
+
+def test_numeric_operators(store):
+    assert store.rows([("years", ">=", 5)]).tolist() == [0, 3]
+    assert store.rows([("years", "<", 5)]).tolist() == [1]
+    assert store.rows([("years", "in", [2, 10])]).tolist() == [1, 3]
+
+
+def test_categorical_is_case_and_space_insensitive(store):
+    assert store.rows([("location", "==", "boston")]).tolist() == [0, 3]
+    assert store.rows([("location", "in", ["Austin", "Nowhere"])]).tolist() == [1]
+    assert store.rows([("location", "not in", ["Boston"])]).tolist() == [1, 2]
+
+
+def test_conditions_are_combined_with_and(store):
+    conditions = [("location", "==", "Boston"), ("years", ">", 5)]
+    assert store.rows(conditions).tolist() == [3]
+    assert store.mask([]).all()
+
+
+def test_unknown_field_or_operator(store):
+    with pytest.raises(ValueError):
+        store.mask([("salary", ">", 1)])
+    with pytest.raises(ValueError):
+        store.mask([("location", ">", "Boston")])
+
+
+def test_parse_salary_range():
+    assert parse_salary_range("$120k-$150k") == (120000.0, 150000.0)
+    assert parse_salary_range("$90,000") == (90000.0, 90000.0)
+    assert all(math.isnan(v) for v in parse_salary_range("a convenir"))
@@ -0,0 +1,264 @@
+"""
+Índices cuantizados: recall de int8 / binary con re-scoring float32,
+persistencia de los códigos, carga de almacenes con códigos inválidos y
+entrenamiento de PQ solo con suficientes vectores
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from candidate_index import CandidateIndex, _codes_path
+from loader import load_model
+from quantization import BinaryIndex, Int8Index, PQCodebook, PQIndex
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DIMENSION = 64
+K = 10
+
+
+def _corpus(n=2000, n_groups=40, dimension=DIMENSION, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_groups, dimension))
+    points = centers[rng.integers(n_groups, size=n)] + 0.5 * rng.standard_normal((n, dimension))
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _queries(vectors, n=40, seed=1):
+    """Consultas cerca de puntos del corpus (como un CV parecido a otro)"""
+    rng = np.random.default_rng(seed)
+    queries = vectors[:n] + 0.3 * rng.standard_normal((n, vectors.shape[1])) / np.sqrt(vectors.shape[1])
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _recall(index, vectors, queries, rescore=0):
+    """recall@K frente a la búsqueda exacta (etiqueta = fila)"""
+    hits = 0
+    for query in queries:
+        exact = np.argsort(-(vectors @ query), kind="stable")[:K]
+        labels, _ = index.search(query, K * max(1, rescore))
+        if rescore:
+            labels = labels[np.argsort(-(vectors[labels] @ query), kind="stable")[:K]]
+        hits += len(set(labels.tolist()) & set(exact.tolist()))
+    return hits / (K * len(queries))
+
+
+@pytest.mark.parametrize("cls, recall, rescored", [(Int8Index, 0.9, 0.99), (BinaryIndex, 0.3, 0.85)])
+def test_recall_with_and_without_rescore(cls, recall, rescored):
+    vectors = _corpus()
+    queries = _queries(vectors)
+    index = cls(DIMENSION)
+    index.build(vectors, np.arange(len(vectors)))
+    
+    assert index.nbytes < vectors.nbytes / 3
+    assert _recall(index, vectors, queries) >= recall
+    assert _recall(index, vectors, queries, rescore=4) >= rescored
+
+
+def test_int8_scores_approximate_the_dot_product():
+    vectors = _corpus(n=300)
+    index = Int8Index(DIMENSION)
+    index.build(vectors, np.arange(300))
+    query = _corpus(n=1, seed=2)[0]
+    np.testing.assert_allclose(index.scores(query), vectors @ query, atol=0.02)
+
+
+@pytest.mark.parametrize("cls", [Int8Index, BinaryIndex])
+def test_save_load_round_trip(tmp_path, cls):
+    vectors = _corpus(n=200)
+    labels = np.arange(200, dtype=np.int64) * 3
+    index = cls(DIMENSION)
+    index.build(vectors, labels)
+    removed = labels[:50:2]
+    index.remove(removed)
+    alive = labels[~np.isin(labels, removed)]
+    
+    path = index.save(tmp_path / "codes.npz", alive, fingerprint="abc")
+    loaded = cls.load(path, fingerprint="abc")
+    
+    # Al cargar la posición i recibe la etiqueta i (= fila de CandidateIndex)
+    assert len(loaded) == len(alive)
+    np.testing.assert_array_equal(loaded.codes_for(range(len(alive))), index.codes_for(alive))
+    query = _corpus(n=1, seed=3)[0]
+    positions = [index._where[int(label)] for label in alive]
+    np.testing.assert_allclose(loaded.scores(query), index.scores(query)[positions], rtol=1e-6)
+    
+    with pytest.raises(ValueError):
+        cls.load(path, fingerprint="otro")
+    with pytest.raises(ValueError):
+        (BinaryIndex if cls is Int8Index else Int8Index).load(path)
+
+
+# ----------------------------------------------------------------------------
+# CandidateIndex.save / load con códigos
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def model():
+    return load_model(str(ROOT / "model"))
+
+
+def _index(model, n):
+    index = CandidateIndex(model)
+    vectors = _corpus(n=n, dimension=index.dimension)
+    index.add_embeddings([f"C{i}" for i in range(n)], vectors)
+    return index
+
+
+def _tamper_fingerprint(path):
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    meta = json.loads(str(arrays["meta"]))
+    meta["model_fingerprint"] = "otro-modelo"
+    arrays["meta"] = np.array(json.dumps(meta))
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def test_load_reuses_saved_codes(tmp_path, model):
+    index = _index(model, 100)
+    index.enable_ann("int8", rescore=3)
+    store = index.save(str(tmp_path / "store"))
+    assert _codes_path(store, "int8").exists()
+    
+    loaded = CandidateIndex.load(model, str(store), ann="int8", rescore=3)
+    assert isinstance(loaded.ann, Int8Index)
+    np.testing.assert_array_equal(loaded.ann.codes_for(range(100)), index.ann.codes_for(index._labels))
+    query = index.embeddings[7]
+    assert loaded.search_embedding(query, 5)[0].tolist() == index.search_embedding(query, 5)[0].tolist()
+
+
+@pytest.mark.parametrize("n", [0, 30])
+def test_load_rebuilds_when_saved_codes_are_rejected(tmp_path, model, n):
+    index = _index(model, n)
+    index.enable_ann("int8")
+    store = index.save(str(tmp_path / "store"))
+    _tamper_fingerprint(_codes_path(store, "int8"))
+    
+    loaded = CandidateIndex.load(model, str(store), ann="int8")
+    assert isinstance(loaded.ann, Int8Index)
+    assert len(loaded.ann) == n
+    
+    query = _corpus(n=1, dimension=index.dimension, seed=4)[0]
+    assert len(loaded.search_embedding(query, 5)[0]) == min(n, 5)
+    loaded.add_embeddings(["new"], query[None, :])
+    assert loaded.search_embedding(query, 1)[0].tolist() == [n]
+
+
+# ----------------------------------------------------------------------------
+# Product quantization
+# ----------------------------------------------------------------------------
+
+def _exact(vectors, labels, query, k=K):
+    order = np.argsort(-(vectors @ query), kind="stable")[:k]
+    return labels[order]
+
+
+def test_pq_waits_for_enough_vectors_before_training():
+    vectors = _corpus(n=600)
+    labels = np.arange(600, dtype=np.int64)
+    index = PQIndex(DIMENSION, m=8, ks=16)
+    assert index.min_train_size == 64
+    
+    # Un primer batch chico no fija un codebook de 1 centroide
+    index.add(vectors[:1], labels[:1])
+    index.add(vectors[1:40], labels[1:40])
+    assert not index.trained
+    query = vectors[3]
+    found, scores = index.search(query, K)
+    assert found.tolist() == _exact(vectors[:40], labels[:40], query).tolist()
+    np.testing.assert_allclose(scores, vectors[found] @ query, rtol=1e-6)
+    
+    index.remove(labels[:10:3])
+    alive = np.setdiff1d(labels[:40], labels[:10:3])
+    assert index.search(query, K)[0].tolist() == _exact(vectors[alive], alive, query).tolist()
+    
+    # Al llegar al mínimo se entrena con todo lo acumulado
+    index.add(vectors[40:], labels[40:])
+    assert index.trained
+    assert index.codebook.ks == 16
+    assert len(index) == 600 - len(labels[:10:3])
+    assert index.nbytes == len(index) * 8
+    alive = np.setdiff1d(labels, labels[:10:3])
+    np.testing.assert_array_equal(
+        index.codes_for(alive), index.codebook.encode(vectors[alive])
+    )
+    assert _recall_pq(index, vectors, alive) >= 0.5
+
+
+def _recall_pq(index, vectors, alive, rescore=4):
+    hits = 0
+    queries = _queries(vectors)
+    for query in queries:
+        exact = _exact(vectors[alive], alive, query)
+        labels, _ = index.search(query, K * rescore)
+        labels = labels[np.argsort(-(vectors[labels] @ query), kind="stable")[:K]]
+        hits += len(set(labels.tolist()) & set(exact.tolist()))
+    return hits / (K * len(queries))
+
+
+def test_pq_build_trains_only_with_enough_vectors():
+    vectors = _corpus(n=200)
+    small = PQIndex(DIMENSION, m=8, ks=64)
+    small.build(vectors[:100], np.arange(100))
+    assert not small.trained
+    
+    large = PQIndex(DIMENSION, m=8, ks=16)
+    large.build(vectors, np.arange(200))
+    assert large.trained
+    assert large.get_params()["ks"] == 16
+
+
+@pytest.mark.parametrize("n", [30, 300])
+def test_pq_save_load_round_trip(tmp_path, n):
+    vectors = _corpus(n=n)
+    labels = np.arange(n, dtype=np.int64) * 2
+    index = PQIndex(DIMENSION, m=8, ks=16)
+    index.build(vectors, labels)
+    index.remove(labels[:6])
+    alive = labels[6:]
+    
+    loaded = PQIndex.load(index.save(tmp_path / "pq.npz", alive, fingerprint="abc"), fingerprint="abc")
+    assert loaded.trained == index.trained == (n >= 64)
+    assert (loaded.m, loaded.ks, loaded.min_train_size) == (8, 16, 64)
+    np.testing.assert_array_equal(loaded.codes_for(range(len(alive))), index.codes_for(alive))
+    query = _corpus(n=1, seed=5)[0]
+    positions = [index._where[int(label)] for label in alive]
+    np.testing.assert_allclose(loaded.scores(query), index.scores(query)[positions], rtol=1e-5)
+    
+    # Sin entrenar sigue acumulando después de cargar
+    more = _corpus(n=64, seed=6)
+    loaded.add(more, np.arange(len(alive), len(alive) + 64))
+    assert loaded.trained
+
+
+def test_candidate_index_pq_codebook_lifecycle(tmp_path, model, monkeypatch):
+    monkeypatch.setattr(model, "codebook_path", lambda m: tmp_path / f"pq-m{m}.npz")
+    
+    # Índice vacío: el primer add no entrena ni guarda codebooks
+    index = CandidateIndex(model)
+    index.enable_ann("pq", m=8, ks=16, rescore=4)
+    vectors = _corpus(n=300, dimension=index.dimension)
+    index.add_embeddings(["C0"], vectors[:1])
+    assert not index.ann.trained
+    assert not (tmp_path / "pq-m8.npz").exists()
+    assert index.search_embedding(vectors[0], 1)[0].tolist() == [0]
+    
+    index.add_embeddings([f"C{i}" for i in range(1, 300)], vectors[1:])
+    assert index.ann.trained and index.ann.codebook.ks == 16
+    
+    # Con corpus suficiente enable_ann entrena, guarda y luego reutiliza
+    index.enable_ann("pq", m=8, ks=16)
+    saved = PQCodebook.load(tmp_path / "pq-m8.npz", fingerprint=model.fingerprint)
+    np.testing.assert_array_equal(saved.centroids, index.ann.codebook.centroids)
+    index.enable_ann("pq", m=8, ks=16)
+    np.testing.assert_array_equal(saved.centroids, index.ann.codebook.centroids)
+    
+    # Un codebook guardado con pocos centroides se descarta y se re-entrena
+    PQCodebook.train(vectors[:3], m=8, ks=16).save(tmp_path / "pq-m8.npz", fingerprint=model.fingerprint)
+    index.enable_ann("pq", m=8, ks=16)
+    assert index.ann.codebook.ks == 16
+    assert PQCodebook.load(tmp_path / "pq-m8.npz").ks == 16
@@ -0,0 +1,174 @@
+"""
+MicroBatcher: peticiones concurrentes comparten un forward pass y cada una
+recibe sus filas. InferencePool: con el pool lleno se rechaza (503) en vez
+de encolar
+"""
+
+import asyncio
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from serving import InferencePool, MicroBatcher, PoolSaturatedError
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _fake_encode(calls):
+    """encode_fn que registra cada batch; fila = [largo del texto, posición]"""
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+    return encode
+
+
+async def _with_batcher(batcher, coroutine):
+    await batcher.start()
+    try:
+        return await coroutine
+    finally:
+        await batcher.stop()
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+    batcher = MicroBatcher(_fake_encode(calls), max_batch_size=64, max_wait_ms=50)
+    requests = [["a", "bb"], ["ccc"], ["dddd", "e", "ff"]]
+    
+    async def run():
+        return await asyncio.gather(*(batcher.encode(texts) for texts in requests))
+    
+    results = asyncio.run(_with_batcher(batcher, run()))
+    
+    assert calls == [[text for texts in requests for text in texts]]
+    for texts, rows in zip(requests, results):
+        assert rows[:, 0].tolist() == [len(text) for text in texts]
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["requests"] == 3
+
+
+def test_full_batch_is_flushed_without_waiting():
+    calls = []
+    batcher = MicroBatcher(_fake_encode(calls), max_batch_size=2, max_wait_ms=10_000)
+    
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.encode(["a", "b"]), batcher.encode(["c", "d"])), timeout=2
+        )
+    
+    asyncio.run(_with_batcher(batcher, run()))
+    assert calls == [["a", "b"], ["c", "d"]]
+
+
+def test_encode_error_reaches_every_request_in_the_batch():
+    def failing(texts):
+        raise RuntimeError("modelo caído")
+    
+    batcher = MicroBatcher(failing, max_wait_ms=20)
+    
+    async def run():
+        return await asyncio.gather(
+            batcher.encode(["a"]), batcher.encode(["b"]), return_exceptions=True
+        )
+    
+    errors = asyncio.run(_with_batcher(batcher, run()))
+    assert [str(e) for e in errors] == ["modelo caído", "modelo caído"]
+
+
+def test_max_pending_rejects_instead_of_queueing():
+    calls = []
+    batcher = MicroBatcher(_fake_encode(calls), max_wait_ms=50, max_pending=2)
+    
+    async def run():
+        return await asyncio.gather(
+            *(batcher.encode([str(i)]) for i in range(3)), return_exceptions=True
+        )
+    
+    results = asyncio.run(_with_batcher(batcher, run()))
+    assert isinstance(results[2], PoolSaturatedError)
+    assert [r.shape for r in results[:2]] == [(1, 2), (1, 2)]
+    assert batcher.stats()["rejected"] == 1
+
+
+def test_encode_requires_start():
+    batcher = MicroBatcher(_fake_encode([]))
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.encode(["a"]))
+
+
+# ----------------------------------------------------------------------------
+# InferencePool: backpressure y 503
+# ----------------------------------------------------------------------------
+
+def test_pool_rejects_when_workers_and_queue_are_full():
+    pool = InferencePool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    
+    async def run():
+        first = asyncio.ensure_future(pool.run(release.wait))
+        second = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturatedError):
+            await pool.run(len, "x")
+        stats = pool.stats()
+        release.set()
+        await asyncio.gather(first, second)
+        return stats
+    
+    try:
+        stats = asyncio.run(run())
+    finally:
+        release.set()
+        pool.shutdown()
+    
+    assert stats["pending"] == 2
+    assert stats["rejected"] == 1
+    assert pool.stats()["pending"] == 0
+    assert pool.stats()["completed"] == 2
+
+
+def test_batcher_fails_fast_when_pool_is_full():
+    pool = InferencePool(max_workers=1, max_queue=0)
+    batcher = MicroBatcher(_fake_encode([]), max_wait_ms=1, pool=pool)
+    pool.acquire()   # otro trabajo ocupa el único hueco
+    try:
+        with pytest.raises(PoolSaturatedError):
+            asyncio.run(_with_batcher(batcher, batcher.encode(["a"])))
+    finally:
+        pool.release()
+        pool.shutdown()
+
+
+def test_saturated_pool_returns_503_and_health_still_answers(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    pytest.importorskip("uvicorn")
+    from fastapi.testclient import TestClient
+    
+    import api_wrapper
+    
+    for name in ("MODEL", "INDEX", "POOL", "BATCHER"):
+        monkeypatch.setattr(api_wrapper, name, None)
+    monkeypatch.setenv("POOL_WORKERS", "1")
+    monkeypatch.setenv("POOL_QUEUE", "0")
+    api_wrapper.initialize_model(str(ROOT / "model"))
+    request = {"query": "python developer", "candidates": ["python backend", "react frontend"]}
+    
+    with TestClient(api_wrapper.app) as client:
+        assert client.post("/search", json=request).status_code == 200
+        
+        api_wrapper.POOL.acquire()   # el único worker queda ocupado
+        try:
+            response = client.post("/search", json=request)
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "1"
+            
+            assert client.get("/health").status_code == 200
+            metrics = client.get("/metrics").json()
+            assert metrics["inference_pool"]["rejected"] == 1
+        finally:
+            api_wrapper.POOL.release()
+        
+        assert client.post("/search", json=request).status_code == 200
@@ -0,0 +1,98 @@
+"""
+SkillIndex: filtros AND / OR / min_overlap contra fuerza bruta, eliminación
+con swap de la última fila y persistencia
+"""
+
+import numpy as np
+
+from match_scoring import normalize_skill
+from skill_index import SkillIndex
+
+
+ROWS = [
+    ["Python", "Django", "SQL"],
+    ["python", "React"],
+    ["Java", "SQL"],
+    ["React", "CSS", "JavaScript"],
+    [],
+    ["Python", "SQL", "AWS"],
+]
+
+
+def _expected(rows, all_of=(), any_of=(), min_overlap=1):
+    """Filtro por fuerza bruta sobre las listas de skills"""
+    all_of = {normalize_skill(s) for s in all_of}
+    any_of = {normalize_skill(s) for s in any_of}
+    matched = []
+    for row, skills in enumerate(rows):
+        keys = {normalize_skill(s) for s in skills}
+        if not all_of <= keys:
+            continue
+        if any_of and len(any_of & keys) < max(1, min_overlap):
+            continue
+        matched.append(row)
+    return matched
+
+
+def _build(rows):
+    index = SkillIndex()
+    index.add_many(rows)
+    return index
+
+
+def test_filters_match_brute_force():
+    index = _build(ROWS)
+    cases = [
+        {},
+        {"all_of": ["python"]},
+        {"all_of": ["Python", "SQL"]},
+        {"any_of": ["React", "AWS"]},
+        {"any_of": ["python", "sql", "aws"], "min_overlap": 2},
+        {"all_of": ["SQL"], "any_of": ["Django", "AWS"]},
+        {"all_of": ["Rust"]},
+    ]
+    for case in cases:
+        assert index.match(**case).tolist() == _expected(ROWS, **case), case
+
+
+def test_remove_moves_last_row_into_the_hole():
+    rows = [list(skills) for skills in ROWS]
+    index = _build(rows)
+    
+    for row in (1, 0, len(rows) - 3):
+        index.remove(row)
+        rows[row] = rows[-1]
+        rows.pop()
+        
+        assert len(index) == len(rows)
+        for skill in ("python", "sql", "react", "aws", "css"):
+            assert index.rows(skill).tolist() == _expected(rows, all_of=[skill]), skill
+
+
+def test_update_replaces_row_skills():
+    rows = [list(skills) for skills in ROWS]
+    index = _build(rows)
+    index.update(2, ["Python", "Go"])
+    rows[2] = ["Python", "Go"]
+    
+    assert index.match(all_of=["python"]).tolist() == _expected(rows, all_of=["python"])
+    assert index.match(all_of=["java"]).tolist() == []
+
+
+def test_save_load_round_trip(tmp_path):
+    index = _build(ROWS)
+    index.remove(1)
+    ids = [f"C{i}" for i in range(len(index))]
+    
+    loaded, loaded_ids = SkillIndex.load(index.save(tmp_path / "skills.npz", ids=ids))
+    
+    assert loaded_ids == ids
+    assert len(loaded) == len(index)
+    assert sorted(loaded.skills) == sorted(index.skills)
+    for skill in index.skills:
+        assert np.array_equal(loaded.rows(skill), index.rows(skill))
+    assert loaded.groups().keys() == index.groups().keys()
+    
+    # Sigue siendo modificable después de cargar
+    loaded.add(["Python"])
+    assert loaded.rows("python")[-1] == len(loaded) - 1